@@ -1,8 +1,18 @@
 import MotorControl as motor
 import ObstaclePrediction as sensor
 import asyncio
+import math
 import queue
-from robot_utils import get_objects_at
+from robot_utils import get_objects_at, get_small_objects_at
+from TiledDetection import is_small_object
+from config import TILED_DETECT, SENSOR_RANGE_CM
+from DetectionVoting import confirm
+from SensorSampler import sampler
+from MotionExecutor import executor
+from FrontierExplorer import explorer
+from PathPlanner import planner, drive_leg
+from Odometry import odometry, calibration
+from Clock import clock
 from typing import Dict
 from IpcClient import WebRTC
 from Follow_me import goToTarget
@@ -56,76 +66,57 @@ async def move(pattern:RecurringPattern):
 
     if pattern.isRecurringPattern():
         print("Robot might be stuck. Making LARGE clockwise turn >>>>")
-        motor.move_right()
-        await asyncio.sleep(1.0)
-        motor.stop()
+        await executor.run("right", 1.0)
         return
 
     # FRONT OBSTACLE
     if front != -1 and front < threshold and left > sideThreshold and right > sideThreshold:
         
         motor.stop()
-        await asyncio.sleep(0.3)
-        motor.move_backward()
-        await asyncio.sleep(0.3)
-        motor.move_right()
-        await asyncio.sleep(0.5)
-        motor.stop()
+        await clock.asleep(0.3)
+        await executor.run("backward", 0.3)
+        await executor.run("right", 0.5)
         return
 
     # BOTH SIDES BLOCKED
-    if left < sideThreshold and right < sideThreshold:
+    if left != -1 and left < sideThreshold and right != -1 and right < sideThreshold:
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
+            await executor.run("backward", 0.2)
 
-        motor.move_right()
         pattern.addMovementBinary(1)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("right", 0.6)
         return
 
     # LEFT BLOCKED
     if left != -1 and left < sideThreshold:
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
+            await executor.run("backward", 0.2)
 
-        motor.move_right()
         pattern.addMovementBinary(1)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("right", 0.6)
         return
 
     # RIGHT BLOCKED
     if right != -1 and right < sideThreshold:
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
+            await executor.run("backward", 0.2)
 
-        motor.move_left()
         pattern.addMovementBinary(0)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("left", 0.6)
         return
 
     # PATH CLEAR
-    motor.move_forward()
     pattern.addMovementBinary(-1)
-    await asyncio.sleep(0.3)
-    motor.stop()
+    await executor.run("forward", 0.3)
 
 
 async def isObjDetected(objs:Dict, target:str):
@@ -150,69 +141,80 @@ async def findDirection(obj:str, ipc:WebRTC):
 
     for direction in directions:
         print(f"Scanning {direction}...")
-        objects= None
-        #Max Frames
-        i=0
-        while objects is None and i<5:
-            objects = await get_objects_at()
-            found, objList = await toObjList(objects,obj) 
-            print("objects detected:", objList)
-            i +=1
+        # confidence weighted votes over consecutive frames, stops as soon as decisive
+        found, objList, frames = await confirm(obj, get_objects_at)
+        print(f"objects detected: {objList} ({'found' if found else 'not found'} after {frames} frames)")
+
+        # small/far targets vanish when the frame is downscaled, retry on full resolution tiles
+        if not found and TILED_DETECT and is_small_object(obj):
+            tiled = await get_small_objects_at(obj)
+            if tiled:
+                found = True
+                objList.append(obj)
+                print(f"{obj} found by tiled pass")
         await ipc.send({"type":"objects", "command": objList})
 
         if found:
              print(f"Object found in {direction}")
              return True
-        await asyncio.sleep(0.2)
+        await clock.asleep(0.2)
         
-        motor.move_right()
-        await asyncio.sleep(0.3)
-        motor.stop()
+        await executor.run("right", 0.3)
     return False
   
 async def goToObject(target:str,ipc:WebRTC):
     set_muted(True)
     SAFETY_SIDE = 18     
     TARGET_DISTANCE = 50 
-    while True:
-        distances = await sensor.get_all_distances()
-        front = distances["front"]
-        left = distances["left"]      
-        right = distances["right"] 
-
-        print("Distances:", distances)
-
-        if front != -1 and front <= TARGET_DISTANCE:
-            print("Reached object")
-            motor.stop()
-            set_muted(False)
-            return
-
-        # left wall too close
-        elif left != -1 and left < SAFETY_SIDE:
-            print("Left wall too close, slightly steer right")
-            motor.move_right()          
-            await asyncio.sleep(0.15)
-            motor.stop()
-
-        #  right wall too close 
-        elif right != -1 and right < SAFETY_SIDE:
-            print("Right wall too close, slightly steer left")
-            motor.move_left()           
-            await asyncio.sleep(0.15)
-            motor.stop()            
-
-        # move forward 
-        elif front != -1 and front > TARGET_DISTANCE:
-            print("Approaching object…")
-            motor.move_forward()
-            await asyncio.sleep(0.25)
-            motor.stop()
+    GOAL_REACHED = 10   # cm, then aim again from the front reading
+    # nothing past ~80 cm matters while approaching, shorter echo waits
+    sensor.set_range(TARGET_DISTANCE + 30)
+    goal = None
+    try:
+        while True:
+            distances = await sensor.get_all_distances()
+            front = distances["front"]
+            left = distances["left"]      
+            right = distances["right"] 
+
+            print("Distances:", distances)
+
+            if front != -1 and front <= TARGET_DISTANCE:
+                print("Reached object")
+                motor.stop()
+                set_muted(False)
+                return
+
+            # move forward 
+            elif front != -1 and front > TARGET_DISTANCE:
+                # the target is ahead after findDirection: route to TARGET_DISTANCE short of it
+                # around what the map knows, repaired (not replanned) when a new reading blocks the way
+                x, y, heading = odometry.pose()
+                if goal is None or math.hypot(goal[0] - x, goal[1] - y) < GOAL_REACHED:
+                    ahead = float(front) - TARGET_DISTANCE
+                    goal = (x + ahead * math.cos(math.radians(heading)),
+                            y + ahead * math.sin(math.radians(heading)))
+                route = planner.plan((x, y), goal)
+                # longer strides while the gap closes slowly, brakes early when it closes fast
+                step = sampler.history.step_time("front", TARGET_DISTANCE, 0.25)
+                print(f"Approaching object… ({step:.2f}s, plan {planner.last})")
+                if route:
+                    await drive_leg(route[0], step * calibration.cm_per_s)
+                # no route in the map: the old wall nudges
+                elif left != -1 and left < SAFETY_SIDE:
+                    print("Left wall too close, slightly steer right")
+                    await executor.run("right", 0.15)
+                elif right != -1 and right < SAFETY_SIDE:
+                    print("Right wall too close, slightly steer left")
+                    await executor.run("left", 0.15)
+                else:
+                    await executor.run("forward", step)
         
-        objects = await get_objects_at()
-        if not await isObjDetected(objects,target):
-            findDirection(target,ipc)
-    
+            objects = await get_objects_at()
+            if not await isObjDetected(objects,target):
+                findDirection(target,ipc)
+    finally:
+        sensor.set_range(SENSOR_RANGE_CM)
    
             
  
@@ -222,20 +224,23 @@ async def findObject(targetObj: str, ipc:WebRTC, face: RobotFace):
     # await sensor.setup()
 
     pattern = RecurringPattern()
+    explorer.start()
 
     while True:        
         await ipc.send({"type":"log", "command" : "Finding "+ targetObj})
         # Scan all 4 directions       
         if await findDirection(targetObj, ipc):
              await goToObject(targetObj,ipc)           
-             await ipc.send({"type":"log","command": targetObj +" found"})
-             print("found: ", targetObj)
+             took = explorer.found()
+             await ipc.send({"type":"log","command": f"{targetObj} found in {took:.0f}s"})
+             print("found: ", targetObj, explorer.stats())
              await speak(f"I found {targetObj}", face)
              return True
-        # object not seen/visible 
-        else:
+        # object not seen/visible: head for the closest unseen part of the map,
+        # wander reactively once the map has no frontier left
+        elif not await explorer.step():
             await move(pattern)
-        await asyncio.sleep(0.2)
+        await clock.asleep(0.2)
     
 
 
@@ -254,83 +259,64 @@ async def autonomousExplore(pattern):
 
     if (pattern.isRecurringPattern()):
         print("Robot might be stuck. Making large clockwise turn >>>>>\n")
-        motor.move_right()
-        await asyncio.sleep(1.0)
-        motor.stop()
+        await executor.run("right", 1.0)
     else:
         print("Not stuck")
 
-    await asyncio.sleep(0.5)
+    await clock.asleep(0.5)
     # Resolve front obstacle detection
     if front != -1 and front < threshold and left > leftRightThreshold and right > leftRightThreshold:
         print("Obstacle detected ahead! Backing up, turning clockwise >>>>>\n")
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
-        motor.move_backward()
-        await asyncio.sleep(0.3)
+        await executor.run("backward", 0.3)
 
-        motor.move_right()
-        await asyncio.sleep(0.5)
-        motor.stop()
+        await executor.run("right", 0.5)
 
     # Resolve both left and right obstacle detection
     elif left != -1 and left < leftRightThreshold and right != -1 and right < leftRightThreshold:
         print("Left and right obstacle detected. Turning clockwise >>>>>\n")
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back != -1 and back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
-            await asyncio.sleep(0.3)
+            await executor.run("backward", 0.2)
+            await clock.asleep(0.3)
 
-        motor.move_right()
         pattern.addMovementBinary(1)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("right", 0.6)
 
     # Resolve left obstacle detection
     elif left != -1 and left < leftRightThreshold:
         print("Left obstacle detected. Turning clockwise >>>>>\n")
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back != -1 and back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
-            await asyncio.sleep(0.3)
+            await executor.run("backward", 0.2)
+            await clock.asleep(0.3)
 
-        motor.move_right()
         pattern.addMovementBinary(1)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("right", 0.6)
 
     # Resolve right obstacle detection
     elif right != -1 and right < leftRightThreshold:
         print("Right obstacle detected. Turning counter-clockwise <<<<<\n")
         motor.stop()
-        await asyncio.sleep(0.3)
+        await clock.asleep(0.3)
 
         if back != -1 and back > rearThreshold:
-            motor.move_backward()
-            await asyncio.sleep(0.2)
-            motor.stop()
-            await asyncio.sleep(0.3)
+            await executor.run("backward", 0.2)
+            await clock.asleep(0.3)
 
-        motor.move_left()
         pattern.addMovementBinary(0)
-        await asyncio.sleep(0.6)
-        motor.stop()
+        await executor.run("left", 0.6)
 
     else:
         print("Path clear, moving forward.\n")
-        motor.move_forward()
         pattern.addMovementBinary(-1)
-        await asyncio.sleep(0.3)
-        motor.stop()
+        await executor.run("forward", 0.3)
 
 
 #Test
@@ -358,83 +344,64 @@ async def autonomousRandomExplore():
 
             if (pattern.isRecurringPattern()):
                 print("Robot might be stuck. Making large clockwise turn >>>>>\n")
-                motor.move_right()
-                await asyncio.sleep(1.0)
-                motor.stop()
+                await executor.run("right", 1.0)
             else:
                 print("Not stuck")
 
-            await asyncio.sleep(0.5)
+            await clock.asleep(0.5)
             # Resolve front obstacle detection
             if front != -1 and front < threshold and left > leftRightThreshold and right > leftRightThreshold:
                 print("Obstacle detected ahead! Backing up, turning clockwise >>>>>\n")
                 motor.stop()
-                await asyncio.sleep(0.3)
+                await clock.asleep(0.3)
 
-                motor.move_backward()
-                await asyncio.sleep(0.3)
+                await executor.run("backward", 0.3)
 
-                motor.move_right()
-                await asyncio.sleep(0.5)
-                motor.stop()
+                await executor.run("right", 0.5)
 
             # Resolve both left and right obstacle detection
             elif left != -1 and left < leftRightThreshold and right != -1 and right < leftRightThreshold:
                 print("Left and right obstacle detected. Turning clockwise >>>>>\n")
                 motor.stop()
-                await asyncio.sleep(0.3)
+                await clock.asleep(0.3)
 
                 if back != -1 and back > rearThreshold:
-                    motor.move_backward()
-                    await asyncio.sleep(0.2)
-                    motor.stop()
-                    await asyncio.sleep(0.3)
+                    await executor.run("backward", 0.2)
+                    await clock.asleep(0.3)
 
-                motor.move_right()
                 pattern.addMovementBinary(1)
-                await asyncio.sleep(0.6)
-                motor.stop()
+                await executor.run("right", 0.6)
 
             # Resolve left obstacle detection
             elif left != -1 and left < leftRightThreshold:
                 print("Left obstacle detected. Turning clockwise >>>>>\n")
                 motor.stop()
-                await asyncio.sleep(0.3)
+                await clock.asleep(0.3)
 
                 if back != -1 and back > rearThreshold:
-                    motor.move_backward()
-                    await asyncio.sleep(0.2)
-                    motor.stop()
-                    await asyncio.sleep(0.3)
+                    await executor.run("backward", 0.2)
+                    await clock.asleep(0.3)
 
-                motor.move_right()
                 pattern.addMovementBinary(1)
-                await asyncio.sleep(0.6)
-                motor.stop()
+                await executor.run("right", 0.6)
 
             # Resolve right obstacle detection
             elif right != -1 and right < leftRightThreshold:
                 print("Right obstacle detected. Turning counter-clockwise <<<<<\n")
                 motor.stop()
-                await asyncio.sleep(0.3)
+                await clock.asleep(0.3)
 
                 if back != -1 and back > rearThreshold:
-                    motor.move_backward()
-                    await asyncio.sleep(0.2)
-                    motor.stop()
-                    await asyncio.sleep(0.3)
+                    await executor.run("backward", 0.2)
+                    await clock.asleep(0.3)
 
-                motor.move_left()
                 pattern.addMovementBinary(0)
-                await asyncio.sleep(0.6)
-                motor.stop()
+                await executor.run("left", 0.6)
 
             else:
                 print("Path clear, moving forward.\n")
-                motor.move_forward()
                 pattern.addMovementBinary(-1)
-                await asyncio.sleep(0.3)
-                motor.stop()
+                await executor.run("forward", 0.3)
     except KeyboardInterrupt:
         print("Forced to stop Exploration")
     finally:
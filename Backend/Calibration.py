@@ -0,0 +1,137 @@
+"""
+Calibration.py - Fit the robot's speed and turn rate against a wall
+===================================================================
+
+Place the robot facing a flat wall 40-200 cm away with room behind it and
+on both sides, then run `python Calibration.py`. The fitted constants are
+stored per robot (see Odometry.Calibration) and used by the odometry and
+by distance / angle motion commands from then on.
+
+  - speed: backs off, then drives toward the wall at full speed while the
+    sampler records the front distance (prioritised when driving forward);
+    the slope of a least squares line over the steady part of the run is
+    the ground speed
+  - turn rate: turns 90 deg left at full speed while the right sensor
+    sweeps across the wall. It reads the shortest distance when it faces
+    the wall square on, the time of that minimum (parabola fit) is the
+    time of a 90 deg turn. Same to the right with the left sensor.
+"""
+
+import asyncio
+
+import numpy as np
+
+import MotorControl as motor
+import ObstaclePrediction as sensor
+from Clock import clock
+from MotionExecutor import executor
+from Odometry import calibration
+from SensorSampler import sampler
+from config import SENSOR_RANGE_CM
+
+MIN_WALL = 40.0    # cm
+MAX_WALL = 200.0
+RUN_S = 1.0        # straight run length
+RUNS = 2
+SETTLE_S = 0.15    # spin-up left out of the fit
+TURN_MARGIN = 1.4  # turn this much past the expected 90 deg to see the minimum
+PAUSE = 0.5
+BACK = {"left": "right", "right": "left"}
+
+
+def _samples(name, since, until):
+    """Time ordered (t, d) of a sensor between since and until."""
+    t, d = sampler.history.buffers[name].window(clock.now() - since, clock.now())
+    keep = t <= until
+    order = np.argsort(t[keep])
+    t, d = t[keep][order], d[keep][order]
+    # the history holds medians of 3: each one describes the previous sample's time
+    if len(t) > 2:
+        t = t - float(np.median(np.diff(t)))
+    return t, d
+
+
+async def _wall_distance():
+    await clock.asleep(PAUSE)
+    return (await sampler.wait_fresh(0.1))["front"].distance
+
+
+async def measure_speed(direction):
+    started = clock.now()
+    await executor.run(direction, RUN_S)
+    t, d = _samples("front", started + SETTLE_S, started + RUN_S)
+    if len(t) < 5:
+        raise RuntimeError(f"too few front readings while driving {direction} ({len(t)})")
+    slope = np.polyfit(t, d, 1)[0]
+    return abs(float(slope))
+
+
+async def measure_turn(direction, watch, deg_per_s):
+    """Turn rate (deg/s); turns back to the wall afterwards."""
+    started = clock.now()
+    duration = TURN_MARGIN * 90 / deg_per_s
+    await executor.run(direction, duration)
+    # only where the 90 deg point can be (the sensor may see other walls before)
+    expected = duration / TURN_MARGIN
+    t, d = _samples(watch, started + 0.5 * expected, clock.now())
+    if len(t) < 5:
+        raise RuntimeError(f"too few {watch} readings while turning {direction} ({len(t)})")
+    # parabola through the samples around the minimum
+    i = int(np.argmin(d))
+    lo, hi = max(0, i - 3), min(len(t), i + 4)
+    if hi - lo >= 3:
+        a, b, _ = np.polyfit(t[lo:hi] - started, d[lo:hi], 2)
+        t90 = -b / (2 * a) if a > 0 else t[i] - started
+    else:
+        t90 = t[i] - started
+    await clock.asleep(PAUSE)
+    await executor.run(BACK[direction], duration)
+    return 90 / t90
+
+
+async def calibrate():
+    """Runs the calibration and saves it. Needs the sampler running."""
+    sensor.set_range(MAX_WALL + 50)
+    try:
+        wall = await _wall_distance()
+        if wall == -1 or not MIN_WALL <= wall <= MAX_WALL:
+            raise RuntimeError(f"face a wall {MIN_WALL:g}-{MAX_WALL:g} cm away (front reads {wall})")
+
+        speeds = []
+        for _ in range(RUNS):
+            # back off, then the fitted run toward the wall
+            await executor.run("backward", RUN_S)
+            await clock.asleep(PAUSE)
+            speeds.append(await measure_speed("forward"))
+            await clock.asleep(PAUSE)
+        cm_per_s = sum(speeds) / len(speeds)
+        print(f"[Calibration] speed {', '.join(f'{v:.1f}' for v in speeds)} cm/s")
+
+        await clock.asleep(PAUSE)
+        rates = [await measure_turn("left", "right", calibration.deg_per_s)]
+        await clock.asleep(PAUSE)
+        rates.append(await measure_turn("right", "left", calibration.deg_per_s))
+        deg_per_s = sum(rates) / len(rates)
+        print(f"[Calibration] turn left {rates[0]:.1f}, right {rates[1]:.1f} deg/s")
+
+        calibration.save(cm_per_s, deg_per_s)
+        return cm_per_s, deg_per_s
+    finally:
+        executor.stop()
+        sensor.set_range(SENSOR_RANGE_CM)
+
+
+#Test
+async def main():
+    motor.initialSetUp()
+    motor.setup()
+    await sensor.setup()
+    sampler.start()
+    try:
+        print(await calibrate())
+    finally:
+        sampler.stop()
+        motor.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
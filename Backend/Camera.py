@@ -3,7 +3,9 @@ import threading
 import subprocess
 import time
 import numpy as np
-from ultralytics import YOLO
+from Clock import clock
+from ModelRegistry import registry
+from GpioBackend import GPIO, SIMULATED
 
 class CameraManager:
     #ls -l /dev/v4l/by-id/ (should choose lowest index video device)
@@ -15,7 +17,6 @@ class CameraManager:
         self.height = height
         self.fps = fps
         self.virt_cam = virt_cam
-        self.model = YOLO("yolov8n.pt")
 
         # --- OpenCV camera using V4L2 (owns the camera exclusively) ---
         self.cap = cv2.VideoCapture(self.src, cv2.CAP_V4L2)
@@ -46,6 +47,7 @@ class CameraManager:
         )
 
         self.latest = None
+        self.latest_t = 0.0  # clock.now() when latest was captured
         self._running = True
 
         self.thread = threading.Thread(target=self._loop, daemon=True)
@@ -62,6 +64,7 @@ class CameraManager:
 
             # Store for YOLO/detection use
             self.latest = frame  
+            self.latest_t = clock.now()
 
             # Stream to virtual camera using ffmpeg
             try:
@@ -77,7 +80,8 @@ class CameraManager:
         return self.latest
     
     def get_yolo(self):
-        return self.model
+        # detector for the current mode, see ModelRegistry
+        return registry.active()
 
     def stop(self):
         self._running = False
@@ -91,8 +95,39 @@ class CameraManager:
             pass
 
 
+class SimCamera:
+    """
+    No webcam in the simulator: a rendering of the simulated world (for
+    visual odometry), Simulation.py stands in for detections.
+    """
+
+    def __init__(self, width=1280, height=720, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.latest = None
+        self.latest_t = 0.0
+        self._rendered = 0.0  # wall time: fps frames per wall second, whatever SIM_SPEEDUP
+
+    def get_frame(self):
+        now = time.perf_counter()
+        if self.latest is None or now - self._rendered >= 1.0 / self.fps:
+            # rendered small, the detectors and visual odometry downscale anyway
+            view = GPIO.world.view(self.width // 4, self.height // 4)
+            self.latest = cv2.cvtColor(cv2.resize(view, (self.width, self.height)), cv2.COLOR_GRAY2BGR)
+            self._rendered = now
+            self.latest_t = clock.now()
+        return self.latest
+
+    def get_yolo(self):
+        return registry.active()
+
+    def stop(self):
+        pass
+
+
 #Need to move to the main
-camera = CameraManager() 
+camera = SimCamera() if SIMULATED else CameraManager()
 
 # Test
 if __name__=="__main__":
@@ -0,0 +1,64 @@
+"""
+Clock.py - The motion stack's clock, accelerated in the simulator
+==================================================================
+
+Sensing and motion read this clock instead of time.perf_counter():
+SimGPIO's world and echo edges, EchoTimer, the SensorSampler and its
+readings, SensorHistory, Odometry, the motor ramp, MotionExecutor's waits
+and the behaviours' pauses. On the robot it is perf_counter. SimGPIO sets
+it to run SIM_SPEEDUP times faster than the wall clock, so the real
+behaviours can be benchmarked in a fraction of the time while everything
+they time and measure stays consistent with the simulated world.
+
+Waits are given in clock seconds: sleep() / asleep() sleep, wall() turns a
+clock timeout into the wall seconds asyncio and threading expect. CPU cost
+measurements (plan times, map update times, command latency) stay on
+perf_counter.
+
+Usage:
+    from Clock import clock
+    t = clock.now()
+    await clock.asleep(0.3)
+    await asyncio.wait_for(future, clock.wall(0.5))
+"""
+
+import asyncio
+import time
+
+
+class Clock:
+    def __init__(self):
+        self.speedup = 1.0
+        # clock time at wall time _wall0
+        self._t0 = self._wall0 = time.perf_counter()
+
+    def set_speedup(self, speedup: float):
+        """Runs the clock speedup times faster from now on (it never jumps)."""
+        if speedup <= 0:
+            raise ValueError(f"speedup must be > 0, got {speedup}")
+        self._t0, self._wall0 = self.now(), time.perf_counter()
+        self.speedup = float(speedup)
+
+    def now(self) -> float:
+        if self.speedup == 1.0:
+            return self._t0 + time.perf_counter() - self._wall0
+        return self._t0 + (time.perf_counter() - self._wall0) * self.speedup
+
+    def now_ns(self) -> int:
+        if self.speedup == 1.0 and self._t0 == self._wall0:
+            return time.perf_counter_ns()
+        return int(self.now() * 1e9)
+
+    def wall(self, seconds: float) -> float:
+        """Wall seconds that last `seconds` on this clock."""
+        return seconds / self.speedup
+
+    def sleep(self, seconds: float):
+        time.sleep(max(0.0, seconds) / self.speedup)
+
+    async def asleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds) / self.speedup)
+
+
+# Single instance shared by all modules
+clock = Clock()
@@ -0,0 +1,103 @@
+"""
+CollisionGuard.py - Shared autonomy for manual driving
+=======================================================
+
+Remote operators see the robot through a laggy video link and bump into
+things. The guard sits between Teleop and the motors: a forward (backward)
+command is limited to the speed the robot can still stop from before the
+obstacle the front (back) sensor reports, and refused when even the
+slowest speed is too fast:
+
+    braking distance = v * GUARD_REACTION_S + v^2 / (2 * GUARD_DECEL) + GUARD_MARGIN_CM
+
+Only the sampler's cached snapshot is read, so a command costs no sensing
+time. The distance is reduced by what the robot has driven since the
+reading was taken. Turns are never limited. Stale or invalid readings
+allow BLIND_SPEED only.
+
+Usage:
+    from CollisionGuard import guard
+    speed = guard.limit("forward", 1.0)   # 0 = refused
+"""
+
+import math
+from typing import Dict
+
+import MotorControl as motor
+from Odometry import calibration
+from SensorSampler import sampler
+from config import GUARD_DECEL, GUARD_ENABLED, GUARD_MARGIN_CM, GUARD_REACTION_S
+
+# motion -> sensor looking that way
+GUARDED = {"forward": "front", "backward": "back"}
+MIN_SPEED = 0.3     # slower commands are refused instead
+BLIND_SPEED = 0.5   # without a usable reading
+STALE_S = 0.5       # readings older than this are not trusted
+
+
+class CollisionGuard:
+    def __init__(self, enabled: bool = GUARD_ENABLED, reaction: float = GUARD_REACTION_S,
+                 decel: float = GUARD_DECEL, margin: float = GUARD_MARGIN_CM):
+        self.enabled = enabled
+        self.reaction = reaction
+        self.decel = decel
+        self.margin = margin
+        self.last: Dict = {}
+
+        # Telemetry
+        self.checks = 0
+        self.slowed = 0
+        self.vetoed = 0
+        self.blind = 0
+
+    def braking_distance(self, speed: float) -> float:
+        """cm needed to stop from speed (0..1 of full speed)."""
+        v = speed * calibration.cm_per_s
+        return v * self.reaction + v * v / (2 * self.decel) + self.margin
+
+    def max_speed(self, distance: float) -> float:
+        """Highest speed (0..1) whose braking distance fits into distance."""
+        room = distance - self.margin
+        if room <= 0:
+            return 0.0
+        # v * r + v^2 / 2a = room
+        v = self.decel * (math.sqrt(self.reaction ** 2 + 2 * room / self.decel) - self.reaction)
+        return min(1.0, v / calibration.cm_per_s)
+
+    def limit(self, motion: str, speed: float = 1.0) -> float:
+        """Speed allowed for a motion command (0 = refused)."""
+        sensor = GUARDED.get(motion)
+        if not self.enabled or sensor is None:
+            return speed
+        self.checks += 1
+        reading = sampler.snapshot()[sensor]
+        if not sampler.running or not reading.valid or reading.age() > STALE_S:
+            self.blind += 1
+            self.last = {"motion": motion, "distance": None, "speed": min(speed, BLIND_SPEED)}
+            return self.last["speed"]
+
+        # what the robot drove toward it since the reading (ClearBeyond is a lower bound)
+        closing = max(0.0, motor.travel() * (1 if motion == "forward" else -1))
+        distance = float(reading.distance) - closing * calibration.cm_per_s * reading.age()
+        allowed = min(speed, self.max_speed(distance))
+        if allowed < MIN_SPEED:
+            allowed = 0.0
+            self.vetoed += 1
+        elif allowed < speed:
+            self.slowed += 1
+        self.last = {"motion": motion, "distance": round(distance, 1), "speed": round(allowed, 2)}
+        return allowed
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "checks": self.checks,
+            "slowed": self.slowed,
+            "vetoed": self.vetoed,
+            "blind": self.blind,
+            "last": self.last,
+        }
+
+
+# Single instance shared by all modules
+guard = CollisionGuard()
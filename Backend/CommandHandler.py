@@ -1,7 +1,7 @@
 import asyncio,json
 import time
 from typing import Dict
-import MotorControl as motor
+from Teleop import teleop
 from Autonomous import  findObject
 from Follow_me import goToTarget
 from Controller import ModeController, MediumController, Medium
@@ -9,6 +9,7 @@ from robot_utils import speak, ask_llm
 from Face import EMOTION_MAP, RobotFace
 from IpcClient import WebRTC
 from voice_listener import get_voice_queue, set_last_bot_response, set_muted
+from ModelRegistry import registry
 
    
 FOLLOWUP_WINDOW = 0  # Match voice_listener
@@ -36,29 +37,8 @@ async def drain_queue(q: asyncio.Queue):
             break
 
 async def Manual():
-    while True:
-        cmd = await motor_queue.get()
-       
-        direction = cmd.get("command")
-        print(f"Executing motor command: {direction}")
-
-        if direction == "front":
-            motor.move_forward()
-            await asyncio.sleep(0.25)
-        elif direction == "back":
-            motor.move_backward()
-            await asyncio.sleep(0.25)
-        elif direction == "left":
-            motor.move_left()
-            await asyncio.sleep(0.7)
-        elif direction == "right":
-            motor.move_right()
-            await asyncio.sleep(0.7)
-        else:
-            motor.stop()
-        
-        await ipc.send({"type":"log", "command": "Robot moved "+direction})
-        motor.stop()
+    # hold-to-drive: continuous motion while the UI repeats a key, deadman stop, see Teleop.py
+    await teleop.run(motor_queue, ipc)
 
 async def web_cmd_listner():
 
@@ -75,7 +55,8 @@ async def web_cmd_listner():
         cmd_type = msg.get("type")
         #Expected that motor commands always send in manual mode
         if cmd_type == "motor":
-            await motor_queue.put(msg)
+            #receive time, for stale command dropping and key-to-wheel latency
+            await motor_queue.put((msg, time.perf_counter_ns()))
         elif cmd_type == "mode":
             cmd = msg.get("command")
             await ipc.send({"type": "mode", "command":cmd})
@@ -88,6 +69,13 @@ async def web_cmd_listner():
                 await ipc.send({"type":"log", "command":"Unknown Mode requested"})        
         elif cmd_type == "find":
             await handler(msg.get("command"))
+        elif cmd_type == "model":
+            #hot swap the detector used by a mode, e.g. {"type":"model","mode":"find","command":"yolov8s"}
+            try:
+                registry.set_mode_model(msg.get("mode"), msg.get("command"))
+                await ipc.send({"type":"log", "command":f"Loading {msg.get('command')} for {msg.get('mode')}"})
+            except KeyError as e:
+                await ipc.send({"type":"log", "command":str(e)})
         else:
             print("Unknown command:", msg)
 
@@ -152,7 +140,7 @@ async def handler(user_text:str):
 
             if act_cmd.get("follow"):
                 await ipc.send({"type":"log", "command":"Following Person"})
-                await mc.set_mode(ipc,"folloMe", goToTarget,"Person",ipc,True,face,40, 5)
+                await mc.set_mode(ipc,"followMe", goToTarget,"Person",ipc,True,face,40, 5)
                 
             elif targetObj:
                 print(f"Find: {targetObj}")
@@ -160,7 +148,7 @@ async def handler(user_text:str):
                 
             elif  direct_motor_command:
                 await mc.set_mode(ipc,"manual",Manual)
-                await motor_queue.put({"type": "motor", "command":direct_motor_command})
+                await motor_queue.put(({"type": "motor", "command":direct_motor_command}, time.perf_counter_ns()))
 
                                     
             # Schedule sleeping face after followup window
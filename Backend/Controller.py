@@ -15,6 +15,20 @@ class ModeController:
         self.current_mode=None
         self.current_task =None
         self.mode_lock= asyncio.Lock()
+        #callbacks notified with the new mode (None once the mode task ends)
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self, mode):
+        for callback in self.listeners:
+            callback(mode)
+
+    def _on_task_done(self, task):
+        #only a task that finished on its own (not replaced) puts the robot back to idle
+        if task is self.current_task and not task.cancelled():
+            self._notify(None)
 
     async def set_mode(self,ipc, mode:str, task, *args):     
         #To ensure serilized behaviour of mode changes
@@ -34,8 +48,10 @@ class ModeController:
                 
             #switch/set mode
             self.current_mode = mode
+            self._notify(mode)
             
             self.current_task = asyncio.create_task(task(*args))
+            self.current_task.add_done_callback(self._on_task_done)
 
 
 # To control how commands are given to robot (web or voice)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import DETECT_MANUAL_HZ
+
+# Detection rate per mode (Hz)
+#   OFF  -> no detection at all (idle, nothing needs the camera)
+#   FULL -> detection runs whenever a behaviour asks for it
+#   >0   -> background loop at that rate (manual mode UI overlays)
+OFF = 0.0
+FULL = float("inf")
+
+MODE_RATES = {
+    None: OFF,
+    "manual": DETECT_MANUAL_HZ,
+    "find": FULL,
+    "followMe": FULL,
+}
+
+
+class DetectorDutyCycle:
+    """
+    Switches YOLO on/off based on ModeController.current_mode so the CPU is
+    left for STT, TTS and the face whenever no behaviour needs detection.
+    """
+
+    def __init__(self, rates: Dict[Optional[str], float] = MODE_RATES):
+        self.rates = dict(rates)
+        self.mode: Optional[str] = None
+        self.rate = OFF
+        self._changed = asyncio.Event()
+        self._changed_at = 0.0
+
+        # Telemetry
+        self.transitions: List[Dict] = []
+        self.inferences: Dict[Optional[str], int] = {}
+        self.busy_s: Dict[Optional[str], float] = {}
+
+    # Registered as a ModeController listener (called with None when the mode task ends)
+    def set_mode(self, mode: Optional[str]):
+        self.mode = mode
+        self.rate = self.rates.get(mode, FULL)
+        self._changed_at = time.perf_counter()
+        self._changed.set()
+        print(f"[Detection] duty cycle -> {mode}: {self._rate_str()}")
+
+    def allowed(self) -> bool:
+        """Whether an on demand detection may run now."""
+        return self.rate != OFF
+
+    def record_inference(self, seconds: float):
+        """Called by the detection functions after every model call."""
+        self.inferences[self.mode] = self.inferences.get(self.mode, 0) + 1
+        self.busy_s[self.mode] = self.busy_s.get(self.mode, 0.0) + seconds
+
+    def stats(self) -> Dict:
+        last = self.transitions[-1] if self.transitions else None
+        return {
+            "mode": self.mode,
+            "rate": self._rate_str(),
+            "inferences": dict(self.inferences),
+            "busy_s": {m: round(s, 3) for m, s in self.busy_s.items()},
+            "last_transition_ms": last["ms"] if last else None,
+        }
+
+    def _rate_str(self) -> str:
+        if self.rate == OFF:
+            return "off"
+        if self.rate == FULL:
+            return "full"
+        return f"{self.rate:g} Hz"
+
+    def _ack_transition(self):
+        # Time from the mode change to the loop applying the new duty cycle
+        ms = (time.perf_counter() - self._changed_at) * 1000
+        self.transitions.append({"mode": self.mode, "rate": self._rate_str(), "ms": round(ms, 3)})
+        del self.transitions[:-20]
+        self._changed.clear()
+
+    async def run(self, ipc, detect: Callable[[], Awaitable[List[Dict]]]):
+        """
+        Background loop for the low rate modes. Publishes the detected
+        objects to the UI the same way findDirection does.
+        """
+        while True:
+            if self._changed.is_set():
+                self._ack_transition()
+
+            # off or full: nothing to do here, sleep until the mode changes
+            if self.rate in (OFF, FULL):
+                await self._changed.wait()
+                continue
+
+            started = time.perf_counter()
+            objects = await detect()
+            await ipc.send({"type": "objects", "command": [o.get("name") for o in objects]})
+
+            # wake up early if the mode changes mid period
+            period = 1.0 / self.rate
+            try:
+                await asyncio.wait_for(self._changed.wait(), max(0.0, period - (time.perf_counter() - started)))
+            except asyncio.TimeoutError:
+                pass
+
+
+# Single instance shared by all modules (same as camera)
+duty_cycle = DetectorDutyCycle()
+
+
+#Test
+async def main():
+    class PrintIpc:
+        async def send(self, obj):
+            print("sent:", obj)
+
+    async def fake_detect():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.05)
+        duty_cycle.record_inference(time.perf_counter() - t0)
+        return [{"name": "cup"}]
+
+    task = asyncio.create_task(duty_cycle.run(PrintIpc(), fake_detect))
+    for mode in ["manual", "find", None, "manual"]:
+        duty_cycle.set_mode(mode)
+        await asyncio.sleep(2.2)
+    task.cancel()
+    print(duty_cycle.stats())
+    print(duty_cycle.transitions)
+
+if __name__ == "__main__":
+    asyncio.run(main())
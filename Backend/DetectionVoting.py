@@ -0,0 +1,90 @@
+"""
+DetectionVoting.py - Temporal confirmation of detections
+=========================================================
+
+A single frame is not enough evidence (false positives make the robot
+drive to nothing) but always taking M frames wastes inferences. Votes are
+accumulated frame by frame, weighted by confidence, and the decision is
+taken as soon as the evidence is decisive:
+
+  - a frame containing the target adds its best confidence
+  - a frame without it subtracts MISS_WEIGHT
+  - found once the score reaches ACCEPT, not found once it drops to
+    REJECT or ACCEPT can no longer be reached in the remaining frames
+
+With the defaults a confident detection (>= 0.8) is accepted on the first
+frame, a weak one needs a second frame, and two misses reject.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ACCEPT = 0.8
+REJECT = -0.6
+MISS_WEIGHT = 0.35
+MAX_FRAMES = 5
+
+# Inferences used per decision, reported by findDirection
+stats = {"decisions": 0, "found": 0, "inferences": 0}
+
+
+class DetectionVote:
+    def __init__(self, target: str, accept: float = ACCEPT, reject: float = REJECT,
+                 miss_weight: float = MISS_WEIGHT, max_frames: int = MAX_FRAMES):
+        self.target = target.strip().casefold()
+        self.accept = accept
+        self.reject = reject
+        self.miss_weight = miss_weight
+        self.max_frames = max_frames
+        self.score = 0.0
+        self.frames = 0
+
+    def add(self, objects: List[Dict[str, Any]]) -> Optional[bool]:
+        """Adds one frame of detections. Returns True/False once decided, None to keep going."""
+        self.frames += 1
+        best = max((o.get("confidence", 1.0) for o in objects
+                    if o.get("name", "").strip().casefold() == self.target), default=0.0)
+        self.score += best if best > 0 else -self.miss_weight
+
+        if self.score >= self.accept:
+            return True
+        remaining = self.max_frames - self.frames
+        # each remaining frame can add at most 1.0 (full confidence)
+        if self.score <= self.reject or self.score + remaining < self.accept:
+            return False
+        return None
+
+
+async def confirm(target: str, detect: Callable[[], Awaitable[List[Dict[str, Any]]]],
+                  **kwargs) -> Tuple[bool, List[str], int]:
+    """
+    Runs detect() until the vote is decisive.
+
+    Returns (found, names seen in the last frame, inferences used)
+    """
+    vote = DetectionVote(target, **kwargs)
+    decision = None
+    names: List[str] = []
+    while decision is None:
+        objects = await detect()
+        names = [o.get("name") for o in objects]
+        decision = vote.add(objects)
+
+    stats["decisions"] += 1
+    stats["found"] += int(decision)
+    stats["inferences"] += vote.frames
+    return decision, names, vote.frames
+
+
+#Test
+if __name__ == "__main__":
+    import asyncio
+
+    def frames(*confs):
+        seq = iter([[{"name": "cup", "confidence": c}] if c else [] for c in confs])
+        async def detect():
+            return next(seq)
+        return detect
+
+    for confs in [(0.9,), (0.5, 0.6), (0, 0), (0.3, 0, 0, 0, 0), (0.4, 0.2, 0.3, 0, 0)]:
+        print(confs, asyncio.run(confirm("cup", frames(*confs))))
+    print(stats)
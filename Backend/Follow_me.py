@@ -1,11 +1,15 @@
 import asyncio
 import MotorControl as motor
 import ObstaclePrediction as sensor
+from MotionExecutor import executor
+from Clock import clock
 from obj_detection_k import object_track
 from IpcClient import WebRTC
 from Face import EMOTION_MAP, RobotFace
 from robot_utils import speak
 from voice_listener import set_muted
+from config import SENSOR_RANGE_CM
+from SensorSampler import sampler
 
 class RecurringPattern:
     """Detects if robot is stuck in a recurring movement pattern"""
@@ -40,6 +44,8 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
     SAFE_DISTANCE = safeD  # cm - minimum safe distance from target
     DISTANCE_TOLERANCE = 10  # cm - tolerance range for safe distance
     MAX_LOST_FRAMES = maxF
+    # only distances up to a bit past the follow zone matter, shorter echo waits
+    sensor.set_range(SAFE_DISTANCE + DISTANCE_TOLERANCE + 30)
 
     try:      
         while True:
@@ -67,17 +73,15 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
                     await ipc.send({"type":"log", "command": f"{target} lost. Stopping and searching..."})
                 
                     motor.stop()
-                    await asyncio.sleep(0.5)
+                    await clock.asleep(0.5)
                     
                     # Slow rotation to search for target
-                    motor.move_right()
-                    await asyncio.sleep(0.4)
-                    motor.stop()
+                    await executor.run("right", 0.4)
                     lost_count = 0
                 else:
                     motor.stop()
                 
-                await asyncio.sleep(0.2)
+                await clock.asleep(0.2)
                 continue
             
             # target detected - reset lost counter
@@ -87,21 +91,17 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
             if pattern.is_recurring():
                 print("Robot stuck in pattern - breaking free with large turn")
                 await ipc.send({"type":"log", "command":"Robot stuck in pattern - breaking free with large turn"})
-                motor.move_right()
-                await asyncio.sleep(1.2)
-                motor.stop()
-                await asyncio.sleep(0.3)
+                await executor.run("right", 1.2)
+                await clock.asleep(0.3)
                 continue
             
             # Emergency stop if too close
             if front_distance != -1 and front_distance < 30:
                 print("EMERGENCY: Too close! Backing up...")
                 await ipc.send({"type":"log", "command":"EMERGENCY: Too close! Backing up..."})
-                motor.move_backward()
-                await asyncio.sleep(0.5)
-                motor.stop()
+                await executor.run("backward", 0.5)
                 await pattern.add_movement(2)
-                await asyncio.sleep(0.3)
+                await clock.asleep(0.3)
                 continue
             
             # Main decision logic based on direction and distance
@@ -113,21 +113,17 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
                 # Check if turn is significant enough
                 print("target on LEFT - turning left")
                 await ipc.send({"type":"log", "command":f"{target} on LEFT - turning left"})
-                motor.move_left()
-                await asyncio.sleep(0.2)
-                motor.stop()
+                await executor.run("left", 0.2)
                 await pattern.add_movement(0)
-                await asyncio.sleep(0.05)
+                await clock.asleep(0.05)
             
             # target is to the RIGHT
             elif direction == "right":
                 print("target on RIGHT - turning right")
                 await ipc.send({"type":"log", "command":f"{target} on RIGHT - turning right"})
-                motor.move_right()
-                await asyncio.sleep(0.2)
-                motor.stop()
+                await executor.run("right", 0.2)
                 await pattern.add_movement(1)
-                await asyncio.sleep(0.05)
+                await clock.asleep(0.05)
             
             # target is CENTERED
             else:
@@ -138,23 +134,23 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
                 if front_distance == -1 or front_distance > (SAFE_DISTANCE + DISTANCE_TOLERANCE):
                     print(f"Moving FORWARD - distance: {front_distance}cm (target: {SAFE_DISTANCE}cm)")
                     await ipc.send({"type":"log", "command":f"Moving FORWARD - distance: {front_distance}cm ({target}: {SAFE_DISTANCE}cm)"})
-                    motor.move_forward()
-                    await asyncio.sleep(0.5)
-                    motor.stop()
+                    # slower when close to the safe distance, full speed when far / not seen
+                    gap = 60 if front_distance == -1 else front_distance - SAFE_DISTANCE
+                    # shorter step when the target gap closes fast (time to collision)
+                    step = sampler.history.step_time("front", SAFE_DISTANCE, 0.5, longest=0.8)
+                    await executor.run("forward", step, speed=min(1.0, max(0.4, gap / 60)))
                     await pattern.add_movement(-1)
                 
                 # target too close - move backward
                 elif front_distance < (SAFE_DISTANCE - DISTANCE_TOLERANCE):
                     print(f"Moving BACKWARD - distance: {front_distance}cm (target: {SAFE_DISTANCE}cm)")
                     await ipc.send({"type":"log", "command":f"Moving BACKWARD - distance: {front_distance}cm ({target}: {SAFE_DISTANCE}cm)"})
-                    motor.move_backward()
-                    await asyncio.sleep(0.5)
-                    motor.stop()
+                    await executor.run("backward", 0.5)
                     await pattern.add_movement(2)
                 
                 # target at safe distance - stay put
                 else:
-                    await asyncio.sleep(0.3)
+                    await clock.asleep(0.3)
                     if not isFollow:
                         return 
                     print(f"MAINTAINING POSITION - distance: {front_distance}cm (safe zone)")
@@ -164,13 +160,15 @@ async def goToTarget( target:str, ipc:WebRTC, isFollow:bool, face, safeD,maxF):
 
 
                 
-                await asyncio.sleep(0.05)
+                await clock.asleep(0.05)
             
             # Small delay between iterations
-            await asyncio.sleep(0.05)
+            await clock.asleep(0.05)
     
     except KeyboardInterrupt:
         print(f"\n\nStopping {target} follow()")
+    finally:
+        sensor.set_range(SENSOR_RANGE_CM)
 
 
 
@@ -0,0 +1,248 @@
+"""
+FrontierExplorer.py - Frontier-based exploration on the occupancy grid
+=======================================================================
+
+Drives toward what the robot has not seen yet instead of reacting to the
+nearest wall. Each step:
+
+  1. passable cells = free cells at least EXPLORE_CLEARANCE_CM away from
+     anything occupied (the robot's own footprint always counts as free)
+  2. a wavefront (breadth first, 8-connected) from the robot's cell gives
+     the number of steps to every reachable cell
+  3. reachable frontier regions (free cells next to unknown ones) are
+     scored by size against route length, the best one is the goal
+  4. the route is walked back down the wavefront and shortened to straight
+     legs; the robot turns onto the first leg and drives up to
+     EXPLORE_STEP_CM of it
+
+Then the caller looks around (object search) and asks for the next step,
+which replans on the updated map. Goals the robot makes no progress
+toward are blacklisted so it does not keep pushing into the same corner.
+
+Metrics: free area mapped per minute since start(), time to find per
+search, plan time histogram.
+
+Usage:
+    from FrontierExplorer import explorer
+    asyncio.create_task(grid.run())      # the map must be kept up to date
+    explorer.start()
+    while await explorer.step():
+        ...                              # look around
+    explorer.found()                     # records time to find
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from Clock import clock
+from MotionExecutor import executor
+from OccupancyGrid import grid
+from Odometry import odometry
+from PathPlanner import ROBOT_RADIUS_CM, drive_leg, shorten
+from SensorHealth import Histogram
+from config import EXPLORE_CLEARANCE_CM, EXPLORE_STEP_CM
+
+MIN_REGION_CELLS = 3
+MIN_GOAL_CM = 25           # closer frontiers are in the sensors' blind gaps, turning shows them
+SIZE_WEIGHT = 2.0          # route cells a frontier cell is worth
+MAX_WAVE_STEPS = 600
+NO_PROGRESS_CM = 5
+NO_PROGRESS_STEPS = 3      # steps without getting closer before a goal is given up
+BLACKLIST_RADIUS_CM = 25
+LOOK_AROUND_DEG = 90       # turn per look when no frontier is reachable, a full turn before giving up
+PLAN_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+NEIGHBOURS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+KERNEL = np.ones((3, 3), np.uint8)
+
+
+def wavefront(passable: np.ndarray, start: Tuple[int, int], max_steps: int = MAX_WAVE_STEPS) -> np.ndarray:
+    """Steps from start to every passable cell over 8-connected moves (-1 = unreachable)."""
+    dist = np.full(passable.shape, -1, dtype=np.int32)
+    if not passable[start]:
+        return dist
+    dist[start] = 0
+    front = np.zeros(passable.shape, dtype=np.uint8)
+    front[start] = 1
+    reached = front.astype(bool)
+    for step in range(1, max_steps + 1):
+        new = cv2.dilate(front, KERNEL).astype(bool) & passable & ~reached
+        if not new.any():
+            break
+        dist[new] = step
+        reached |= new
+        front = new.astype(np.uint8)
+    return dist
+
+
+def descend(dist: np.ndarray, goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Route from the wavefront's start to goal as cells, straight moves preferred."""
+    rows, cols = dist.shape
+    path = [goal]
+    r, c = goal
+    while dist[r, c] > 0:
+        for dr, dc in NEIGHBOURS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < rows and 0 <= nc < cols and dist[nr, nc] == dist[r, c] - 1:
+                r, c = nr, nc
+                break
+        else:
+            break
+        path.append((r, c))
+    path.reverse()
+    return path
+
+
+class FrontierExplorer:
+    def __init__(self, clearance: float = EXPLORE_CLEARANCE_CM, step_cm: float = EXPLORE_STEP_CM):
+        self.clearance = clearance
+        self.step_cm = step_cm
+        self.goal: Optional[Tuple[float, float]] = None
+        self.blacklist: List[Tuple[float, float]] = []
+        self._goal_distance = math.inf
+        self._stalled = 0
+        self._looks = 0
+        self._started = None
+        self._free_at_start = 0.0
+        self._search_started = None
+
+        # Telemetry
+        self.plans = 0
+        self.steps = 0
+        self.no_frontier = 0
+        self.given_up = 0
+        self.plan_ms = Histogram(PLAN_MS_BUCKETS)
+        self.time_to_find: List[float] = []
+
+    # ---------- metrics ----------
+    def start(self):
+        """Starts a search: the clock of coverage per minute and time to find."""
+        self._started = self._search_started = clock.now()
+        self._free_at_start = self._free_m2()
+        self.goal, self.blacklist, self._stalled, self._looks = None, [], 0, 0
+
+    def found(self) -> Optional[float]:
+        """Ends the search successfully, returns the seconds it took."""
+        if self._search_started is None:
+            return None
+        took = clock.now() - self._search_started
+        self.time_to_find.append(round(took, 1))
+        self._search_started = None
+        return took
+
+    def _free_m2(self) -> float:
+        return float(grid.free().sum()) * grid.cell ** 2 / 1e4
+
+    def coverage_per_min(self) -> float:
+        """m^2 of newly mapped free space per minute since start()."""
+        if self._started is None:
+            return 0.0
+        minutes = (clock.now() - self._started) / 60
+        return (self._free_m2() - self._free_at_start) / minutes if minutes > 0 else 0.0
+
+    # ---------- planning ----------
+    def passable(self, robot: Tuple[int, int]) -> np.ndarray:
+        passable = grid.free() & ~grid.inflated(self.clearance)
+        # the robot stands on its footprint, whatever the map says yet
+        footprint = max(1, math.ceil(ROBOT_RADIUS_CM / grid.cell))
+        r, c = robot
+        passable[max(0, r - footprint):r + footprint + 1, max(0, c - footprint):c + footprint + 1] = True
+        return passable
+
+    def _blacklisted(self, x: float, y: float) -> bool:
+        return any(math.hypot(x - bx, y - by) < BLACKLIST_RADIUS_CM for bx, by in self.blacklist)
+
+    def plan(self) -> Optional[List[Tuple[float, float]]]:
+        """World waypoints to the best reachable frontier, None when there is none."""
+        started = time.perf_counter()
+        try:
+            # the map is integrated on the event loop too, so it holds still while this runs
+            x, y, _ = odometry.pose()
+            robot = grid.to_cell(x, y)
+            rows, cols = grid.logodds.shape
+            if not (0 <= robot[0] < rows and 0 <= robot[1] < cols):
+                return None
+            passable = self.passable(robot)
+            frontier = grid.frontiers() & passable
+            dist = wavefront(passable, robot)
+            frontier &= dist * grid.cell >= MIN_GOAL_CM
+
+            count, labels, stats, _ = cv2.connectedComponentsWithStats(frontier.astype(np.uint8), connectivity=8)
+            best, best_score = None, -math.inf
+            for i in range(1, count):
+                cells = int(stats[i, cv2.CC_STAT_AREA])
+                if cells < MIN_REGION_CELLS:
+                    continue
+                members = np.argwhere(labels == i)
+                # the region's closest cell is where the robot gets to see past it
+                nearest = members[np.argmin(dist[members[:, 0], members[:, 1]])]
+                gx, gy = grid.to_world(nearest[0], nearest[1])
+                if self._blacklisted(float(gx), float(gy)):
+                    continue
+                score = SIZE_WEIGHT * cells - int(dist[nearest[0], nearest[1]])
+                if score > best_score:
+                    best, best_score = (int(nearest[0]), int(nearest[1])), score
+            if best is None:
+                return None
+            legs = shorten(passable, descend(dist, best))
+            return [tuple(float(v) for v in grid.to_world(r, c)) for r, c in legs]
+        finally:
+            self.plans += 1
+            self.plan_ms.observe((time.perf_counter() - started) * 1000)
+
+    # ---------- motion ----------
+    async def step(self) -> bool:
+        """
+        Plans and drives one leg toward the best frontier, or looks around
+        when none is reachable. False when nothing is left to explore.
+        """
+        route = self.plan()
+        if not route:
+            self.goal = None
+            # the sensors only see four narrow cones, turning fills in the gaps
+            if self._looks < 360 // LOOK_AROUND_DEG:
+                self._looks += 1
+                await executor.run("right", degrees=LOOK_AROUND_DEG)
+                return True
+            self.no_frontier += 1
+            return False
+        self._looks = 0
+        goal = route[-1]
+        x, y, _ = odometry.pose()
+        if self.goal is None or math.hypot(goal[0] - self.goal[0], goal[1] - self.goal[1]) > BLACKLIST_RADIUS_CM:
+            self.goal, self._goal_distance, self._stalled = goal, math.inf, 0
+        distance = math.hypot(goal[0] - x, goal[1] - y)
+        if distance < self._goal_distance - NO_PROGRESS_CM:
+            self._goal_distance, self._stalled = distance, 0
+        else:
+            self._stalled += 1
+            if self._stalled >= NO_PROGRESS_STEPS:
+                print(f"[Explore] no progress toward ({goal[0]:.0f}, {goal[1]:.0f}), giving it up")
+                self.blacklist.append(goal)
+                self.given_up += 1
+                self.goal = None
+                return True
+
+        await drive_leg(route[0], self.step_cm)
+        self.steps += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "coverage_m2_per_min": round(self.coverage_per_min(), 2),
+            "time_to_find_s": self.time_to_find,
+            "plans": self.plans,
+            "steps": self.steps,
+            "no_frontier": self.no_frontier,
+            "given_up": self.given_up,
+            "goal": None if self.goal is None else tuple(round(v) for v in self.goal),
+            "plan_ms": self.plan_ms.to_dict(),
+        }
+
+
+# Single instance shared by all modules
+explorer = FrontierExplorer()
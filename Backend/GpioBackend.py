@@ -0,0 +1,28 @@
+"""
+GpioBackend.py - RPi.GPIO or the simulator
+===========================================
+
+Modules driving pins import GPIO from here instead of RPi.GPIO, so the
+same code runs on the robot and in SimGPIO's simulated world
+(ROBOT_GPIO=rpi|sim|auto, see config.py).
+
+Usage:
+    from GpioBackend import GPIO, SIMULATED
+"""
+
+from config import ROBOT_GPIO
+
+SIMULATED = False
+
+if ROBOT_GPIO == "sim":
+    import SimGPIO as GPIO
+    SIMULATED = True
+elif ROBOT_GPIO == "auto":
+    try:
+        import RPi.GPIO as GPIO
+    except (ImportError, RuntimeError) as e:
+        print(f"[GPIO] RPi.GPIO unavailable ({e}), using the simulator")
+        import SimGPIO as GPIO
+        SIMULATED = True
+else:
+    import RPi.GPIO as GPIO
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+InferenceServer.py - Reference detection server for RemoteDetection
+====================================================================
+
+Run on the stronger machine (x86 box on the same network):
+    python InferenceServer.py --port 5055
+
+and on the robot:
+    export REMOTE_DETECT_ADDR=<server ip>:5055
+
+Models are looked up by name through ModelRegistry, so the same
+DETECT_MODELS configuration works on both sides.
+
+--fake-delay-ms turns it into a stand-in that does not load any model and
+answers with a fixed detection after the given delay. Used to test the
+deadline/fallback logic on one machine.
+
+A request that cannot be served (unknown model, undecodable JPEG) is
+answered with {"id", "error"}; the worker goes on with the next one.
+"""
+
+import argparse
+import queue
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from RemoteDetection import recv_msg, send_msg
+
+
+def serve(host: str, port: int, fake_delay_ms: float = None):
+    if fake_delay_ms is None:
+        from ModelRegistry import registry
+
+    # one inference worker, requests from all clients are queued in arrival order
+    jobs: "queue.Queue" = queue.Queue()
+
+    def infer(header, payload):
+        if fake_delay_ms is not None:
+            time.sleep(fake_delay_ms / 1000)
+            w, h = header.get("width", 640), header.get("height", 360)
+            return [{"name": "person", "confidence": 0.9, "xyxy": [w * 0.4, h * 0.2, w * 0.6, h * 0.9]}]
+        frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("undecodable JPEG")
+        model = registry.get(header.get("model") or registry.default)
+        detections = []
+        for r in model(frame, verbose=False):
+            for box in r.boxes:
+                detections.append({
+                    "name": model.names[int(box.cls[0])],
+                    "confidence": float(box.conf[0]),
+                    "xyxy": [float(v) for v in box.xyxy[0]],
+                })
+        return detections
+
+    def infer_worker():
+        while True:
+            conn, lock, header, payload = jobs.get()
+            started = time.perf_counter()
+            # a bad request (unknown model, broken JPEG) fails alone, the worker keeps serving
+            try:
+                detections = infer(header, payload)
+                reply = {"id": header.get("id"), "detections": detections,
+                         "infer_ms": round((time.perf_counter() - started) * 1000, 1)}
+            except Exception as e:
+                print(f"[InferenceServer] request {header.get('id')} failed: {e!r}")
+                reply = {"id": header.get("id"), "error": repr(e)}
+            try:
+                with lock:
+                    send_msg(conn, reply)
+            except OSError:
+                pass
+
+    def client(conn: socket.socket, addr):
+        print(f"[InferenceServer] client {addr}")
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        lock = threading.Lock()
+        try:
+            while True:
+                header, payload = recv_msg(conn)
+                jobs.put((conn, lock, header, payload))
+        except (ConnectionError, OSError, ValueError):
+            print(f"[InferenceServer] client {addr} gone")
+        finally:
+            conn.close()
+
+    threading.Thread(target=infer_worker, daemon=True).start()
+
+    srv = socket.create_server((host, port), reuse_port=False)
+    print(f"[InferenceServer] listening on {host}:{port}" + (" (fake)" if fake_delay_ms is not None else ""))
+    try:
+        while True:
+            conn, addr = srv.accept()
+            threading.Thread(target=client, args=(conn, addr), daemon=True).start()
+    except KeyboardInterrupt:
+        print("Stopping")
+    finally:
+        srv.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection server for RemoteDetection")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--fake-delay-ms", type=float, default=None,
+                        help="stand-in mode: no model, fixed answer after this delay")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.fake_delay_ms)
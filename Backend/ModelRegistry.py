@@ -0,0 +1,201 @@
+"""
+ModelRegistry.py - On demand detector models with a memory budget
+==================================================================
+
+Different modes want different detectors (tiny model to follow a person,
+bigger one to search small objects). Models are loaded when first needed
+and kept in an LRU; the least recently used ones are dropped once the
+loaded models exceed DETECT_RSS_BUDGET_MB. Models assigned to a mode (or
+the default) are never dropped. Relative weight paths are taken from ROOT,
+whatever directory main.py was started from.
+
+A model's footprint is the process RSS growth measured while loading it.
+Newly selected models are loaded and warmed up (one dummy inference) in a
+background thread, the mode keeps using its previous model until then, so
+models can be swapped per mode while main.py keeps running.
+"""
+
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import ROOT, DETECT_MODELS, DETECT_MODE_MODELS, DETECT_DEFAULT_MODEL, DETECT_RSS_BUDGET_MB
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (Linux), 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ModelRegistry:
+    def __init__(self, models: Dict[str, str] = DETECT_MODELS,
+                 mode_models: Dict[str, str] = DETECT_MODE_MODELS,
+                 default: str = DETECT_DEFAULT_MODEL,
+                 budget_mb: float = DETECT_RSS_BUDGET_MB):
+        # name -> weights path (ROOT / path is path itself when absolute)
+        self.models = {name: str(ROOT / path) for name, path in models.items()}
+        self.mode_models = dict(mode_models)  # mode -> name
+        self.default = default
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.mode: Optional[str] = None
+
+        self._loaded: "OrderedDict[str, YOLO]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.RLock()
+
+        # Telemetry
+        self.load_s: Dict[str, float] = {}
+        self.warm_s: Dict[str, float] = {}
+        self.evictions = 0
+
+    # ---------- lookup ----------
+    def name_for(self, mode: Optional[str]) -> str:
+        return self.mode_models.get(mode, self.default)
+
+    def active(self):
+        """Model for the current mode (loads it if needed)."""
+        return self.get(self.name_for(self.mode))
+
+    def get(self, name: str):
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            pending = self._loading.get(name)
+
+        # already being loaded in the background, wait for it instead of loading twice
+        if pending is not None:
+            pending.wait()
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    return self._loaded[name]
+
+        return self._load(name, warm=False)
+
+    # ---------- loading ----------
+    def _load(self, name: str, warm: bool):
+        if name not in self.models:
+            raise KeyError(f"Unknown detector model '{name}', known: {list(self.models)}")
+
+        # imported on first use: off the robot (simulator, build box) nothing loads a model
+        from ultralytics import YOLO
+        rss_before = current_rss()
+        started = time.perf_counter()
+        model = YOLO(self.models[name])
+        self.load_s[name] = round(time.perf_counter() - started, 3)
+
+        if warm:
+            started = time.perf_counter()
+            model(np.zeros((320, 320, 3), dtype=np.uint8), verbose=False)
+            self.warm_s[name] = round(time.perf_counter() - started, 3)
+
+        with self._lock:
+            self._loaded[name] = model
+            self._loaded.move_to_end(name)
+            self._sizes[name] = max(0, current_rss() - rss_before)
+            self._evict(keep=name)
+        print(f"[Models] loaded {name} ({self._sizes[name] / 2**20:.0f} MB) in {self.load_s[name]}s")
+        return model
+
+    def _evict(self, keep: str):
+        # drop least recently used models until the loaded ones fit the budget,
+        # never one a mode is assigned to: it would just be loaded again
+        pinned = set(self.mode_models.values()) | {self.default, self.name_for(self.mode), keep}
+        while sum(self._sizes.get(n, 0) for n in self._loaded) > self.budget:
+            name = next((n for n in self._loaded if n not in pinned), None)
+            if name is None:
+                print(f"[Models] assigned models exceed the {self.budget / 2**20:.0f} MB budget, keeping them")
+                break
+            del self._loaded[name]
+            self._sizes.pop(name, None)
+            self.evictions += 1
+            print(f"[Models] evicted {name} (over {self.budget / 2**20:.0f} MB budget)")
+        gc.collect()
+
+    def prefetch(self, name: str, on_ready=None) -> threading.Event:
+        """Loads and warms a model in a background thread. Returns an Event set when ready."""
+        with self._lock:
+            if name in self._loaded:
+                ready = threading.Event()
+                ready.set()
+                if on_ready:
+                    on_ready()
+                return ready
+            if name in self._loading:
+                return self._loading[name]
+            ready = self._loading[name] = threading.Event()
+
+        def worker():
+            try:
+                self._load(name, warm=True)
+                if on_ready:
+                    on_ready()
+            except Exception as e:
+                print(f"[Models] failed to load {name}: {e}")
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+                ready.set()
+
+        threading.Thread(target=worker, daemon=True, name=f"load-{name}").start()
+        return ready
+
+    # ---------- mode handling ----------
+    # Registered as a ModeController listener
+    def set_mode(self, mode: Optional[str]):
+        self.mode = mode
+        if mode is not None:
+            self.prefetch(self.name_for(mode))
+
+    def set_mode_model(self, mode: str, name: str) -> threading.Event:
+        """
+        Hot swap the model used by a mode. The mode keeps its old model
+        until the new one is loaded and warmed.
+        """
+        if name not in self.models:
+            raise KeyError(f"Unknown detector model '{name}', known: {list(self.models)}")
+
+        def swap():
+            self.mode_models[mode] = name
+            print(f"[Models] {mode} now uses {name}")
+
+        return self.prefetch(name, on_ready=swap)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "active": self.name_for(self.mode),
+                "loaded": {n: round(self._sizes.get(n, 0) / 2**20, 1) for n in self._loaded},
+                "budget_mb": round(self.budget / 2**20, 1),
+                "rss_mb": round(current_rss() / 2**20, 1),
+                "load_s": dict(self.load_s),
+                "warm_s": dict(self.warm_s),
+                "evictions": self.evictions,
+            }
+
+
+# Single instance shared by all modules
+registry = ModelRegistry()
+
+
+#Test
+if __name__ == "__main__":
+    registry.set_mode("followMe")
+    print(type(registry.active()).__name__, registry.stats())
+    for name in registry.models:
+        registry.set_mode_model("find", name).wait()
+    registry.set_mode("find")
+    registry.active()
+    print(registry.stats())
@@ -0,0 +1,219 @@
+"""
+MotionExecutor.py - Timed / distance motion commands with guaranteed stop
+=========================================================================
+
+Behaviours used to do `motor.move_x(); await asyncio.sleep(t); motor.stop()`.
+When ModeController cancelled the task during the sleep, stop() never ran
+and the robot kept driving. The executor owns the motors instead:
+
+  - run() drives for a time, a distance (cm) or an angle (deg)
+  - a new command preempts the running one at once (no stop in between)
+  - the motors always stop when the command ends, is cancelled or fails
+    (unless a newer command has taken over)
+  - command-to-GPIO latency is recorded (issued_ns lets callers include
+    the time a command spent in queues)
+  - turns by an angle stop on the yaw measured by VisualOdometry while it
+    tracks, and finish on time (calibration) when it loses track
+
+Usage:
+    from MotionExecutor import executor
+    await executor.run("forward", seconds=0.3)
+    await executor.run("right", degrees=90)
+    await executor.run("forward", cm=20, speed=0.6)
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+import MotorControl as motor
+from Clock import clock
+from Odometry import calibration
+from SensorHealth import Histogram
+from VisualOdometry import visual
+from config import VO_CLOSED_LOOP_TURNS, VO_STOP_LEAD_S
+
+# Command-to-GPIO latency buckets (us)
+LATENCY_US_BUCKETS = [50, 100, 250, 500, 1000, 5000, 20000, 100000]
+
+MOVES = {
+    "forward": motor.move_forward,
+    "backward": motor.move_backward,
+    "left": motor.move_left,
+    "right": motor.move_right,
+}
+# Closed-loop turns
+TURN_POLL_S = 0.01
+TURN_TIMEOUT = 2.0  # give up after this many times the timed duration
+TURN_SIGN = {"left": 1, "right": -1}  # counter-clockwise positive, like VisualOdometry
+
+# drive(linear, angular) equivalent of each move, for speeds below 1
+VELOCITIES = {
+    "forward": (1, 0),
+    "backward": (-1, 0),
+    "left": (0, 1),
+    "right": (0, -1),
+}
+
+
+class MotionExecutor:
+    def __init__(self):
+        self._generation = 0
+        self._preempt: Optional[asyncio.Event] = None
+        self.last_start_ns = 0  # when the last command's pins were written
+
+        # Telemetry
+        self.commands = 0
+        self.completed = 0
+        self.preempted = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.closed_loop_turns = 0
+        self.turn_fallbacks = 0  # tracking lost mid turn, finished on time
+        self.turn_timeouts = 0
+        self.latency_us = Histogram(LATENCY_US_BUCKETS)
+
+    @staticmethod
+    def duration(action: str, seconds=None, cm=None, degrees=None, speed: float = 1.0) -> float:
+        """Seconds a command runs for, from a time, a distance or an angle."""
+        if seconds is not None:
+            return seconds
+        # calibrated constants of this robot, see Calibration.py
+        if cm is not None:
+            return calibration.seconds_for_cm(cm, speed)
+        if degrees is not None:
+            return calibration.seconds_for_deg(degrees, speed)
+        raise ValueError(f"{action}: one of seconds, cm or degrees is needed")
+
+    def _start(self, action: str, speed: float):
+        if action == "stop":
+            motor.stop()
+        elif speed >= 1:
+            MOVES[action]()
+        else:
+            linear, angular = VELOCITIES[action]
+            motor.drive(linear * speed, angular * speed)
+
+    async def run(self, action: str, seconds=None, cm=None, degrees=None,
+                  speed: float = 1.0, issued_ns: Optional[int] = None) -> bool:
+        """
+        Runs one motion command. Returns True when it ran to the end, False
+        when a newer command preempted it. Cancellation propagates after the
+        motors are stopped.
+        """
+        issued_ns = time.perf_counter_ns() if issued_ns is None else issued_ns
+        if action not in MOVES and action != "stop":
+            raise ValueError(f"unknown motion {action}")
+        duration = 0.0 if action == "stop" else self.duration(action, seconds, cm, degrees, speed)
+
+        # take the motors over from the running command
+        if self._preempt is not None and not self._preempt.is_set():
+            self._preempt.set()
+            self.preempted += 1
+        self._generation += 1
+        generation = self._generation
+        preempt = self._preempt = asyncio.Event()
+        self.commands += 1
+
+        try:
+            self._start(action, speed)
+            self.last_start_ns = time.perf_counter_ns()
+            self.latency_us.observe((self.last_start_ns - issued_ns) / 1000)
+            if degrees is not None and seconds is None and action in TURN_SIGN \
+                    and VO_CLOSED_LOOP_TURNS and visual.tracking():
+                done = await self._until_turned(preempt, action, degrees, speed, duration)
+            else:
+                done = await self._until(preempt, duration)
+            self.completed += done
+            return done
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            # only the command owning the motors stops them
+            if generation == self._generation:
+                motor.stop()
+                preempt.set()
+
+    @staticmethod
+    async def _until(preempt: asyncio.Event, duration: float) -> bool:
+        """Waits out duration: True, or False when preempted first."""
+        try:
+            await asyncio.wait_for(preempt.wait(), clock.wall(duration))
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _until_turned(self, preempt: asyncio.Event, action: str, degrees: float,
+                            speed: float, duration: float) -> bool:
+        """Waits until visual odometry has seen the turn: True, or False when preempted first."""
+        self.closed_loop_turns += 1
+        sign = TURN_SIGN[action]
+        start = visual.yaw_now()
+        deadline = clock.now() + TURN_TIMEOUT * duration
+        while not preempt.is_set():
+            turned = sign * (visual.yaw_now() - start)
+            if not visual.tracking():
+                # lost track: the rest of the angle on time
+                self.turn_fallbacks += 1
+                return await self._until(preempt, calibration.seconds_for_deg(max(0.0, abs(degrees) - turned), speed))
+            # the wheels coast a little after the stop
+            if turned + max(0.0, sign * visual.yaw_rate) * VO_STOP_LEAD_S >= abs(degrees):
+                return True
+            if clock.now() > deadline:
+                self.turn_timeouts += 1
+                return True
+            await clock.asleep(TURN_POLL_S)
+        return False
+
+    def stop(self):
+        """Stops the motors and ends the running command (from sync code too)."""
+        if self._preempt is not None:
+            self._preempt.set()
+        self._generation += 1
+        motor.stop()
+
+    def stats(self) -> Dict:
+        return {
+            "commands": self.commands,
+            "completed": self.completed,
+            "preempted": self.preempted,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "closed_loop_turns": self.closed_loop_turns,
+            "turn_fallbacks": self.turn_fallbacks,
+            "turn_timeouts": self.turn_timeouts,
+            "latency_us": self.latency_us.to_dict(),
+            "driver": motor.driver.stats(),
+        }
+
+
+# Single instance shared by all modules (owns the motors)
+executor = MotionExecutor()
+
+
+#Test
+async def main():
+    motor.initialSetUp()
+    motor.setup()
+    try:
+        await executor.run("forward", seconds=0.3)
+        # preempted by the turn after 0.1 s
+        move = asyncio.create_task(executor.run("forward", seconds=1.0))
+        await asyncio.sleep(0.1)
+        print("turn completed:", await executor.run("right", degrees=45), "| forward completed:", await move)
+        # cancelled mid move: the motors stop anyway
+        move = asyncio.create_task(executor.run("backward", cm=20))
+        await asyncio.sleep(0.1)
+        move.cancel()
+        await asyncio.gather(move, return_exceptions=True)
+        print("motion after cancel:", motor.motion)
+        print(executor.stats())
+    finally:
+        motor.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
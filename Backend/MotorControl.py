@@ -1,5 +1,9 @@
-import RPi.GPIO as GPIO
+import threading
 
+from Clock import clock
+from config import MOTOR_ACCEL, MOTOR_DRIVER, MOTOR_MIN_DUTY, MOTOR_TRIM_LEFT, MOTOR_TRIM_RIGHT
+from MotorDriver import make_driver
+from Odometry import odometry
 
 # Motor pin setup
 LEFT_FORWARD = 8
@@ -8,54 +12,195 @@ RIGHT_FORWARD = 20
 RIGHT_BACKWARD = 21
 ENA = 25
 ENB = 19
+DIRECTION_PINS = [LEFT_FORWARD, LEFT_BACKWARD, RIGHT_FORWARD, RIGHT_BACKWARD]
+PWM_HZ = 3000
 
-pwm_left = None
-pwm_right = None
+# Pin access goes through a MotorDriver (RPi.GPIO/SimGPIO, lgpio), see MotorDriver.py
+driver = make_driver(MOTOR_DRIVER)
+_ready = False
+
+# Current motor command: "stop", "forward", "backward", "left" or "right"
+# (read by the sensor sampler to prioritise the direction of travel)
+motion = "stop"
+
+# Velocity control (drive): signed wheel commands in [-1, 1] per pin group,
+# ramped from the applied value to the target by a background thread
+RAMP_TICK = 0.02
+_current = [0.0, 0.0]
+_target = [0.0, 0.0]
+_lock = threading.Lock()
+_ramping = threading.Event()
+_ramp_thread = None
+
+# Directions the safety stop currently refuses ("forward"/"backward"), see SafetyStop.py
+blocked = set()
 
 def initialSetUp(): 
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
+    driver.init()
     
 def setup():
-    global pwm_left, pwm_right
-    GPIO.setup([LEFT_FORWARD, LEFT_BACKWARD, RIGHT_FORWARD, RIGHT_BACKWARD, ENA, ENB], GPIO.OUT)
+    global _ready, _ramp_thread
+    driver.setup(DIRECTION_PINS, ENA, ENB, PWM_HZ)
+    _ready = True
+
+    if _ramp_thread is None:
+        _ramp_thread = threading.Thread(target=_ramp, daemon=True, name="motor-ramp")
+        _ramp_thread.start()
+
+
+def _duty(value, trim):
+    """Duty % for a wheel command: MIN_DUTY (where the motor starts turning) .. 100, trimmed."""
+    if value == 0:
+        return 0.0
+    return min(100.0, (MOTOR_MIN_DUTY + (100 - MOTOR_MIN_DUTY) * abs(value)) * trim)
+
+
+def _apply(left, right):
+    driver.write([left > 0, left < 0, right > 0, right < 0])
+    odometry.command(left, right)
+    if _ready:
+        driver.set_duty(_duty(left, MOTOR_TRIM_LEFT), _duty(right, MOTOR_TRIM_RIGHT))
+
+
+def set_driver(new_driver):
+    """
+    Swaps the motor driver: stops, releases the old driver's motor pins (not
+    a global cleanup, the sensors keep theirs), then sets the new one up if
+    setup() already ran.
+    """
+    global driver
+    stop()
+    with _lock:
+        if _ready:
+            driver.release()
+        driver = new_driver
+        if _ready:
+            driver.init()
+            driver.setup(DIRECTION_PINS, ENA, ENB, PWM_HZ)
+
+
+def _set(left, right, ramp=False):
+    with _lock:
+        # checked under the lock so a block() from the sampler thread can't slip in between
+        travel = (left + right) / 2
+        if (travel > 0 and "forward" in blocked) or (travel < 0 and "backward" in blocked):
+            # keep the turn, drop the travel toward the blocked side
+            left, right = left - travel, right - travel
+        _target[:] = [left, right]
+        if ramp and MOTOR_ACCEL > 0:
+            _ramping.set()
+            return
+        _current[:] = _target
+        _ramping.clear()
+        _apply(left, right)
+
+
+def _ramp():
+    while True:
+        _ramping.wait()
+        last = clock.now()
+        while _ramping.is_set():
+            clock.sleep(RAMP_TICK)
+            now = clock.now()
+            step = MOTOR_ACCEL * (now - last)
+            last = now
+            with _lock:
+                if not _ramping.is_set():
+                    break
+                for i in (0, 1):
+                    _current[i] += max(-step, min(step, _target[i] - _current[i]))
+                _apply(*_current)
+                if _current == _target:
+                    _ramping.clear()
 
-    pwm_left = GPIO.PWM(ENA, 3000)
-    pwm_right = GPIO.PWM(ENB, 3000)
-    pwm_left.start(100)
-    pwm_right.start(100)
 
+def drive(linear, angular=0.0):
+    """
+    Continuous motion at variable speed, ramped at MOTOR_ACCEL.
+    linear: -1 (full reverse) .. 1 (full forward)
+    angular: -1 .. 1, > 0 turns left (counter-clockwise, like move_left)
+    Wheel commands over 1 are scaled down together, keeping the curvature.
+    """
+    global motion
+    if (linear > 0 and "forward" in blocked) or (linear < 0 and "backward" in blocked):
+        linear = 0.0
+    left, right = linear + angular, linear - angular
+    scale = max(1.0, abs(left), abs(right))
+    left, right = left / scale, right / scale
+
+    if left == 0 and right == 0:
+        motion = "stop"
+    elif abs(angular) > abs(linear):
+        motion = "left" if angular > 0 else "right"
+    else:
+        motion = "forward" if linear > 0 else "backward"
+    _set(left, right, ramp=True)
+
+# Stops and the discrete full speed moves are applied at once (no ramp)
 def stop():
-    GPIO.output([LEFT_FORWARD, LEFT_BACKWARD, RIGHT_FORWARD, RIGHT_BACKWARD], False)
+    global motion
+    motion = "stop"
+    _set(0.0, 0.0)
 
 def move_forward():
-    GPIO.output(LEFT_FORWARD, True)
-    GPIO.output(LEFT_BACKWARD, False)
-    GPIO.output(RIGHT_FORWARD, True)
-    GPIO.output(RIGHT_BACKWARD, False)
+    global motion
+    if "forward" in blocked:
+        stop()
+        return
+    motion = "forward"
+    _set(1.0, 1.0)
 
 def move_backward():
-    GPIO.output(LEFT_FORWARD, False)
-    GPIO.output(LEFT_BACKWARD, True)
-    GPIO.output(RIGHT_FORWARD, False)
-    GPIO.output(RIGHT_BACKWARD, True)
+    global motion
+    if "backward" in blocked:
+        stop()
+        return
+    motion = "backward"
+    _set(-1.0, -1.0)
 
 def move_left():
-    GPIO.output(LEFT_FORWARD, True)
-    GPIO.output(LEFT_BACKWARD, False)
-    GPIO.output(RIGHT_FORWARD, False)
-    GPIO.output(RIGHT_BACKWARD, True)
+    global motion
+    motion = "left"
+    _set(1.0, -1.0)
     
 def move_right():
-    GPIO.output(LEFT_FORWARD, False)
-    GPIO.output(LEFT_BACKWARD, True)
-    GPIO.output(RIGHT_FORWARD, True)
-    GPIO.output(RIGHT_BACKWARD, False)
+    global motion
+    motion = "right"
+    _set(-1.0, 1.0)
     
+
+def block(direction):
+    """
+    Safety stop (any thread): refuses motion toward direction from now on
+    and stops at once if the wheels are driving that way, or ramping toward
+    it. True if it stopped.
+    """
+    global motion
+    sign = 1 if direction == "forward" else -1
+    with _lock:
+        blocked.add(direction)
+        # _current: what the wheels do now (a ramp down or reversal still carries
+        # the robot forward), _target: where a ramp is heading
+        if sign * (_current[0] + _current[1]) <= 0 and sign * (_target[0] + _target[1]) <= 0:
+            return False
+        motion = "stop"
+        _target[:] = _current[:] = [0.0, 0.0]
+        _ramping.clear()
+        _apply(0.0, 0.0)
+    return True
+
+def unblock(direction):
+    with _lock:
+        blocked.discard(direction)
+
+def travel():
+    """Current forward (> 0) / backward (< 0) wheel command, -1 .. 1, ramps included."""
+    with _lock:
+        return (_current[0] + _current[1]) / 2
     
 def cleanup():
+    global _ready
     stop()
-    pwm_left.stop()
-    pwm_right.stop()
-    GPIO.cleanup()
+    _ready = False
+    driver.cleanup()
 
@@ -0,0 +1,222 @@
+"""
+MotorDriver.py - Motor driver backends for MotorControl
+========================================================
+
+MotorControl talks to one of these instead of a GPIO library, so the
+driver can be swapped (MOTOR_DRIVER, or MotorControl.set_driver) without
+touching behaviour code:
+
+  - "gpio":  the GpioBackend library, RPi.GPIO on the robot or SimGPIO
+             in simulation (ROBOT_GPIO)
+  - "lgpio": lgpio (Pi 5 / newer kernels). The four direction pins are a
+             claimed group written with one group_write, so both wheels
+             switch at the same instant
+  - "sim":   SimGPIO, whatever ROBOT_GPIO says
+
+Every driver writes the four direction pins in one call, skips duty writes
+that would not change anything and times each call (latency histograms in
+stats()). release() frees only the motor pins, so another driver can claim
+them while the sensors keep theirs; cleanup() is for shutdown.
+
+Usage:
+    from MotorDriver import make_driver
+    driver = make_driver("lgpio")
+    driver.setup([8, 7, 20, 21], 25, 19, 3000)
+    driver.write([True, False, True, False])
+    driver.set_duty(100, 100)
+"""
+
+import time
+from typing import Dict, List, Sequence
+
+from SensorHealth import Histogram
+
+# Per call latency buckets (us)
+CALL_US_BUCKETS = [5, 10, 25, 50, 100, 250, 1000, 5000]
+
+
+class MotorDriver:
+    """Base class: timing and duty caching, backends implement the _methods."""
+
+    name = "base"
+
+    def __init__(self):
+        self.pins: List[int] = []
+        self._duty = [None, None]
+        self.write_us = Histogram(CALL_US_BUCKETS)
+        self.duty_us = Histogram(CALL_US_BUCKETS)
+
+    def init(self):
+        """Library wide setup (pin numbering ...), before setup()."""
+
+    def setup(self, pins: Sequence[int], ena: int, enb: int, frequency: int):
+        self.pins = list(pins)
+        self._setup(self.pins, ena, enb, frequency)
+        self._duty = [None, None]
+
+    def write(self, levels: Sequence[bool]):
+        """Sets the direction pins (same order as setup's pins) in one call."""
+        started = time.perf_counter_ns()
+        self._write(levels)
+        self.write_us.observe((time.perf_counter_ns() - started) / 1000)
+
+    def set_duty(self, left: float, right: float):
+        if self._duty == [left, right]:
+            return
+        started = time.perf_counter_ns()
+        self._set_duty(left, right)
+        self._duty = [left, right]
+        self.duty_us.observe((time.perf_counter_ns() - started) / 1000)
+
+    def release(self):
+        """Frees the motor pins only (before another driver takes them over)."""
+        self._release()
+        self._duty = [None, None]
+
+    def cleanup(self):
+        self._cleanup()
+
+    def stats(self) -> Dict:
+        return {"driver": self.name, "write_us": self.write_us.to_dict(), "duty_us": self.duty_us.to_dict()}
+
+    # ---------- backend ----------
+    def _setup(self, pins, ena, enb, frequency):
+        raise NotImplementedError
+
+    def _write(self, levels):
+        raise NotImplementedError
+
+    def _set_duty(self, left, right):
+        raise NotImplementedError
+
+    def _release(self):
+        pass
+
+    def _cleanup(self):
+        self._release()
+
+
+class GpioDriver(MotorDriver):
+    """RPi.GPIO API (RPi.GPIO or SimGPIO): list output, software PWM on the enable pins."""
+
+    name = "gpio"
+
+    def __init__(self, gpio=None):
+        super().__init__()
+        if gpio is None:
+            from GpioBackend import GPIO as gpio
+        self.gpio = gpio
+        self.pwm_left = None
+        self.pwm_right = None
+        self.enables = []
+
+    def init(self):
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setwarnings(False)
+
+    def _setup(self, pins, ena, enb, frequency):
+        self.enables = [ena, enb]
+        self.gpio.setup(pins + self.enables, self.gpio.OUT)
+        self.pwm_left = self.gpio.PWM(ena, frequency)
+        self.pwm_right = self.gpio.PWM(enb, frequency)
+        self.pwm_left.start(100)
+        self.pwm_right.start(100)
+
+    def _write(self, levels):
+        self.gpio.output(self.pins, [bool(v) for v in levels])
+
+    def _set_duty(self, left, right):
+        if self.pwm_left is None:
+            return
+        self.pwm_left.ChangeDutyCycle(left)
+        self.pwm_right.ChangeDutyCycle(right)
+
+    def _release(self):
+        if self.pwm_left is not None:
+            self.pwm_left.stop()
+            self.pwm_right.stop()
+            self.pwm_left = self.pwm_right = None
+        if self.pins:
+            self.gpio.cleanup(self.pins + self.enables)
+
+    def _cleanup(self):
+        self._release()
+        self.gpio.cleanup()
+
+
+class LgpioDriver(MotorDriver):
+    """lgpio: direction pins as one group (single register write), tx_pwm on the enable pins."""
+
+    name = "lgpio"
+
+    def __init__(self, chip: int = 0):
+        super().__init__()
+        import lgpio
+        self.lgpio = lgpio
+        self.chip = chip
+        self.handle = None
+        self.enables = ()
+        self.frequency = 0
+
+    def _setup(self, pins, ena, enb, frequency):
+        lg = self.lgpio
+        if self.handle is None:
+            self.handle = lg.gpiochip_open(self.chip)
+        lg.group_claim_output(self.handle, pins, [0] * len(pins))
+        for pin in (ena, enb):
+            lg.gpio_claim_output(self.handle, pin, 0)
+        self.enables = (ena, enb)
+        self.frequency = frequency
+        self._set_duty(100, 100)
+
+    def _write(self, levels):
+        if self.handle is None:
+            return
+        # bit i = pins[i], the group leader identifies the group
+        bits = sum(1 << i for i, v in enumerate(levels) if v)
+        self.lgpio.group_write(self.handle, self.pins[0], bits)
+
+    def _set_duty(self, left, right):
+        for pin, duty in zip(self.enables, (left, right)):
+            self.lgpio.tx_pwm(self.handle, pin, self.frequency, duty)
+
+    def _release(self):
+        # the chip handle is this driver's own, nothing else is claimed through it
+        if self.handle is None:
+            return
+        lg = self.lgpio
+        self._write([False] * len(self.pins))
+        for pin in self.enables:
+            lg.tx_pwm(self.handle, pin, self.frequency, 0)
+            lg.gpio_free(self.handle, pin)
+        lg.group_free(self.handle, self.pins[0])
+        lg.gpiochip_close(self.handle)
+        self.handle = None
+
+
+def make_driver(name: str) -> MotorDriver:
+    if name == "lgpio":
+        return LgpioDriver()
+    if name == "sim":
+        import SimGPIO
+        return GpioDriver(SimGPIO)
+    if name == "gpio":
+        return GpioDriver()
+    raise ValueError(f"unknown motor driver {name} (gpio, lgpio or sim)")
+
+
+#Test
+if __name__ == "__main__":
+    import sys
+    driver = make_driver(sys.argv[1] if len(sys.argv) > 1 else "gpio")
+    driver.init()
+    driver.setup([8, 7, 20, 21], 25, 19, 3000)
+    try:
+        for _ in range(200):
+            driver.write([True, False, True, False])
+            driver.set_duty(60, 60)
+            driver.write([False] * 4)
+            driver.set_duty(100, 100)
+        print(driver.stats())
+    finally:
+        driver.cleanup()
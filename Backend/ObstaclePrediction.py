@@ -1,7 +1,12 @@
-import RPi.GPIO as GPIO
+from GpioBackend import GPIO
 import asyncio
+import threading
 import time
 
+from Clock import clock
+from config import ECHO_BACKEND, SENSOR_RANGE_CM
+from SensorHealth import health
+
 sensors = {
     "front": {"TRIG": 14, "ECHO": 15},
     "back": {"TRIG": 10, "ECHO": 9},
@@ -9,48 +14,296 @@ sensors = {
     "right": {"TRIG": 16, "ECHO": 26},
 }
 
+# Sensors facing away from each other can be fired at the same time
+FIRING_PAIRS = [("front", "back"), ("left", "right")]
+
+# Longest echo the HC-SR04 holds the pin high for (no object at all)
+ECHO_MAX_HIGH = 0.04
+# The echo pin goes high ~0.5 ms after the trigger
+RISE_DELAY = 0.002
+# Sound travels 34300 cm/s, halved for the round trip
+CM_PER_NS = 34300 / 2 / 1e9
+
+
+class ClearBeyond(float):
+    """
+    Reading of a sensor that saw nothing within its max range. Compares as
+    the range itself, so `d < threshold` stays False for every threshold
+    below the range (unlike -1, which means the sensor did not answer).
+    """
+
+    def __repr__(self):
+        return f"ClearBeyond({float(self):g})"
+
+    __str__ = __repr__
+
+
+class StaleDistances(dict):
+    """
+    get_all_distances() result taken from the last snapshot of a sampler
+    that stopped publishing. Same format; callers that care check for it.
+    """
+
+
+def range_timeout(range_cm):
+    """Echo duration (s) of an object at range_cm, e.g. ~6 ms for 1 m."""
+    return range_cm / CM_PER_NS / 1e9
+
+
+class EchoTimer:
+    """
+    Times one sensor's echo pulse with GPIO edge callbacks instead of
+    polling the pin. Edges are timestamped with clock.now_ns() in the
+    RPi.GPIO callback thread and the waiting ping is resolved from there,
+    so a measurement never blocks the event loop.
+
+    The wait is cut at the sensor's max range: an echo that has started but
+    not ended by then reads ClearBeyond(range), no echo at all reads -1.
+    """
+
+    def __init__(self, name, trig, echo, range_cm=SENSOR_RANGE_CM):
+        self.name = name
+        self.trig = trig
+        self.echo = echo
+        self.range_cm = range_cm
+        self.rise_ns = None
+        self.fall_ns = None
+        self._high = False
+        self._last_rise_ns = 0
+        self._low = threading.Event()
+        self._low.set()
+        self._done = threading.Event()
+        self._future = None
+        self._loop = None
+
+    @property
+    def timeout(self):
+        return range_timeout(self.range_cm) + RISE_DELAY
+
+    def _on_edge(self, channel):
+        now = clock.now_ns()
+        # the pin level tells the edge, a missed edge can't swap rise and fall
+        if GPIO.input(channel):
+            self._high = True
+            self._last_rise_ns = now
+            self._low.clear()
+            if self.rise_ns is None:
+                self.rise_ns = now
+            return
+        self._high = False
+        self._low.set()
+        if self.rise_ns is None or self.fall_ns is not None:
+            return
+        self.fall_ns = now
+        self._done.set()
+        fut, loop = self._future, self._loop
+        if fut is not None and not fut.done():
+            loop.call_soon_threadsafe(_resolve, fut, now)
+
+    def busy_for(self):
+        """
+        Seconds until the echo pin of a previous (cut short) ping is low
+        again, the sensor ignores triggers until then.
+        """
+        if self._low.is_set():
+            return 0.0
+        return max(0.0, (self._last_rise_ns - clock.now_ns()) / 1e9 + ECHO_MAX_HIGH)
+
+    def trigger(self):
+        # resync with the pin in case an edge was missed
+        self._high = bool(GPIO.input(self.echo))
+        if not self._high:
+            self._low.set()
+        self.rise_ns = None
+        self.fall_ns = None
+        self._done.clear()
+        GPIO.output(self.trig, True)
+        # 10 us trigger pulse, too short for sleep() to be precise
+        end = time.perf_counter_ns() + 10_000
+        while time.perf_counter_ns() < end:
+            pass
+        GPIO.output(self.trig, False)
+
+    def distance(self):
+        if self.rise_ns is None:
+            return -1
+        if self.fall_ns is None:
+            return ClearBeyond(self.range_cm)
+        distance = round((self.fall_ns - self.rise_ns) * CM_PER_NS, 2)
+        if distance > self.range_cm:
+            return ClearBeyond(self.range_cm)
+        return distance
+
+    async def ping(self):
+        """Trigger and await the falling edge (event loop keeps running)."""
+        busy = self.busy_for()
+        if busy:
+            await clock.asleep(busy)
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+        self.trigger()
+        try:
+            await asyncio.wait_for(self._future, clock.wall(self.timeout))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._future = None
+        return self.distance()
+
+    def ping_blocking(self):
+        """Same as ping() for callers running in their own thread."""
+        self._low.wait(clock.wall(self.busy_for()))
+        self.trigger()
+        self._done.wait(clock.wall(self.timeout))
+        return self.distance()
+
+    def wait_blocking(self, deadline_ns):
+        """Waits for an already triggered echo until deadline (clock.now_ns())."""
+        remaining = (deadline_ns - clock.now_ns()) / 1e9
+        self._done.wait(clock.wall(max(0.0, remaining)))
+        return self.distance()
+
+
+def _resolve(fut, fall_ns):
+    if not fut.done():
+        fut.set_result(fall_ns)
+
+
+timers = {name: EchoTimer(name, pins["TRIG"], pins["ECHO"]) for name, pins in sensors.items()}
+_use_edges = False
+
+# Background SensorSampler, set while it is running
+sampler = None
+# Oldest reading get_all_distances() accepts from the sampler
+# (the least prioritised sensor is refreshed every ~0.2-0.3 s)
+MAX_AGE = 0.3
+
+
+def set_range(range_cm, names=None):
+    """
+    Max range the active behaviour cares about, for all sensors or the
+    given ones. Shorter ranges mean shorter echo waits and faster sweeps.
+    """
+    for name in names or timers:
+        timers[name].range_cm = range_cm
+
+
 async def setup():
+    global _use_edges
     for s in sensors.values():
         GPIO.setup(s["TRIG"], GPIO.OUT)
         GPIO.setup(s["ECHO"], GPIO.IN)
         GPIO.output(s["TRIG"], False)
-    await asyncio.sleep(2) 
 
-async def measure_distance(TRIG, ECHO):
+    if ECHO_BACKEND == "edge":
+        try:
+            for timer in timers.values():
+                GPIO.remove_event_detect(timer.echo)
+                GPIO.add_event_detect(timer.echo, GPIO.BOTH, callback=timer._on_edge)
+            _use_edges = True
+        except RuntimeError as e:
+            # e.g. edge detection not available for the pin, keep polling
+            print(f"[Sensor] edge detection unavailable ({e}), polling echo pins")
+            _use_edges = False
+    await clock.asleep(2)
+
+
+def _measure_polling(TRIG, ECHO, range_cm=SENSOR_RANGE_CM):
     GPIO.output(TRIG, True)
-    #Trigger time need to precise where asyncio time is not
-    time.sleep(0.00001)
+    end = time.perf_counter_ns() + 10_000
+    while time.perf_counter_ns() < end:
+        pass
     GPIO.output(TRIG, False)
 
-    pulse_start = time.time()
-    timeout_start = time.time()
+    pulse_start = timeout_start = clock.now_ns()
     while GPIO.input(ECHO) == 0:
-        pulse_start = time.time()
-        if time.time() - timeout_start > 0.02:
+        pulse_start = clock.now_ns()
+        if pulse_start - timeout_start > RISE_DELAY * 1e9:
             return -1
 
-    pulse_end = time.time()
-    timeout_start = time.time()
+    pulse_end = pulse_start
+    timeout_ns = range_timeout(range_cm) * 1e9
     while GPIO.input(ECHO) == 1:
-        pulse_end = time.time()
-        if time.time() - timeout_start > 0.02:
-            return -1
+        pulse_end = clock.now_ns()
+        if pulse_end - pulse_start > timeout_ns:
+            return ClearBeyond(range_cm)
 
-    pulse_duration = pulse_end - pulse_start
-    distance = pulse_duration * 17150  # cm
-    return round(distance, 2)
+    return round((pulse_end - pulse_start) * CM_PER_NS, 2)
+
+
+def _record(name, distance, started):
+    health.record_ping(name, distance, clock.now() - started, isinstance(distance, ClearBeyond))
+    return distance
+
+
+def echo_end_ns(name):
+    """clock.now_ns() at which the last echo of a sensor ended (edge backend only)."""
+    return timers[name].fall_ns if _use_edges else None
+
+
+def ping_blocking(name):
+    """One measurement of a sensor, for callers on their own thread."""
+    started = clock.now()
+    if _use_edges:
+        return _record(name, timers[name].ping_blocking(), started)
+    pins = sensors[name]
+    return _record(name, _measure_polling(pins["TRIG"], pins["ECHO"], timers[name].range_cm), started)
+
+
+def ping_group_blocking(names):
+    """
+    Fires several sensors at the same time and waits for all echoes.
+    Only the edge backend can time simultaneous echoes, polling falls back
+    to one after the other.
+    """
+    if not _use_edges:
+        return {name: ping_blocking(name) for name in names}
+    group = [timers[name] for name in names]
+    clock.sleep(max(t.busy_for() for t in group))
+    started = clock.now()
+    for timer in group:
+        timer.trigger()
+    now = clock.now_ns()
+    return {t.name: _record(t.name, t.wait_blocking(now + int(t.timeout * 1e9)), started) for t in group}
+
+
+async def measure_distance(TRIG, ECHO):
+    timer = next(t for t in timers.values() if t.echo == ECHO)
+    started = clock.now()
+    if _use_edges:
+        return _record(timer.name, await timer.ping(), started)
+    # busy wait polling, kept off the event loop
+    loop = asyncio.get_running_loop()
+    distance = await loop.run_in_executor(None, _measure_polling, TRIG, ECHO, timer.range_cm)
+    return _record(timer.name, distance, started)
 
 
 async def get_all_distances():
+    # sampler running: latest snapshot, only waits if it is older than MAX_AGE
+    if sampler is not None and sampler.running:
+        try:
+            snap = await sampler.wait_fresh(MAX_AGE)
+            return {name: r.distance for name, r in snap.items()}
+        except asyncio.TimeoutError:
+            if sampler is not None and sampler.running:
+                # its thread still owns the timers, pinging here would overlap its triggers
+                health.record_stall()
+                print("[Sensor] sampler stalled, returning its last snapshot")
+                return StaleDistances(sampler.distances())
+            print("[Sensor] sampler stopped, sweeping directly")
+
+    started = clock.now()
     distances = {}
     for name, pins in sensors.items():
         dist = await measure_distance(pins["TRIG"], pins["ECHO"])
         i=0
         while(i<3 and dist == -1):
+            health.record_retry(name)
             dist =await measure_distance(pins["TRIG"], pins["ECHO"])
             i +=1
-        distances[name] = dist 
-        await asyncio.sleep(0.05)
+        distances[name] = dist
+        await clock.asleep(0.05)
+    health.record_sweep(clock.now() - started)
     return distances
 
 #Test
@@ -61,11 +314,11 @@ async def main():
 
         print("Setting up sensors...")
         await setup()
-        print("Setup complete.")
+        print(f"Setup complete. ({'edge callbacks' if _use_edges else 'polling'})")
 
         while True:
             distances = await get_all_distances()
-            print("Distances:", distances)
+            print("Distances:", distances, health.unhealthy() or "all ok")
             await asyncio.sleep(1)
 
     except KeyboardInterrupt:
@@ -76,4 +329,4 @@ async def main():
         print("GPIO cleaned up.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
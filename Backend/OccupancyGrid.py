@@ -0,0 +1,253 @@
+"""
+OccupancyGrid.py - Log-odds occupancy grid from the ultrasonic sensors
+=======================================================================
+
+Remembers what the sensors have seen. A NumPy float32 array of log-odds
+per GRID_CELL_CM square cell (0 = unknown, < 0 free, > 0 occupied) is
+updated from each reading through a cone inverse sensor model, placed with
+the odometry pose at the time the reading was measured:
+
+  - cells in the beam cone closer than the echo get L_FREE
+  - cells at the echo distance get L_OCC, less toward the cone's edge
+  - "clear beyond" readings only free the cone up to the range
+  - log-odds are clamped so the map can change its mind
+
+Every update touches only the window around the beam, fully vectorised.
+The grid grows in GROW_CELLS steps as the robot roams. Past GRID_MAX_CELLS
+it re-centres on the robot and forgets the parts furthest away, so memory
+stays bounded.
+
+Queries: free / occupied / unknown masks, is_free() at a point, frontier
+cells (free cells next to unknown ones) and frontier regions.
+
+Usage:
+    from OccupancyGrid import grid
+    asyncio.create_task(grid.run())      # integrates every sampler reading
+    grid.is_free(x, y)
+    grid.frontier_regions()              # [(x, y, cells), ...] largest first
+"""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from Clock import clock
+from ObstaclePrediction import ClearBeyond
+from Odometry import odometry
+from SensorHealth import Histogram
+from config import GRID_CELL_CM, GRID_MAX_CELLS
+
+# Inverse sensor model
+L_FREE = -0.4
+L_OCC = 0.85
+L_MIN, L_MAX = -4.0, 4.0
+FREE_BELOW = -0.4   # log-odds thresholds of the masks
+OCC_ABOVE = 0.4
+BEAM_HALF_ANGLE = 12.0  # deg, HC-SR04 cone (the useful part)
+MAX_RANGE = 250.0   # cm, longer echoes are too vague to map
+
+GROW_CELLS = 40
+PERIOD_S = 0.1      # integration period of run()
+UPDATE_US_BUCKETS = [50, 100, 250, 500, 1000, 2500, 5000]
+
+# sensor mounts: (forward offset cm, left offset cm, direction deg) relative to the robot centre
+SENSOR_MOUNTS = {
+    "front": (10.0, 0.0, 0.0),
+    "back": (-10.0, 0.0, 180.0),
+    "left": (0.0, 10.0, 90.0),
+    "right": (0.0, -10.0, -90.0),
+}
+
+
+class OccupancyGrid:
+    def __init__(self, cell: float = GRID_CELL_CM, max_cells: int = GRID_MAX_CELLS,
+                 size: int = 2 * GROW_CELLS):
+        self.cell = cell
+        self.max_side = max(size, int(math.sqrt(max_cells)))
+        self.logodds = np.zeros((size, size), dtype=np.float32)  # [row = y, col = x]
+        # world position (cm) of the corner of cell [0, 0]: robot starts in the middle
+        self.origin = (-size / 2 * cell, -size / 2 * cell)
+        self._lock = threading.Lock()
+
+        # Telemetry
+        self.updates = 0
+        self.grown = 0
+        self.recentred = 0
+        self.update_us = Histogram(UPDATE_US_BUCKETS)
+
+    # ---------- geometry ----------
+    def to_cell(self, x: float, y: float) -> Tuple[int, int]:
+        """(row, col) of the cell holding world point x, y."""
+        return int((y - self.origin[1]) // self.cell), int((x - self.origin[0]) // self.cell)
+
+    def to_world(self, row, col):
+        """World coordinates of cell centres (scalars or arrays)."""
+        return self.origin[0] + (np.asarray(col) + 0.5) * self.cell, self.origin[1] + (np.asarray(row) + 0.5) * self.cell
+
+    def _ensure(self, x0: float, y0: float, x1: float, y1: float, keep: Tuple[float, float]):
+        """Grows the grid to cover the box; beyond max_side re-centres on keep (the robot)."""
+        rows, cols = self.logodds.shape
+        r0, c0 = self.to_cell(x0, y0)
+        r1, c1 = self.to_cell(x1, y1)
+        if r0 >= 0 and c0 >= 0 and r1 < rows and c1 < cols:
+            return
+        # new bounds in current cell indices, grown in whole steps
+        top = min(0, r0 - GROW_CELLS if r0 < 0 else 0)
+        left = min(0, c0 - GROW_CELLS if c0 < 0 else 0)
+        bottom = max(rows, r1 + GROW_CELLS + 1 if r1 >= rows else rows)
+        right = max(cols, c1 + GROW_CELLS + 1 if c1 >= cols else cols)
+        if bottom - top > self.max_side or right - left > self.max_side:
+            # forget what is furthest from the robot
+            kr, kc = self.to_cell(*keep)
+            half = self.max_side // 2
+            if bottom - top > self.max_side:
+                top, bottom = kr - half, kr - half + self.max_side
+            if right - left > self.max_side:
+                left, right = kc - half, kc - half + self.max_side
+            self.recentred += 1
+        else:
+            self.grown += 1
+        grown = np.zeros((bottom - top, right - left), dtype=np.float32)
+        # copy the overlap of the old array into the new one
+        sr0, sc0 = max(0, top), max(0, left)
+        sr1, sc1 = min(rows, bottom), min(cols, right)
+        if sr1 > sr0 and sc1 > sc0:
+            grown[sr0 - top:sr1 - top, sc0 - left:sc1 - left] = self.logodds[sr0:sr1, sc0:sc1]
+        self.logodds = grown
+        self.origin = (self.origin[0] + left * self.cell, self.origin[1] + top * self.cell)
+
+    # ---------- updates ----------
+    def integrate(self, name: str, distance: float, pose: Optional[Tuple[float, float, float]] = None):
+        """One reading of a sensor (cm, -1 / ClearBeyond as from the sampler) at the robot pose."""
+        if distance == -1 or distance <= 0:
+            return
+        started = time.perf_counter()
+        x, y, heading = odometry.pose() if pose is None else pose
+        fwd, side, mount = SENSOR_MOUNTS[name]
+        h = math.radians(heading)
+        sx = x + fwd * math.cos(h) - side * math.sin(h)
+        sy = y + fwd * math.sin(h) + side * math.cos(h)
+        direction = h + math.radians(mount)
+        clear = isinstance(distance, ClearBeyond) or distance > MAX_RANGE
+        d = min(float(distance), MAX_RANGE)
+        tolerance = max(self.cell, 0.03 * d)
+        reach = d + (0 if clear else tolerance)
+
+        with self._lock:
+            self._ensure(sx - reach, sy - reach, sx + reach, sy + reach, keep=(x, y))
+            rows, cols = self.logodds.shape
+            r0, c0 = self.to_cell(sx - reach, sy - reach)
+            r1, c1 = self.to_cell(sx + reach, sy + reach)
+            # a re-centred grid may cut long beams
+            r0, c0, r1, c1 = max(r0, 0), max(c0, 0), min(r1, rows - 1), min(c1, cols - 1)
+            rows, cols = np.arange(r0, r1 + 1), np.arange(c0, c1 + 1)
+            cx, cy = self.to_world(rows[:, None], cols[None, :])
+            dx, dy = cx - sx, cy - sy
+            rng = np.hypot(dx, dy)
+            off = np.degrees(np.abs((np.arctan2(dy, dx) - direction + np.pi) % (2 * np.pi) - np.pi))
+            cone = off <= BEAM_HALF_ANGLE
+            update = np.where(cone & (rng < d - tolerance), L_FREE, 0.0)
+            if not clear:
+                hit = cone & (np.abs(rng - d) <= tolerance)
+                # the echo most likely came from near the beam axis
+                update = np.where(hit, L_OCC * (1 - 0.5 * (off / BEAM_HALF_ANGLE) ** 2), update)
+            window = self.logodds[r0:r1 + 1, c0:c1 + 1]
+            np.clip(window + update, L_MIN, L_MAX, out=window)
+            self.updates += 1
+        self.update_us.observe((time.perf_counter() - started) * 1e6)
+
+    def integrate_readings(self, readings) -> int:
+        """Integrates and pops every (name, Reading) queued by SensorSampler.subscribe(), returns how many."""
+        count = 0
+        while readings:
+            name, reading = readings.popleft()
+            if reading.valid:
+                # up to PERIOD_S old: where the robot was then, not now
+                self.integrate(name, reading.distance, odometry.pose_at(reading.timestamp))
+                count += 1
+        return count
+
+    async def run(self, period: float = PERIOD_S):
+        """Keeps integrating the sampler's readings (needs the sampler running)."""
+        from SensorSampler import sampler
+        readings = sampler.subscribe()
+        while True:
+            self.integrate_readings(readings)
+            await clock.asleep(period)
+
+    def clear(self):
+        with self._lock:
+            self.logodds[:] = 0
+
+    # ---------- queries ----------
+    def free(self) -> np.ndarray:
+        return self.logodds < FREE_BELOW
+
+    def occupied(self) -> np.ndarray:
+        return self.logodds > OCC_ABOVE
+
+    def unknown(self) -> np.ndarray:
+        return (self.logodds >= FREE_BELOW) & (self.logodds <= OCC_ABOVE)
+
+    def inflated(self, clearance: float) -> np.ndarray:
+        """Mask of cells within clearance (cm) of an occupied cell."""
+        radius = max(1, math.ceil(clearance / self.cell))
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+        return cv2.dilate(self.occupied().astype(np.uint8), kernel).astype(bool)
+
+    def is_free(self, x: float, y: float) -> bool:
+        r, c = self.to_cell(x, y)
+        rows, cols = self.logodds.shape
+        return 0 <= r < rows and 0 <= c < cols and bool(self.logodds[r, c] < FREE_BELOW)
+
+    def frontiers(self) -> np.ndarray:
+        """Mask of free cells with an unknown 4-neighbour (the grid's outside counts as unknown)."""
+        with self._lock:
+            free, unknown = self.free(), self.unknown()
+        edge = np.zeros_like(unknown)
+        edge[1:, :] |= unknown[:-1, :]
+        edge[:-1, :] |= unknown[1:, :]
+        edge[:, 1:] |= unknown[:, :-1]
+        edge[:, :-1] |= unknown[:, 1:]
+        edge[0, :] = edge[-1, :] = True
+        edge[:, 0] = edge[:, -1] = True
+        return free & edge
+
+    def frontier_regions(self, min_cells: int = 3) -> List[Tuple[float, float, int]]:
+        """Connected frontier regions as (x, y of the centroid, cells), largest first."""
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(self.frontiers().astype(np.uint8), connectivity=8)
+        regions = []
+        for i in range(1, count):
+            cells = int(stats[i, cv2.CC_STAT_AREA])
+            if cells >= min_cells:
+                col, row = centroids[i]
+                x, y = self.to_world(row, col)
+                regions.append((float(x), float(y), cells))
+        return sorted(regions, key=lambda r: -r[2])
+
+    def to_image(self) -> np.ndarray:
+        """Grayscale picture (free white, occupied black, unknown grey), y up."""
+        p = 1 / (1 + np.exp(-self.logodds))
+        return np.flipud((255 * (1 - p)).astype(np.uint8))
+
+    def stats(self) -> Dict:
+        free, occupied = int(self.free().sum()), int(self.occupied().sum())
+        return {
+            "shape": self.logodds.shape,
+            "kb": self.logodds.nbytes // 1024,
+            "free_m2": round(free * self.cell ** 2 / 1e4, 2),
+            "occupied_cells": occupied,
+            "updates": self.updates,
+            "grown": self.grown,
+            "recentred": self.recentred,
+            "update_us": self.update_us.to_dict(),
+        }
+
+
+# Single instance shared by all modules
+grid = OccupancyGrid()
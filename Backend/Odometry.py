@@ -0,0 +1,181 @@
+"""
+Odometry.py - Dead reckoning from the motor commands
+=====================================================
+
+MotorControl reports every wheel command it applies; the pose (x, y in cm,
+heading in degrees, counter-clockwise positive) is integrated from them
+with the robot's calibrated full-speed ground speed and turn rate. There
+are no wheel encoders, so the estimate carries an uncertainty that grows
+with the distance driven and the angle turned.
+
+The pose at each of the last POSE_HISTORY command changes is kept, so
+pose_at(t) can place a sensor reading where the robot was when it was
+measured (clock.now() timestamps, as in SensorSampler readings).
+
+The constants live in a per-robot calibration file (ROBOT_CALIBRATION,
+keyed by host name), written by Calibration.py. Without one the config
+defaults (MOTOR_CM_PER_S, MOTOR_DEG_PER_S) are used.
+
+Usage:
+    from Odometry import odometry, calibration
+    x, y, heading = odometry.pose()
+    seconds = calibration.seconds_for_cm(20)
+"""
+
+import json
+import math
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Tuple
+
+from Clock import clock
+from config import MOTOR_CM_PER_S, MOTOR_DEG_PER_S, ROBOT_CALIBRATION
+
+# Growth of the uncertainty: variance per cm driven / per degree turned
+DIST_VAR_PER_CM = 0.05 ** 2 * 100   # ~5% of the distance (1 sigma) over 1 m
+TURN_VAR_PER_DEG = 0.08 ** 2 * 90   # ~8% of the angle over 90 deg
+POSE_HISTORY = 64                   # command changes remembered for pose_at()
+
+
+class Calibration:
+    """Full speed constants of this robot, loaded from / saved to ROBOT_CALIBRATION."""
+
+    def __init__(self, path=ROBOT_CALIBRATION, robot=None):
+        self.path = path
+        self.robot = robot or socket.gethostname()
+        self.cm_per_s = MOTOR_CM_PER_S
+        self.deg_per_s = MOTOR_DEG_PER_S
+        self.calibrated = None  # time of the calibration run, None = defaults
+        self.load()
+
+    def _read_all(self) -> Dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def load(self):
+        entry = self._read_all().get(self.robot)
+        if entry:
+            self.cm_per_s = float(entry["cm_per_s"])
+            self.deg_per_s = float(entry["deg_per_s"])
+            self.calibrated = entry.get("calibrated")
+
+    def save(self, cm_per_s: float, deg_per_s: float):
+        self.cm_per_s = cm_per_s
+        self.deg_per_s = deg_per_s
+        self.calibrated = time.time()
+        robots = self._read_all()
+        robots[self.robot] = {"cm_per_s": round(cm_per_s, 2), "deg_per_s": round(deg_per_s, 2),
+                              "calibrated": self.calibrated}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(robots, f, indent=2)
+        print(f"[Odometry] calibration saved for {self.robot}: {cm_per_s:.1f} cm/s, {deg_per_s:.1f} deg/s")
+
+    def seconds_for_cm(self, cm: float, speed: float = 1.0) -> float:
+        return abs(cm) / (self.cm_per_s * speed)
+
+    def seconds_for_deg(self, degrees: float, speed: float = 1.0) -> float:
+        return abs(degrees) / (self.deg_per_s * speed)
+
+
+class Odometry:
+    def __init__(self, calibration: Calibration):
+        self.calibration = calibration
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, x: float = 0.0, y: float = 0.0, heading: float = 0.0):
+        with self._lock:
+            self.x, self.y, self.heading = x, y, heading
+            self.var_xy = 0.0       # cm^2
+            self.var_heading = 0.0  # deg^2
+            self.travelled = 0.0
+            self._command = (0.0, 0.0)
+            self._since = clock.now()
+            # (t, x, y, heading, command) at each command change, constant motion in between
+            self._history = deque([(self._since, x, y, heading, self._command)], maxlen=POSE_HISTORY)
+
+    def command(self, left: float, right: float, t: float = None):
+        """New wheel commands (-1..1 per pin group, see MotorControl) from time t on."""
+        t = clock.now() if t is None else t
+        with self._lock:
+            self._advance(t)
+            self._command = (left, right)
+            self._history.append((t, self.x, self.y, self.heading, self._command))
+
+    def _arc(self, x: float, y: float, heading: float, command: Tuple[float, float], dt: float):
+        """Pose after dt seconds of a constant command, with the distance and angle covered."""
+        left, right = command
+        d = (left + right) / 2 * self.calibration.cm_per_s * dt
+        dtheta = (left - right) / 2 * self.calibration.deg_per_s * dt
+        # arc: move along the mean heading of the step
+        mid = math.radians(heading + dtheta / 2)
+        return x + d * math.cos(mid), y + d * math.sin(mid), (heading + dtheta) % 360, d, dtheta
+
+    def _advance(self, t: float):
+        dt = t - self._since
+        self._since = t
+        left, right = self._command
+        if dt <= 0 or (left == 0 and right == 0):
+            return
+        self.x, self.y, self.heading, d, dtheta = self._arc(self.x, self.y, self.heading, self._command, dt)
+        self.travelled += abs(d)
+
+        self.var_heading += TURN_VAR_PER_DEG * abs(dtheta)
+        # heading doubt turns into lateral doubt when driving
+        self.var_xy += DIST_VAR_PER_CM * abs(d) + (d * math.radians(math.sqrt(self.var_heading))) ** 2
+
+    def pose(self) -> Tuple[float, float, float]:
+        with self._lock:
+            self._advance(clock.now())
+            return self.x, self.y, self.heading
+
+    def pose_at(self, t: float) -> Tuple[float, float, float]:
+        """
+        Pose at clock time t: integrated from the last command change
+        before t, the oldest remembered pose when t is older than the history.
+        """
+        with self._lock:
+            for since, x, y, heading, command in reversed(self._history):
+                if since <= t:
+                    x, y, heading, _, _ = self._arc(x, y, heading, command, t - since)
+                    return x, y, heading
+            _, x, y, heading, _ = self._history[0]
+            return x, y, heading
+
+    def uncertainty(self) -> Tuple[float, float]:
+        """(position sigma cm, heading sigma deg)"""
+        with self._lock:
+            self._advance(clock.now())
+            return math.sqrt(self.var_xy), math.sqrt(self.var_heading)
+
+    def stats(self) -> Dict:
+        x, y, heading = self.pose()
+        sigma_xy, sigma_heading = self.uncertainty()
+        return {"pose": (round(x, 1), round(y, 1), round(heading, 1)),
+                "sigma_cm": round(sigma_xy, 1), "sigma_deg": round(sigma_heading, 1),
+                "travelled_cm": round(self.travelled, 1)}
+
+
+# Single instances shared by all modules
+calibration = Calibration()
+odometry = Odometry(calibration)
+
+
+#Test
+if __name__ == "__main__":
+    o = Odometry(Calibration(robot="test"))
+    t = clock.now()
+    o._since = t
+    # 1 s forward, 0.75 s turning left (90 deg at 120 deg/s), 1 s forward
+    o.command(1, 1, t)
+    o.command(1, -1, t + 1.0)
+    o.command(1, 1, t + 1.75)
+    o.command(0, 0, t + 2.75)
+    print({k: v for k, v in vars(o).items() if k in ("x", "y", "heading", "var_xy", "var_heading")})
+    print("pose half way through the turn", tuple(round(v, 1) for v in o.pose_at(t + 1.375)))
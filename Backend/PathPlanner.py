@@ -0,0 +1,336 @@
+"""
+PathPlanner.py - Incremental grid path planning (D* Lite)
+==========================================================
+
+Plans routes on the occupancy grid around everything the sensors mapped,
+assuming unknown space is free. Cells within EXPLORE_CLEARANCE_CM of an
+occupied cell are blocked, moves are 8-connected (1 or sqrt 2 per cell).
+
+D* Lite searches from the goal back to the robot and keeps its g / rhs
+values between calls. When the robot moves only the heap keys shift
+(km), and when new readings block or free cells only those cells and
+their neighbours are updated and the search repaired; on a static map
+a replan expands next to nothing. When the grid grows the state is
+re-indexed and the new cells along the old edge are updated. A new goal,
+a re-centred grid or more than REPAIR_MAX_CELLS changed cells start over
+from scratch.
+
+Every plan is timed: full plans and repairs go to separate histograms,
+with the number of expanded cells, so it can be checked against the
+control rate.
+
+Usage:
+    from PathPlanner import planner, drive_leg
+    route = planner.plan((x, y), goal)   # world waypoints, None when blocked
+    await drive_leg(route[0], 40)        # turn onto the first leg, drive up to 40 cm
+"""
+
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MotionExecutor import executor
+from OccupancyGrid import grid
+from Odometry import odometry
+from SensorHealth import Histogram
+from SensorSampler import sampler
+from config import EXPLORE_CLEARANCE_CM
+
+INF = math.inf
+SQRT2 = math.sqrt(2)
+MOVES = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+         (-1, -1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (1, 1, SQRT2)]
+ROBOT_RADIUS_CM = 12.0      # footprint kept passable around the robot and the goal
+REPAIR_MAX_CELLS = 400      # more changed cells than this plan from scratch
+MAX_EXPANSIONS = 40000
+PLAN_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+MIN_TURN_DEG = 8            # smaller heading errors are driven through
+FRONT_MARGIN_CM = 20        # never drive a leg closer than this to the front echo
+
+Cell = Tuple[int, int]
+
+
+def line_clear(passable: np.ndarray, a: Cell, b: Cell) -> bool:
+    steps = max(abs(b[0] - a[0]), abs(b[1] - a[1])) * 2 + 1
+    rows = np.rint(np.linspace(a[0], b[0], steps)).astype(int)
+    cols = np.rint(np.linspace(a[1], b[1], steps)).astype(int)
+    return bool(passable[rows, cols].all())
+
+
+def shorten(passable: np.ndarray, path: List[Cell]) -> List[Cell]:
+    """Keeps only the cells where the route has to bend (line of sight)."""
+    if len(path) < 3:
+        return path[1:]
+    legs, i = [], 0
+    while i < len(path) - 1:
+        j = len(path) - 1
+        while j > i + 1 and not line_clear(passable, path[i], path[j]):
+            j -= 1
+        legs.append(path[j])
+        i = j
+    return legs
+
+
+async def drive_leg(waypoint: Tuple[float, float], max_cm: float) -> float:
+    """Turns toward waypoint and drives up to max_cm of the way, returns the cm commanded."""
+    x, y, heading = odometry.pose()
+    wx, wy = waypoint
+    bearing = math.degrees(math.atan2(wy - y, wx - x))
+    turn = (bearing - heading + 180) % 360 - 180
+    if abs(turn) >= MIN_TURN_DEG:
+        await executor.run("left" if turn > 0 else "right", degrees=abs(turn))
+    leg = min(math.hypot(wx - x, wy - y), max_cm)
+    # the map may lag behind: keep clear of what the front sensor sees right now
+    front = sampler.snapshot()["front"]
+    if front.valid and front.distance != -1:
+        leg = min(leg, float(front.distance) - FRONT_MARGIN_CM)
+    if leg <= 1:
+        return 0.0
+    await executor.run("forward", cm=leg)
+    return leg
+
+
+class PathPlanner:
+    def __init__(self, clearance: float = EXPLORE_CLEARANCE_CM):
+        self.clearance = clearance
+        self.blocked: Optional[np.ndarray] = None
+        self._b: List[List[bool]] = []
+        self._origin = None         # grid origin and re-centre count the cell indices belong to
+        self._recentred = 0
+        self.start: Optional[Cell] = None
+        self.goal: Optional[Cell] = None
+        self._last: Optional[Cell] = None
+        self.km = 0.0
+        self.g: Dict[Cell, float] = {}
+        self.rhs: Dict[Cell, float] = {}
+        self._heap: List = []
+        self._open: Dict[Cell, Tuple[float, float]] = {}
+        self._expanded = 0
+        self.last: Dict = {}
+
+        # Telemetry
+        self.plans = 0
+        self.full_plans = 0
+        self.repairs = 0
+        self.no_route = 0
+        self.plan_ms = Histogram(PLAN_MS_BUCKETS)
+        self.repair_ms = Histogram(PLAN_MS_BUCKETS)
+
+    # ---------- cost map ----------
+    def _blocked_now(self, start: Cell, goal: Cell) -> np.ndarray:
+        blocked = grid.inflated(self.clearance)
+        # the robot stands on its footprint, and the goal may be the target
+        # itself: it stays reachable through its own inflation
+        for (cr, cc), radius in ((start, ROBOT_RADIUS_CM), (goal, ROBOT_RADIUS_CM + self.clearance)):
+            r = max(1, math.ceil(radius / grid.cell))
+            blocked[max(0, cr - r):cr + r + 1, max(0, cc - r):cc + r + 1] = False
+        return blocked
+
+    def _set_blocked(self, blocked: np.ndarray):
+        self.blocked = blocked
+        self._b = blocked.tolist()  # plain lists index several times faster in the inner loop
+
+    def _cost(self, u: Cell, v: Cell, step: float) -> float:
+        b = self._b
+        return INF if b[u[0]][u[1]] or b[v[0]][v[1]] else step
+
+    def _neighbours(self, u: Cell):
+        rows, cols = self.blocked.shape
+        r, c = u
+        for dr, dc, step in MOVES:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < rows and 0 <= nc < cols:
+                yield (nr, nc), step
+
+    @staticmethod
+    def _h(a: Cell, b: Cell) -> float:
+        dr, dc = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return max(dr, dc) + (SQRT2 - 1) * min(dr, dc)
+
+    # ---------- D* Lite ----------
+    def _key(self, s: Cell) -> Tuple[float, float]:
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        # rounded: sqrt 2 sums reached along different routes must tie
+        return (round(m + self._h(self.start, s) + self.km, 6), round(m, 6))
+
+    def _update(self, u: Cell):
+        if u != self.goal:
+            b, g = self._b, self.g
+            rows, cols = self.blocked.shape
+            r, c = u
+            best = INF
+            if not b[r][c]:
+                for dr, dc, step in MOVES:
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < rows and 0 <= nc < cols and not b[nr][nc]:
+                        cost = step + g.get((nr, nc), INF)
+                        if cost < best:
+                            best = cost
+            self.rhs[u] = best
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            key = self._key(u)
+            self._open[u] = key
+            heapq.heappush(self._heap, (key, u))
+        else:
+            self._open.pop(u, None)
+
+    def _compute(self):
+        heap, g, rhs = self._heap, self.g, self.rhs
+        while heap:
+            k_old, u = heap[0]
+            if self._open.get(u) != k_old:
+                heapq.heappop(heap)  # stale entry
+                continue
+            if not (k_old < self._key(self.start) or rhs.get(self.start, INF) != g.get(self.start, INF)):
+                break
+            if self._expanded >= MAX_EXPANSIONS:
+                break
+            heapq.heappop(heap)
+            self._expanded += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._open[u] = k_new
+                heapq.heappush(heap, (k_new, u))
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                del self._open[u]
+                for v, _ in self._neighbours(u):
+                    self._update(v)
+            else:
+                g[u] = INF
+                self._update(u)
+                for v, _ in self._neighbours(u):
+                    self._update(v)
+
+    def _reset(self, start: Cell, goal: Cell, blocked: np.ndarray):
+        self._set_blocked(blocked)
+        self._origin, self._recentred = grid.origin, grid.recentred
+        self.start = self._last = start
+        self.goal = goal
+        self.km = 0.0
+        self.g, self.rhs = {}, {goal: 0.0}
+        self._heap, self._open = [], {}
+        key = self._key(goal)
+        self._open[goal] = key
+        heapq.heappush(self._heap, (key, goal))
+
+    def _follow_grid(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Re-indexes the search state after the grid grew, returns the old
+        area (r0, c0, r1, c1) in the new indices. None after a re-centre,
+        which forgot cells the state may depend on.
+        """
+        if self.blocked is None or grid.recentred != self._recentred:
+            return None
+        dr = round((self._origin[1] - grid.origin[1]) / grid.cell)
+        dc = round((self._origin[0] - grid.origin[0]) / grid.cell)
+        if dr or dc:
+            def move(u):
+                return u[0] + dr, u[1] + dc
+            self.g = {move(u): v for u, v in self.g.items()}
+            self.rhs = {move(u): v for u, v in self.rhs.items()}
+            self._open = {move(u): k for u, k in self._open.items()}
+            # keys do not change: the heuristic only depends on cell differences
+            self._heap = [(k, move(u)) for k, u in self._heap]
+            self.start, self._last, self.goal = move(self.start), move(self._last), move(self.goal)
+            self._origin = grid.origin
+        rows, cols = self.blocked.shape
+        return dr, dc, dr + rows, dc + cols
+
+    def _repair(self, start: Cell, blocked: np.ndarray, old: Tuple[int, int, int, int]) -> Optional[int]:
+        """Applies the robot's move and the changed cells, None when that is worse than starting over."""
+        r0, c0, r1, c1 = old
+        before = blocked.copy()
+        before[r0:r1, c0:c1] = self.blocked
+        changed = np.argwhere(blocked != before)
+        if len(changed) > REPAIR_MAX_CELLS:
+            return None
+        self.km += self._h(self._last, start)
+        self.start = self._last = start
+        self._set_blocked(blocked)
+        dirty = set()
+        if before.shape != (r1 - r0, c1 - c0):
+            # new cells next to the old area can be reached through it now
+            rows, cols = blocked.shape
+            ring = [(r, c) for r in (r0 - 1, r1) for c in range(c0 - 1, c1 + 1)]
+            ring += [(r, c) for c in (c0 - 1, c1) for r in range(r0, r1)]
+            dirty.update((r, c) for r, c in ring if 0 <= r < rows and 0 <= c < cols)
+        for r, c in changed:
+            cell = (int(r), int(c))
+            dirty.add(cell)
+            dirty.update(v for v, _ in self._neighbours(cell))
+        for cell in dirty:
+            self._update(cell)
+        return len(changed)
+
+    def _route(self) -> Optional[List[Cell]]:
+        path, s = [self.start], self.start
+        while s != self.goal:
+            best, best_cost = None, INF
+            for v, step in self._neighbours(s):
+                cost = self._cost(s, v, step) + self.g.get(v, INF)
+                if cost < best_cost:
+                    best, best_cost = v, cost
+            if best is None or len(path) > self.blocked.size:
+                return None
+            path.append(best)
+            s = best
+        return path
+
+    # ---------- API ----------
+    def plan(self, start_xy: Tuple[float, float], goal_xy: Tuple[float, float]) -> Optional[List[Tuple[float, float]]]:
+        """World waypoints (bends only, goal last) from start to goal, None when there is no route."""
+        started = time.perf_counter()
+        rows, cols = grid.logodds.shape
+        start = grid.to_cell(*start_xy)
+        if not (0 <= start[0] < rows and 0 <= start[1] < cols):
+            return None
+        # goals beyond the map are aimed at through its edge
+        goal = grid.to_cell(*goal_xy)
+        goal = (min(max(goal[0], 0), rows - 1), min(max(goal[1], 0), cols - 1))
+
+        blocked = self._blocked_now(start, goal)
+        changed = None
+        old = self._follow_grid()
+        if old is not None and goal == self.goal:
+            changed = self._repair(start, blocked, old)
+        if changed is None:
+            self._reset(start, goal, blocked)
+        self._expanded = 0
+        self._compute()
+        cells = self._route() if self.g.get(start, INF) < INF else None
+
+        ms = (time.perf_counter() - started) * 1000
+        self.plans += 1
+        if changed is None:
+            self.full_plans += 1
+            self.plan_ms.observe(ms)
+        else:
+            self.repairs += 1
+            self.repair_ms.observe(ms)
+        self.last = {"kind": "full" if changed is None else "repair", "changed": changed,
+                     "expanded": self._expanded, "ms": round(ms, 2),
+                     "cost_cm": None if cells is None else round(self.g[start] * grid.cell)}
+        if cells is None:
+            self.no_route += 1
+            return None
+        return [tuple(float(v) for v in grid.to_world(r, c)) for r, c in shorten(~self.blocked, cells)]
+
+    def stats(self) -> Dict:
+        return {
+            "plans": self.plans,
+            "full_plans": self.full_plans,
+            "repairs": self.repairs,
+            "no_route": self.no_route,
+            "last": self.last,
+            "plan_ms": self.plan_ms.to_dict(),
+            "repair_ms": self.repair_ms.to_dict(),
+        }
+
+
+# Single instance shared by all modules
+planner = PathPlanner()
@@ -0,0 +1,116 @@
+"""
+RangeFilter.py - Outlier rejection for ultrasonic readings
+===========================================================
+
+One spurious echo used to be enough to trigger a full back-up-and-turn.
+Each sensor's sample stream goes through:
+
+  1. jump rejection: a sample further from the current estimate than the
+     robot/obstacles can physically move since the last sample is held
+     back. If the next samples agree with it (the robot turned and really
+     faces something else) it is accepted and the window restarts there.
+  2. median of the last K accepted samples, with their variance.
+
+No-echo samples (-1) are skipped; only after K of them in a row does the
+filtered reading become invalid.
+"""
+
+import statistics
+from collections import deque
+from typing import Optional, Tuple
+
+from ObstaclePrediction import ClearBeyond
+
+WINDOW = 3            # median of K
+MAX_RATE = 200.0      # cm/s, robot (~45 cm/s) plus a walking person
+JUMP_MARGIN = 8.0     # cm, sensor noise allowed on top of MAX_RATE * dt
+CONFIRM = 2           # agreeing outliers that make a real jump
+
+
+class RangeFilter:
+    def __init__(self, window: int = WINDOW, max_rate: float = MAX_RATE,
+                 margin: float = JUMP_MARGIN, confirm: int = CONFIRM):
+        self.window = deque(maxlen=window)
+        self.max_rate = max_rate
+        self.margin = margin
+        self.confirm = confirm
+        self._pending = []
+        self._last_t: Optional[float] = None
+        self._invalid = 0
+        self._range: Optional[float] = None
+
+        # Telemetry
+        self.rejected = 0
+        self.accepted = 0
+
+    def estimate(self) -> float:
+        if not self.window or self._invalid >= self.window.maxlen:
+            return -1
+        value = statistics.median(self.window)
+        # every sample past the range: still "clear beyond"
+        if self._range is not None and value >= self._range:
+            return ClearBeyond(self._range)
+        return round(value, 2)
+
+    def variance(self) -> float:
+        if len(self.window) < 2:
+            return 0.0
+        return round(statistics.pvariance(self.window), 2)
+
+    def _accepted_past_range(self, distance: float):
+        # a real echo past the last range: the sensor's range was raised (set_range).
+        # The old "clear beyond" samples only bounded the distance, drop them from the median
+        if self._range is not None and not isinstance(distance, ClearBeyond) and distance > self._range:
+            self._range = None
+            kept = [v for v in self.window if not isinstance(v, ClearBeyond)]
+            self.window.clear()
+            self.window.extend(kept)
+
+    def add(self, distance: float, t: float) -> Tuple[float, float]:
+        """Adds a raw sample taken at time t (s). Returns (filtered, variance)."""
+        if distance == -1:
+            self._invalid += 1
+            return self.estimate(), self.variance()
+        self._invalid = 0
+        if isinstance(distance, ClearBeyond):
+            self._range = float(distance)
+
+        dt = t - self._last_t if self._last_t is not None else 0.0
+        self._last_t = t
+        # "clear beyond" samples stay marked in the window
+        value = distance if isinstance(distance, ClearBeyond) else float(distance)
+
+        current = self.estimate()
+        if self.window and current != -1:
+            limit = self.max_rate * dt + self.margin
+            if abs(value - float(current)) > limit:
+                # keep it aside until enough samples agree with it
+                if self._pending and abs(value - self._pending[-1]) > limit:
+                    self._pending = []
+                self._pending.append(value)
+                if len(self._pending) < self.confirm:
+                    self.rejected += 1
+                    return current, self.variance()
+                self.window.clear()
+                self.window.extend(self._pending)
+                self._pending = []
+                self._accepted_past_range(distance)
+                self.accepted += 1
+                return self.estimate(), self.variance()
+
+        self._pending = []
+        self.window.append(value)
+        self._accepted_past_range(distance)
+        self.accepted += 1
+        return self.estimate(), self.variance()
+
+
+#Test
+if __name__ == "__main__":
+    f = RangeFilter()
+    t = 0.0
+    # steady wall at 50 cm, one spurious 12 cm echo, a no-echo, then the robot turns to face 120 cm
+    for d in [50, 51, 12, 50, -1, 49, 120, 121, 119, 122]:
+        t += 0.06
+        print(d, f.add(d, t))
+    print("rejected", f.rejected)
@@ -0,0 +1,415 @@
+"""
+RemoteDetection.py - Offload YOLO to a stronger machine on the LAN
+===================================================================
+
+Frames are downscaled to detector resolution, JPEG encoded and sent over
+TCP to InferenceServer.py. On the robot the camera's frames are streamed:
+a thread started by start_stream() keeps up to REMOTE_DETECT_INFLIGHT
+frames on the wire and keeps each answer as it arrives, so latest() hands
+out the detections of a recent frame without a round trip per call.
+detect() sends one given frame and waits for its answer. Callers fall back
+to the local model when the server is slow or unreachable:
+
+  - a request that misses its deadline is dropped (None: run it locally)
+  - when the average latency goes over the budget, or several requests in a
+    row fail, the remote backend is skipped for a cool down and then probed
+    again
+  - connecting happens in the background, calls go local meanwhile
+
+Wire format (both directions):
+  >I total length | >I header length | JSON header | payload (JPEG or empty)
+Request header:  {"id", "model", "width", "height"}
+Response header: {"id", "detections": [{"name", "confidence", "xyxy"}], "infer_ms"}
+             or: {"id", "error"} when the server could not run the request
+
+Usage:
+    from RemoteDetection import remote
+    remote.start_stream(camera, lambda: "yolov8n")
+    boxes = remote.latest("yolov8n")     # None: run it locally
+"""
+
+import json
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+
+from Clock import clock
+from config import (
+    REMOTE_DETECT_ADDR,
+    REMOTE_DETECT_DEADLINE_MS,
+    REMOTE_DETECT_BUDGET_MS,
+    REMOTE_DETECT_WIDTH,
+    REMOTE_DETECT_QUALITY,
+    REMOTE_DETECT_INFLIGHT,
+)
+
+COOLDOWN_S = 10.0
+MAX_FAILURES = 3
+STREAM_POLL_S = 0.005  # stream thread: wait for a new frame / a free slot
+STREAM_MAX_AGE_S = 0.15  # latest(): oldest frame taken as the current view (~ a LAN round trip)
+
+
+# ================== Framing ==================
+def send_msg(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    head = json.dumps(header).encode()
+    sock.sendall(struct.pack(">II", 4 + len(head) + len(payload), len(head)) + head + payload)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_msg(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    total, head_len = struct.unpack(">II", _recv_exact(sock, 8))
+    body = _recv_exact(sock, total - 4)
+    return json.loads(body[:head_len].decode()), body[head_len:]
+
+
+# ================== Client ==================
+class RemoteDetector:
+    def __init__(self, addr: str = REMOTE_DETECT_ADDR,
+                 deadline_ms: float = REMOTE_DETECT_DEADLINE_MS,
+                 budget_ms: float = REMOTE_DETECT_BUDGET_MS,
+                 width: int = REMOTE_DETECT_WIDTH,
+                 quality: int = REMOTE_DETECT_QUALITY,
+                 max_inflight: int = REMOTE_DETECT_INFLIGHT):
+        self.addr = addr
+        self.deadline = deadline_ms / 1000
+        self.budget = budget_ms / 1000
+        self.width = width
+        self.quality = quality
+        self.max_inflight = max_inflight
+
+        self._sock: Optional[socket.socket] = None
+        self._connecting = False
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[Future, float, float]] = {}
+        self._next_id = 0
+        self._failures = 0
+        self._skip_until = 0.0
+        # streaming: newest answer as (capture clock time, model, detections)
+        self._stream: Optional[threading.Thread] = None
+        self._latest: Tuple[float, str, List[Tuple]] = (-float("inf"), "", [])
+        self._arrived = threading.Condition()
+
+        # Telemetry
+        self.latency_s = 0.0  # EWMA of round trip time
+        self.counts = {"sent": 0, "ok": 0, "late": 0, "errors": 0, "fallbacks": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.addr)
+
+    def available(self) -> bool:
+        """False while cooling down after the server was slow or failing."""
+        return self.enabled and time.monotonic() >= self._skip_until
+
+    # ---------- connection ----------
+    def connect(self) -> bool:
+        """Connects (blocking, up to 4x the deadline). True when connected."""
+        host, port = self.addr.rsplit(":", 1)
+        try:
+            sock = socket.create_connection((host, int(port)), timeout=self.deadline * 4)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(None)
+        except OSError as e:
+            with self._lock:
+                self._connecting = False
+            self.counts["errors"] += 1
+            self._record_failure(f"connect: {e}")
+            return False
+        with self._lock:
+            self._sock, self._connecting = sock, False
+        threading.Thread(target=self._reader, args=(sock,), daemon=True, name="remote-detect").start()
+        print(f"[RemoteDetect] connected to {self.addr}")
+        return True
+
+    def _ensure_connected(self) -> bool:
+        """True when connected, else connects in the background (requests go local meanwhile)."""
+        with self._lock:
+            if self._sock is not None:
+                return True
+            if self._connecting:
+                return False
+            self._connecting = True
+        threading.Thread(target=self.connect, daemon=True, name="remote-connect").start()
+        return False
+
+    def _disconnect(self, reason: str):
+        with self._lock:
+            sock, self._sock = self._sock, None
+            pending, self._pending = self._pending, {}
+        if sock:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            print(f"[RemoteDetect] disconnected: {reason}")
+        for fut, _, _ in pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(reason))
+
+    def _reader(self, sock: socket.socket):
+        try:
+            while True:
+                header, _ = recv_msg(sock)
+                with self._lock:
+                    entry = self._pending.pop(header.get("id"), None)
+                if entry is None:
+                    continue  # already given up on (past its deadline)
+                fut, sent_at, scale = entry
+                try:
+                    if "error" in header:
+                        raise RuntimeError(f"server: {header['error']}")
+                    # detector resolution -> frame coordinates
+                    dets = [(d["name"], d["confidence"], *[v * scale for v in d["xyxy"]])
+                            for d in header.get("detections", [])]
+                except (KeyError, TypeError, ValueError, RuntimeError) as e:
+                    # a bad reply fails its own request only
+                    if not fut.done():
+                        fut.set_exception(RuntimeError(f"bad reply: {e!r}"))
+                    continue
+                self._record_latency(time.perf_counter() - sent_at)
+                if not fut.done():
+                    fut.set_result(dets)
+        except (ConnectionError, OSError, ValueError) as e:
+            if sock is self._sock:
+                self._disconnect(str(e))
+
+    # ---------- health ----------
+    def _record_latency(self, rtt: float):
+        self.latency_s = rtt if self.latency_s == 0 else 0.8 * self.latency_s + 0.2 * rtt
+        if self.latency_s > self.budget:
+            self._cool_down(f"latency {self.latency_s * 1000:.0f} ms over budget")
+
+    def _record_failure(self, reason: str):
+        self._failures += 1
+        if self._failures >= MAX_FAILURES:
+            self._cool_down(reason)
+
+    def _cool_down(self, reason: str):
+        print(f"[RemoteDetect] falling back to local model for {COOLDOWN_S:.0f}s: {reason}")
+        self._skip_until = time.monotonic() + COOLDOWN_S
+        self._failures = 0
+        # next probe starts from a clean latency estimate
+        self.latency_s = 0.0
+
+    # ---------- requests ----------
+    def submit(self, frame, model: str) -> Optional[Future]:
+        """
+        Sends a frame without waiting for the answer.
+        Returns a Future of [(name, confidence, x1, y1, x2, y2)] or None if
+        the request cannot be sent (too many in flight, not connected).
+        """
+        if not self.available() or not self._ensure_connected():
+            return None
+        with self._lock:
+            if len(self._pending) >= self.max_inflight:
+                return None
+            req_id = self._next_id
+            self._next_id += 1
+
+        height, width = frame.shape[:2]
+        scale = width / self.width if width > self.width else 1.0
+        if scale != 1.0:
+            frame = cv2.resize(frame, (self.width, round(height / scale)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+
+        fut: Future = Future()
+        try:
+            with self._send_lock:
+                with self._lock:
+                    sock = self._sock
+                    if sock is None:
+                        return None  # lost since _ensure_connected()
+                    self._pending[req_id] = (fut, time.perf_counter(), scale)
+                send_msg(sock, {"id": req_id, "model": model,
+                                "width": frame.shape[1], "height": frame.shape[0]}, jpeg.tobytes())
+        except OSError as e:
+            with self._lock:
+                self._pending.pop(req_id, None)
+            self.counts["errors"] += 1
+            self._record_failure(str(e))
+            self._disconnect(str(e))
+            return None
+
+        self.counts["sent"] += 1
+        return fut
+
+    def detect(self, frame, model: str) -> Optional[List[Tuple]]:
+        """Blocking detection with deadline. None means: run it locally."""
+        fut = self.submit(frame, model)
+        if fut is None:
+            self.counts["fallbacks"] += 1
+            return None
+        try:
+            return self._outcome(fut, timeout=self.deadline)
+        except (FutureTimeout, ConnectionError, RuntimeError):
+            self.counts["fallbacks"] += 1
+            return None
+
+    def _outcome(self, fut: Future, timeout: Optional[float] = None) -> List[Tuple]:
+        """A request's detections, its failure counted and re-raised."""
+        try:
+            dets = fut.result(timeout=timeout)
+        except FutureTimeout:
+            if not fut.done():
+                # still pending: a late answer is dropped by the reader
+                self._forget(fut)
+            self.counts["late"] += 1
+            self._record_failure("deadline missed")
+            raise
+        except ConnectionError:
+            self.counts["errors"] += 1
+            self._record_failure("connection lost")
+            raise
+        except RuntimeError as e:
+            self.counts["errors"] += 1
+            self._record_failure(str(e))
+            raise
+        self.counts["ok"] += 1
+        self._failures = 0
+        return dets
+
+    def _forget(self, fut: Future):
+        with self._lock:
+            for key, entry in list(self._pending.items()):
+                if entry[0] is fut:
+                    del self._pending[key]
+
+    # ---------- streaming ----------
+    def start_stream(self, camera, model_for: Callable[[], str], active: Callable[[], bool] = lambda: True):
+        """
+        Feeds camera's new frames to the server from a thread, up to
+        max_inflight at a time, while active() and the server is available.
+        model_for() names the model of each frame. Answers go to latest().
+        """
+        with self._lock:
+            if self._stream is not None or not self.enabled:
+                return
+            self._stream = threading.Thread(target=self._feed, args=(camera, model_for, active),
+                                            daemon=True, name="remote-stream")
+        self._stream.start()
+
+    def _feed(self, camera, model_for, active):
+        last = None
+        while True:
+            self._expire()
+            frame = camera.get_frame()
+            with self._lock:
+                full = len(self._pending) >= self.max_inflight
+            if frame is None or frame is last or full or not active() or not self.available():
+                time.sleep(STREAM_POLL_S)
+                continue
+            captured = getattr(camera, "latest_t", 0.0) or clock.now()
+            model = model_for()
+            fut = self.submit(frame, model)
+            if fut is None:
+                time.sleep(STREAM_POLL_S)
+                continue
+            last = frame
+            fut.add_done_callback(lambda f, t=captured, m=model: self._arrive(f, t, m))
+
+    def _expire(self):
+        """Requests past their deadline fail as late (streamed ones have nobody waiting on them)."""
+        now = time.perf_counter()
+        with self._lock:
+            late = [key for key, (_, sent_at, _) in self._pending.items() if now - sent_at > self.deadline]
+            # popped first: the reader no longer resolves them
+            futs = [self._pending.pop(key)[0] for key in late]
+        for fut in futs:
+            if not fut.done():
+                fut.set_exception(FutureTimeout("deadline missed"))
+
+    def _arrive(self, fut: Future, captured: float, model: str):
+        try:
+            dets = self._outcome(fut)
+        except (FutureTimeout, ConnectionError, RuntimeError):
+            return
+        with self._arrived:
+            if captured > self._latest[0]:
+                self._latest = (captured, model, dets)
+                self._arrived.notify_all()
+
+    def latest(self, model: str, max_age: float = STREAM_MAX_AGE_S,
+               timeout: Optional[float] = None) -> Optional[List[Tuple]]:
+        """
+        Detections by model of the newest streamed frame, if it was captured
+        at most max_age seconds ago, else of the next one arriving within
+        timeout (default: the deadline). None means: run it locally.
+        """
+        since = clock.now() - max_age
+
+        def fresh():
+            return self._latest[0] >= since and self._latest[1] == model
+
+        with self._arrived:
+            if self._arrived.wait_for(fresh, self.deadline if timeout is None else timeout):
+                return self._latest[2]
+        self.counts["fallbacks"] += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "addr": self.addr,
+            "available": self.available(),
+            "latency_ms": round(self.latency_s * 1000, 1),
+            "inflight": len(self._pending),
+            "streaming": self._stream is not None,
+            **self.counts,
+        }
+
+
+# Single instance shared by all modules (disabled unless REMOTE_DETECT_ADDR is set)
+remote = RemoteDetector()
+
+
+#Test against a local stand-in:
+#   python InferenceServer.py --fake-delay-ms 30 &
+#   REMOTE_DETECT_ADDR=127.0.0.1:5055 python RemoteDetection.py
+if __name__ == "__main__":
+    import numpy as np
+
+    if not remote.enabled:
+        remote.addr = "127.0.0.1:5055"
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    remote.connect()
+
+    # sequential
+    t0 = time.perf_counter()
+    for _ in range(10):
+        dets = remote.detect(frame, "yolov8n")
+    print(f"sequential: {(time.perf_counter() - t0) * 100:.1f} ms per detect()", dets)
+
+    class FakeCamera:
+        """A new frame every 1/30 s, like the webcam."""
+        def get_frame(self):
+            self.latest_t = clock.now() // (1 / 30) * (1 / 30)
+            return frames[int(self.latest_t * 30) % 2]
+
+    # streamed: max_inflight frames on the wire, answers taken as they arrive
+    frames = [frame, frame.copy()]
+    remote.start_stream(FakeCamera(), lambda: "yolov8n")
+    t0 = time.perf_counter()
+    waits = []
+    while time.perf_counter() - t0 < 1:
+        t1 = time.perf_counter()
+        remote.latest("yolov8n")
+        waits.append(time.perf_counter() - t1)
+        time.sleep(0.05)  # the behaviour doing something with it
+    print(f"streamed: {remote.counts['ok'] - 10} answers/s, {sum(waits) / len(waits) * 1000:.1f} ms per latest()")
+    print(remote.stats())
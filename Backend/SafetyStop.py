@@ -0,0 +1,93 @@
+"""
+SafetyStop.py - Emergency stop in the sensor sampling thread
+=============================================================
+
+Behaviours only react to obstacles when they get around to reading the
+distances; a blocked event loop (synchronous detection ...) could leave
+the robot driving blind for hundreds of milliseconds. The sampler thread
+hands every raw reading to the safety stop before filtering and
+publishing it:
+
+  - front (back) closer than SAFETY_STOP_CM: motion forward (backward) is
+    blocked in MotorControl and the wheels stop right away if they drive
+    that way, without going through asyncio
+  - the block is lifted once the sensor reads SAFETY_RELEASE_CM more than
+    the floor; turning stays possible while blocked
+
+A single close reading is enough: a spurious stop costs one step, a
+missed one a collision. Echo-to-stop reaction time is recorded (from the
+echo's falling edge with the edge backend).
+
+Usage:
+    from SafetyStop import safety
+    safety.stats()
+"""
+
+import threading
+from typing import Dict, Optional
+
+import MotorControl as motor
+from Clock import clock
+from ObstaclePrediction import ClearBeyond
+from SensorHealth import Histogram
+from config import SAFETY_RELEASE_CM, SAFETY_STOP_CM
+
+# sensor -> motion it guards
+GUARDS = {"front": "forward", "back": "backward"}
+REACTION_US_BUCKETS = [50, 100, 250, 500, 1000, 2500, 10000, 50000]
+
+
+class SafetyStop:
+    def __init__(self, floor: float = SAFETY_STOP_CM, release: float = SAFETY_RELEASE_CM):
+        self.floor = floor
+        self.release = release
+        self._lock = threading.Lock()
+
+        # Telemetry
+        self.stops = 0
+        self.blocks = 0
+        self.reaction_us = Histogram(REACTION_US_BUCKETS)
+        self.last_stop: Optional[Dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.floor > 0
+
+    def check(self, name: str, raw: float, echo_ns: Optional[int] = None):
+        """One raw reading (sampler thread). echo_ns: clock.now_ns() of the echo's end."""
+        direction = GUARDS.get(name)
+        if direction is None or not self.enabled or raw == -1:
+            return
+
+        if not isinstance(raw, ClearBeyond) and raw < self.floor:
+            if direction in motor.blocked:
+                return
+            stopped = motor.block(direction)
+            done_ns = clock.now_ns()
+            with self._lock:
+                self.blocks += 1
+                if stopped:
+                    self.stops += 1
+                    reaction = (done_ns - echo_ns) / 1000 if echo_ns else None
+                    if reaction is not None:
+                        self.reaction_us.observe(reaction)
+                    self.last_stop = {"sensor": name, "distance": raw, "reaction_us": reaction}
+            if stopped:
+                print(f"[Safety] {name} {raw} cm < {self.floor:g} cm: stopped {direction} motion")
+        elif direction in motor.blocked and raw >= self.floor + self.release:
+            motor.unblock(direction)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "floor_cm": self.floor,
+                "blocked": sorted(motor.blocked),
+                "stops": self.stops,
+                "blocks": self.blocks,
+                "reaction_us": self.reaction_us.to_dict(),
+                "last_stop": self.last_stop,
+            }
+
+
+# Single instance shared by all modules
+safety = SafetyStop()
@@ -0,0 +1,215 @@
+"""
+SensorHealth.py - Ultrasonic sensor health and latency telemetry
+=================================================================
+
+Per sensor counters (pings, timeouts, retries, out-of-range readings,
+filter rejections) and histograms (echo time, ping latency), plus sweep /
+sampler slot duration histograms. Each sensor gets a status from its
+recent pings:
+
+  - "dead":     almost every recent ping timed out (-1)
+  - "degraded": a sizeable share of recent pings timed out
+  - "noisy":    the RangeFilter keeps rejecting its samples
+  - "slow":     p95 ping latency over SLOW_PING_MS
+  - "ok"
+
+Recorded by ObstaclePrediction (pings, retries, inline sweeps, sampler
+stalls) and the SensorSampler (slots, rejections). Read in-process with health.snapshot(),
+or pushed to the UI as {"type": "sensor_health", "command": snapshot}.
+
+Usage:
+    from SensorHealth import health
+    health.status("front")
+    asyncio.create_task(health.push(ipc, SENSOR_HEALTH_PUSH_S))
+"""
+
+import asyncio
+import bisect
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+RECENT = 50          # pings per sensor the status is computed from
+MIN_RECENT = 10      # pings needed before a sensor can be judged
+DEAD_RATE = 0.9      # timeout share
+DEGRADED_RATE = 0.2
+NOISY_RATE = 0.2     # filter rejection share
+SLOW_PING_MS = 30.0
+
+# Histogram bucket upper bounds
+ECHO_US_BUCKETS = [250, 500, 1000, 2000, 3000, 6000, 12000, 24000]  # ~4 cm .. 4 m
+PING_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100]
+SWEEP_MS_BUCKETS = [5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class Histogram:
+    """Fixed bucket histogram, the last bucket counts everything above the bounds."""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (None past the last bound)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else None
+        return None
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+class SensorStats:
+    def __init__(self):
+        self.pings = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.out_of_range = 0
+        self.rejected = 0
+        self.echo_us = Histogram(ECHO_US_BUCKETS)
+        self.ping_ms = Histogram(PING_MS_BUCKETS)
+        # recent outcomes for the status
+        self.recent_timeouts = deque(maxlen=RECENT)
+        self.recent_rejects = deque(maxlen=RECENT)
+        self.recent_ping_ms = deque(maxlen=RECENT)
+
+
+class SensorHealth:
+    def __init__(self):
+        # created on a sensor's first ping
+        self.sensors: Dict[str, SensorStats] = {}
+        self.sweep_ms = Histogram(SWEEP_MS_BUCKETS)
+        self.slot_ms = Histogram(SWEEP_MS_BUCKETS)
+        self.stalls = 0  # fresh readings waited for in vain while the sampler ran
+        self._lock = threading.Lock()
+
+    # ---------- recording (any thread) ----------
+    def record_ping(self, name: str, distance: float, elapsed_s: float, out_of_range: bool = False):
+        """One ping: distance in cm (-1 = timeout), trigger-to-result time."""
+        ms = elapsed_s * 1000
+        with self._lock:
+            s = self.sensors.setdefault(name, SensorStats())
+            s.pings += 1
+            s.ping_ms.observe(ms)
+            s.recent_ping_ms.append(ms)
+            s.recent_timeouts.append(distance == -1)
+            if out_of_range:
+                s.out_of_range += 1
+            elif distance == -1:
+                s.timeouts += 1
+            else:
+                # round trip of the sound, 34300 cm/s
+                s.echo_us.observe(distance * 2 / 34300 * 1e6)
+
+    def record_retry(self, name: str):
+        with self._lock:
+            self.sensors.setdefault(name, SensorStats()).retries += 1
+
+    def record_filtered(self, name: str, rejected: bool):
+        with self._lock:
+            s = self.sensors.setdefault(name, SensorStats())
+            s.rejected += rejected
+            s.recent_rejects.append(rejected)
+
+    def record_sweep(self, seconds: float):
+        with self._lock:
+            self.sweep_ms.observe(seconds * 1000)
+
+    def record_slot(self, seconds: float):
+        with self._lock:
+            self.slot_ms.observe(seconds * 1000)
+
+    def record_stall(self):
+        with self._lock:
+            self.stalls += 1
+
+    # ---------- reading ----------
+    def status(self, name: str) -> str:
+        with self._lock:
+            s = self.sensors[name]
+            if len(s.recent_timeouts) < MIN_RECENT:
+                return "ok"
+            timeout_rate = sum(s.recent_timeouts) / len(s.recent_timeouts)
+            reject_rate = sum(s.recent_rejects) / len(s.recent_rejects) if s.recent_rejects else 0.0
+            ping_ms = sorted(s.recent_ping_ms)
+        if timeout_rate >= DEAD_RATE:
+            return "dead"
+        if timeout_rate >= DEGRADED_RATE:
+            return "degraded"
+        if reject_rate >= NOISY_RATE:
+            return "noisy"
+        if ping_ms[int(0.95 * (len(ping_ms) - 1))] > SLOW_PING_MS:
+            return "slow"
+        return "ok"
+
+    def snapshot(self) -> Dict:
+        statuses = {name: self.status(name) for name in list(self.sensors)}
+        with self._lock:
+            sensors = {
+                name: {
+                    "status": statuses[name],
+                    "pings": s.pings,
+                    "timeouts": s.timeouts,
+                    "retries": s.retries,
+                    "out_of_range": s.out_of_range,
+                    "rejected": s.rejected,
+                    "echo_us": s.echo_us.to_dict(),
+                    "ping_ms": s.ping_ms.to_dict(),
+                }
+                for name, s in self.sensors.items()
+            }
+            return {"sensors": sensors, "sweep_ms": self.sweep_ms.to_dict(), "slot_ms": self.slot_ms.to_dict(),
+                    "sampler_stalls": self.stalls}
+
+    def unhealthy(self) -> Dict[str, str]:
+        return {name: st for name in list(self.sensors) if (st := self.status(name)) != "ok"}
+
+    async def push(self, ipc, period: float):
+        """Sends the snapshot to the UI every period seconds, and logs status changes."""
+        last = {}
+        while True:
+            await asyncio.sleep(period)
+            bad = self.unhealthy()
+            if bad != last:
+                print(f"[Sensor] health: {bad or 'all ok'}")
+                last = bad
+            await ipc.send({"type": "sensor_health", "command": self.snapshot()})
+
+
+# Single instance shared by all modules
+health = SensorHealth()
+
+
+#Test
+if __name__ == "__main__":
+    import random
+    random.seed(0)
+    for _ in range(60):
+        health.record_ping("front", random.uniform(20, 90), random.uniform(0.003, 0.008))
+        health.record_ping("back", -1, 0.008)
+        health.record_ping("left", 50, 0.05)
+        health.record_filtered("right", random.random() < 0.4)
+        health.record_ping("right", 60, 0.005)
+    health.record_sweep(0.12)
+    print(health.unhealthy())
+    print(health.snapshot()["sensors"]["front"])
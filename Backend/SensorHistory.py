@@ -0,0 +1,137 @@
+"""
+SensorHistory.py - Recent ultrasonic history with time-to-collision queries
+============================================================================
+
+Each sensor keeps a fixed size NumPy ring buffer of (timestamp, distance)
+filled by the SensorSampler. Queries are vectorised over the buffer:
+
+  - minimum distance over the last N seconds
+  - closing velocity (least squares slope, cm/s, > 0 when approaching)
+  - time to collision with a given distance floor
+
+Invalid (-1) and "clear beyond range" readings are stored as NaN: they say
+nothing about where the obstacle is.
+
+Usage:
+    from SensorSampler import sampler
+    ttc = sampler.history.time_to_collision("front", floor=30)
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from Clock import clock
+from ObstaclePrediction import ClearBeyond
+from Odometry import calibration
+
+SIZE = 256       # samples per sensor (~10 s at the forward front rate)
+WINDOW = 0.5     # default query window (s)
+MIN_SAMPLES = 3  # samples needed for a velocity estimate
+
+
+class RangeHistory:
+    def __init__(self, size: int = SIZE):
+        self.t = np.full(size, -np.inf)
+        self.d = np.full(size, np.nan)
+        self._i = 0
+        self._lock = threading.Lock()
+
+    def push(self, t: float, distance: float):
+        value = np.nan if distance == -1 or isinstance(distance, ClearBeyond) else float(distance)
+        with self._lock:
+            self.t[self._i] = t
+            self.d[self._i] = value
+            self._i = (self._i + 1) % len(self.t)
+
+    def window(self, seconds: float, now: float):
+        """Valid (t, d) samples of the last `seconds`, unordered."""
+        with self._lock:
+            t, d = self.t.copy(), self.d.copy()
+        mask = (t >= now - seconds) & ~np.isnan(d)
+        return t[mask], d[mask]
+
+    def minimum(self, seconds: float, now: float) -> float:
+        _, d = self.window(seconds, now)
+        return float(d.min()) if d.size else math.inf
+
+    def latest(self, seconds: float, now: float) -> float:
+        t, d = self.window(seconds, now)
+        return float(d[t.argmax()]) if d.size else math.inf
+
+    def closing_velocity(self, seconds: float, now: float) -> float:
+        """cm/s, positive when the obstacle gets closer, 0 without enough data."""
+        t, d = self.window(seconds, now)
+        if d.size < MIN_SAMPLES:
+            return 0.0
+        t = t - t.mean()
+        denom = float((t * t).sum())
+        if denom == 0:
+            return 0.0
+        slope = float((t * (d - d.mean())).sum()) / denom
+        return -slope
+
+
+class SensorHistory:
+    def __init__(self, names, size: int = SIZE):
+        self.buffers = {name: RangeHistory(size) for name in names}
+
+    def push(self, name: str, t: float, distance: float):
+        self.buffers[name].push(t, distance)
+
+    def minimum(self, name: str, seconds: float = WINDOW, now: float = None) -> float:
+        return self.buffers[name].minimum(seconds, _now(now))
+
+    def closing_velocity(self, name: str, seconds: float = WINDOW, now: float = None) -> float:
+        return self.buffers[name].closing_velocity(seconds, _now(now))
+
+    def time_to_collision(self, name: str, floor: float = 0.0, seconds: float = WINDOW, now: float = None) -> float:
+        """
+        Seconds until the obstacle seen by `name` reaches `floor` cm at the
+        current closing velocity; inf when it is not getting closer.
+        """
+        now = _now(now)
+        buf = self.buffers[name]
+        velocity = buf.closing_velocity(seconds, now)
+        if velocity <= 0:
+            return math.inf
+        return max(0.0, (buf.latest(seconds, now) - floor) / velocity)
+
+    def step_time(self, name: str, floor: float, base: float, longest: float = None, now: float = None) -> float:
+        """
+        Drive time for the next step toward `name`: up to `longest` (2x base)
+        while the gap to `floor` closes slowly, down to 0.1 s when the
+        time to collision gets short (half of it is kept as margin), `base`
+        when the closing velocity is unknown. Never longer than it takes
+        the robot itself to cover the gap at calibration.cm_per_s.
+        """
+        now = _now(now)
+        longest = 2 * base if longest is None else longest
+        buf = self.buffers[name]
+        if buf.window(WINDOW, now)[1].size < MIN_SAMPLES:
+            step = base
+        else:
+            ttc = self.time_to_collision(name, floor, now=now)
+            step = longest if math.isinf(ttc) else min(longest, max(0.1, ttc / 2))
+        gap = buf.latest(WINDOW, now) - floor
+        if not math.isinf(gap):
+            step = min(step, max(0.0, gap) / calibration.cm_per_s)
+        return step
+
+
+def _now(now):
+    return clock.now() if now is None else now
+
+
+#Test
+if __name__ == "__main__":
+    h = SensorHistory(["front"])
+    # approaching a wall at 40 cm/s from 100 cm, 20 Hz, with +-1 cm noise
+    rng = np.random.default_rng(0)
+    for i in range(20):
+        h.push("front", i * 0.05, 100 - 40 * i * 0.05 + rng.uniform(-1, 1))
+    now = 19 * 0.05
+    print("min", round(h.minimum("front", now=now), 1))
+    print("closing", round(h.closing_velocity("front", now=now), 1), "cm/s")
+    print("ttc to 30 cm", round(h.time_to_collision("front", floor=30, now=now), 2), "s")
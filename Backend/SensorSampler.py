@@ -0,0 +1,377 @@
+"""
+SensorSampler.py - Background ultrasonic sampling
+==================================================
+
+A thread keeps pinging the four sensors and publishes a snapshot of the
+latest reading of each (filtered distance, timestamp, validity, raw sample,
+variance, see RangeFilter). Behaviours read the
+snapshot instantly instead of running a full sweep inline; when they need
+data newer than some age they await the next sweep.
+
+Sensors facing away from each other (front/back, left/right) are fired
+together, which halves the sweep time. Every few sweeps a sequential
+reference sweep is compared with the concurrent readings; if they disagree
+too often (one sensor hearing the other's burst) sampling goes sequential
+for a while before concurrency is tried again.
+
+Pings are not spread evenly: PingScheduler weights each sensor by the
+current motor command (front when driving forward, sides when turning,
+back when reversing) with stride scheduling, so the direction of travel
+is refreshed several times as often as the others.
+
+Usage:
+    from SensorSampler import sampler
+    sampler.start()                      # after ObstaclePrediction.setup()
+    snap = sampler.snapshot()            # instant, may be slightly old
+    snap = await sampler.wait_fresh(0.1) # every reading newer than 100 ms
+    readings = sampler.subscribe()       # deque of every (name, Reading) from now on
+
+A failing ping slot is counted and skipped; if the thread ends anyway it
+clears running and wakes waiters, so get_all_distances() goes back to
+direct sweeps instead of waiting forever. While it runs but publishes
+nothing, get_all_distances() returns the last snapshot (StaleDistances)
+and health counts the stall: only one thread ever fires the sensors.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import MotorControl as motor
+import ObstaclePrediction as sensor
+from Clock import clock
+from RangeFilter import RangeFilter
+from SensorHistory import SensorHistory
+from SafetyStop import safety
+from SensorHealth import health
+
+# Pause after each ping so the previous echo has died out
+PING_GAP = 0.01
+# Longest wait_fresh() waits for a sweep before giving up
+FRESH_TIMEOUT_S = 1.0
+ERROR_PAUSE_S = 0.1        # after a failed ping slot, so a persistent fault does not spin
+
+# Crosstalk detection
+REFERENCE_EVERY = 20       # ping slots between two sequential reference sweeps
+CROSSTALK_WINDOW = 40      # compared readings kept
+CROSSTALK_RATE = 0.3       # disagreeing fraction that counts as crosstalk
+CROSSTALK_MIN_SAMPLES = 12
+SEQUENTIAL_COOLDOWN = 200  # ping slots before concurrency is retried
+AGREE_CM = 5.0             # readings this close (or AGREE_RATIO) agree
+AGREE_RATIO = 0.1
+
+# Relative ping frequency per sensor for each motor command (MotorControl.motion)
+MOTION_WEIGHTS = {
+    "stop":     {"front": 1.0, "back": 1.0, "left": 1.0, "right": 1.0},
+    "forward":  {"front": 4.0, "back": 0.5, "left": 1.5, "right": 1.5},
+    "backward": {"front": 0.5, "back": 4.0, "left": 1.5, "right": 1.5},
+    "left":     {"front": 2.0, "back": 1.0, "left": 3.0, "right": 3.0},
+    "right":    {"front": 2.0, "back": 1.0, "left": 3.0, "right": 3.0},
+}
+# Window for the per sensor effective rate
+RATE_WINDOW = 20
+SUBSCRIBER_SIZE = 512      # readings a subscriber queue holds before dropping the oldest
+
+
+class Reading(NamedTuple):
+    distance: float   # filtered cm, -1 when invalid
+    timestamp: float  # clock.now() when measured
+    valid: bool
+    raw: float        # last raw sample
+    variance: float   # of the samples behind the filtered distance
+
+    def age(self) -> float:
+        return clock.now() - self.timestamp
+
+
+NO_READING = Reading(-1, 0.0, False, -1, 0.0)
+
+
+class CrosstalkMonitor:
+    """
+    Decides whether the next sweep fires the pairs together or one sensor
+    at a time, from how often concurrent readings disagree with the
+    sequential reference sweeps.
+    """
+
+    def __init__(self, pairs=sensor.FIRING_PAIRS):
+        self.pairs = [tuple(p) for p in pairs]
+        self.names = [n for p in self.pairs for n in p]
+        self._since_reference = 0
+        self._cooldown = 0
+        self._last_concurrent: Dict[str, float] = {}
+        self._agreements = deque(maxlen=CROSSTALK_WINDOW)
+        self.fallbacks = 0
+
+    @property
+    def mode(self) -> str:
+        return "sequential" if self._cooldown > 0 else "concurrent"
+
+    def plan(self) -> bool:
+        """Called once per ping slot. True when the slot should be a sequential reference sweep."""
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            if self._cooldown == 0:
+                print("[Sensor] retrying concurrent firing")
+            return False
+        if self._since_reference >= REFERENCE_EVERY and self._last_concurrent:
+            self._since_reference = 0
+            return True
+        self._since_reference += 1
+        return False
+
+    def record(self, readings: Dict[str, float], reference: bool, paired: bool = False):
+        if not reference:
+            # only readings of sensors fired together can show crosstalk
+            if paired and self.mode == "concurrent":
+                self._last_concurrent.update(readings)
+            return
+
+        for name, ref in readings.items():
+            conc = self._last_concurrent.get(name, -1)
+            if ref == -1 and conc == -1:
+                continue
+            agree = ref != -1 and conc != -1 and abs(ref - conc) <= max(AGREE_CM, AGREE_RATIO * ref)
+            self._agreements.append(agree)
+
+        if len(self._agreements) >= CROSSTALK_MIN_SAMPLES:
+            rate = 1 - sum(self._agreements) / len(self._agreements)
+            if rate > CROSSTALK_RATE:
+                print(f"[Sensor] crosstalk suspected ({rate:.0%} disagreement), firing sequentially")
+                self._cooldown = SEQUENTIAL_COOLDOWN
+                self._agreements.clear()
+                self._last_concurrent = {}
+                self.fallbacks += 1
+
+    def disagreement(self) -> Optional[float]:
+        if not self._agreements:
+            return None
+        return round(1 - sum(self._agreements) / len(self._agreements), 3)
+
+
+class PingScheduler:
+    """
+    Stride scheduling of the pings: every sensor advances its pass by
+    1/weight when pinged and the lowest pass goes next. In concurrent mode
+    the partner of the chosen sensor is fired along when it is due before
+    the chosen sensor's next turn anyway.
+    """
+
+    def __init__(self, pairs=sensor.FIRING_PAIRS, weights=MOTION_WEIGHTS):
+        self.weights = weights
+        self.partner = {}
+        for a, b in pairs:
+            self.partner[a], self.partner[b] = b, a
+        self.passes = {name: 0.0 for name in self.partner}
+        self.motion = "stop"
+
+    def stride(self, name: str) -> float:
+        return 1.0 / self.weights.get(self.motion, self.weights["stop"])[name]
+
+    def next_group(self, concurrent: bool) -> Tuple[str, ...]:
+        first = min(self.passes, key=self.passes.get)
+        group = [first]
+        partner = self.partner[first]
+        if concurrent and self.passes[partner] <= self.passes[first] + self.stride(first):
+            group.append(partner)
+        for name in group:
+            self.passes[name] += self.stride(name)
+        return tuple(group)
+
+
+class SensorSampler:
+    def __init__(self, names=tuple(sensor.sensors)):
+        self.names = list(names)
+        self._snapshot: Dict[str, Reading] = {name: NO_READING for name in self.names}
+        self.filters = {name: RangeFilter() for name in self.names}
+        self.history = SensorHistory(self.names)
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweep: Optional[asyncio.Future] = None
+        self.crosstalk = CrosstalkMonitor()
+        self.scheduler = PingScheduler()
+
+        # Telemetry
+        self.slots = 0
+        self.errors = 0
+        self.slot_s = 0.0  # duration of the last ping slot
+        # EWMA of full-sweep equivalents per second (readings/s / sensors) per firing mode
+        self.sweep_hz = {"concurrent": 0.0, "sequential": 0.0}
+        self._ping_times = {name: deque(maxlen=RATE_WINDOW) for name in self.names}
+        self._subscribers: List[deque] = []
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Starts the sampling thread (call from the event loop)."""
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._running = True
+        sensor.sampler = self
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sensor-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if sensor.sampler is self:
+            sensor.sampler = None
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    # ---------- reading ----------
+    def snapshot(self) -> Dict[str, Reading]:
+        with self._lock:
+            return dict(self._snapshot)
+
+    def subscribe(self, size: int = SUBSCRIBER_SIZE) -> deque:
+        """
+        Queue receiving every published (name, Reading) from now on, for
+        consumers that must not miss readings between two snapshots. The
+        consumer pops from the left; past `size` the oldest are dropped.
+        """
+        queue = deque(maxlen=size)
+        self._subscribers.append(queue)
+        return queue
+
+    def distances(self) -> Dict[str, float]:
+        """Latest distance of each sensor, same format as get_all_distances()."""
+        return {name: r.distance for name, r in self.snapshot().items()}
+
+    async def wait_fresh(self, max_age: float, timeout: float = FRESH_TIMEOUT_S) -> Dict[str, Reading]:
+        """
+        Waits until every reading is at most max_age seconds old. Raises
+        asyncio.TimeoutError when that takes longer than timeout or the
+        sampler stops.
+        """
+        deadline = clock.now() + timeout
+        while True:
+            snap = self.snapshot()
+            if all(r.timestamp and r.age() <= max_age for r in snap.values()):
+                return snap
+            remaining = deadline - clock.now()
+            if not self._running or remaining <= 0:
+                raise asyncio.TimeoutError("no fresh sensor sweep")
+            if self._sweep is None or self._sweep.done():
+                self._sweep = self._loop.create_future()
+            # shielded: a timeout must not cancel the future other waiters share
+            await asyncio.wait_for(asyncio.shield(self._sweep), clock.wall(remaining))
+
+    # ---------- sampling thread ----------
+    def _publish(self, name: str, raw: float):
+        now = clock.now()
+        rejected = self.filters[name].rejected
+        distance, variance = self.filters[name].add(raw, now)
+        health.record_filtered(name, self.filters[name].rejected > rejected)
+        self._ping_times[name].append(now)
+        self.history.push(name, now, distance)
+        reading = Reading(distance, now, distance != -1, raw, variance)
+        with self._lock:
+            self._snapshot[name] = reading
+        for queue in self._subscribers:
+            queue.append((name, reading))
+
+    def rates(self) -> Dict[str, float]:
+        """Effective ping rate (Hz) of each sensor over its last RATE_WINDOW pings."""
+        rates = {}
+        for name, times in self._ping_times.items():
+            times = list(times)
+            span = times[-1] - times[0] if len(times) > 1 else 0
+            rates[name] = round((len(times) - 1) / span, 1) if span > 0 else 0.0
+        return rates
+
+    def _sweep_done(self):
+        if self._sweep is not None and not self._sweep.done():
+            self._sweep.set_result(None)
+
+    def _run(self):
+        try:
+            while self._running:
+                try:
+                    self._slot()
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[Sampler] ping slot failed ({self.errors}): {e!r}")
+                    clock.sleep(ERROR_PAUSE_S)
+        finally:
+            self._running = False
+            try:
+                self._loop.call_soon_threadsafe(self._sweep_done)
+            except RuntimeError:
+                pass  # event loop already closed
+
+    def _slot(self):
+        started = clock.now()
+        reference = self.crosstalk.plan()
+        mode = "sequential" if reference else self.crosstalk.mode
+        if reference:
+            groups = [(n,) for n in self.names]
+        else:
+            self.scheduler.motion = motor.motion
+            groups = [self.scheduler.next_group(mode == "concurrent")]
+
+        readings = {}
+        for group in groups:
+            for name, distance in sensor.ping_group_blocking(group).items():
+                # emergency stop first, straight from this thread
+                safety.check(name, distance, sensor.echo_end_ns(name))
+                readings[name] = distance
+                self._publish(name, distance)
+            clock.sleep(PING_GAP)
+        self.crosstalk.record(readings, reference, paired=len(groups[0]) > 1)
+
+        self.slot_s = clock.now() - started
+        self.slots += 1
+        health.record_slot(self.slot_s)
+        hz = len(readings) / self.slot_s / len(self.names)
+        old = self.sweep_hz[mode]
+        self.sweep_hz[mode] = hz if old == 0 else 0.9 * old + 0.1 * hz
+        # wake up coroutines waiting for fresher data
+        self._loop.call_soon_threadsafe(self._sweep_done)
+
+    def stats(self) -> Dict:
+        seq, conc = self.sweep_hz["sequential"], self.sweep_hz["concurrent"]
+        return {
+            "firing": self.crosstalk.mode,
+            "motion": self.scheduler.motion,
+            "slot_ms": round(self.slot_s * 1000, 1),
+            "errors": self.errors,
+            "rates_hz": self.rates(),
+            "sweep_hz": {k: round(v, 1) for k, v in self.sweep_hz.items()},
+            "speedup": round(conc / seq, 2) if seq and conc else None,
+            "disagreement": self.crosstalk.disagreement(),
+            "crosstalk_fallbacks": self.crosstalk.fallbacks,
+            "rejected": {n: f.rejected for n, f in self.filters.items()},
+        }
+
+
+# Single instance shared by all modules
+sampler = SensorSampler()
+
+
+#Test
+async def main():
+    from GpioBackend import GPIO
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setwarnings(False)
+    await sensor.setup()
+    sampler.start()
+    try:
+        while True:
+            snap = await sampler.wait_fresh(0.2)
+            print({n: (r.distance, round(r.age() * 1000)) for n, r in snap.items()},
+                  sampler.stats())
+            await asyncio.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        GPIO.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,395 @@
+"""
+SimGPIO.py - Simulated RPi.GPIO with a 2D world
+================================================
+
+Drop-in replacement for RPi.GPIO (same functions/constants as used by
+MotorControl and ObstaclePrediction) so the motion stack runs off-robot:
+
+  - the motor direction pins and PWM duty drive a differential drive robot
+  - a TRIG pulse on an ultrasonic sensor ray casts its beam against the
+    world's walls and boxes and plays back the echo pulse on the ECHO pin
+    (pin level for polling, edge callbacks for add_event_detect)
+
+Time acceleration (SIM_SPEEDUP) runs the shared clock (Clock.py) that many
+times faster than the wall clock. The world's motion, the echo pulses, the
+sampler, odometry and the executor's waits all follow it, so a behaviour
+does in 1/SIM_SPEEDUP of the wall time what it does on the robot. Echo
+edges are played back on the clock too, so the callback thread's jitter is
+multiplied by the speedup: up to 4x readings are about as good as at 1x,
+at 8x some are tens of cm off. The camera keeps its wall clock frame rate
+(CPU bound), so visual odometry sees fewer frames per simulated second and
+closed-loop turns fall back to timed ones more often.
+
+The world is a room with boxes, or the JSON file given by SIM_WORLD:
+    {"walls": [[x1, y1, x2, y2], ...], "boxes": [[x, y, w, h], ...],
+     "start": [x, y, heading_deg], "targets": {"person": [x, y]}}
+All distances in cm.
+
+Selected through GpioBackend (ROBOT_GPIO=sim), not imported directly.
+"""
+
+import heapq
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+from Clock import clock
+from config import SIM_SPEEDUP, SIM_WORLD
+
+# ---------------- RPi.GPIO constants ----------------
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+# ---------------- Robot model ----------------
+WHEEL_SPEED = 45.0   # cm/s at 100% duty (~0.022 s per cm)
+WHEEL_BASE = 43.0    # cm, effective (skid steer): turn180() = 1.5 s
+RADIUS = 10.0        # cm, robot footprint
+BEAM_HALF_ANGLE = 7.5  # deg, HC-SR04 cone
+MAX_RANGE = 400.0    # cm
+NO_ECHO_HIGH = 0.038  # s the HC-SR04 holds ECHO high without an echo
+RISE_DELAY = 0.00045  # s from trigger to echo start
+TARGET_SIZE = 20.0   # cm, footprint of a target
+TICK = 0.005         # s (wall) between kinematics updates
+CAMERA_HEIGHT = 15.0  # cm, camera above the floor
+CAMERA_WALL = 60.0   # cm, height of walls and boxes in the camera view
+
+# sensor mounts: (forward offset, left offset, direction deg) relative to the robot
+MOUNTS = {
+    "front": (RADIUS, 0.0, 0.0),
+    "back": (-RADIUS, 0.0, 180.0),
+    "left": (0.0, RADIUS, 90.0),
+    "right": (0.0, -RADIUS, -90.0),
+}
+
+DEFAULT_WORLD = {
+    "walls": [[0, 0, 300, 0], [300, 0, 300, 240], [300, 240, 0, 240], [0, 240, 0, 0]],
+    "boxes": [[120, 80, 40, 40], [220, 160, 50, 30]],
+    "start": [50, 50, 0],
+    "targets": {"person": [250, 60]},
+}
+
+
+def _box(x, y, w, h):
+    return [[x, y, x + w, y], [x + w, y, x + w, y + h], [x + w, y + h, x, y + h], [x, y + h, x, y]]
+
+
+class World:
+    def __init__(self, spec=None):
+        spec = spec or DEFAULT_WORLD
+        segments = [list(w) for w in spec.get("walls", [])]
+        for box in spec.get("boxes", []):
+            segments += _box(*box)
+        # targets (people to follow) are obstacles too
+        self.targets = {k: tuple(v) for k, v in spec.get("targets", {}).items()}
+        for tx, ty in self.targets.values():
+            segments += _box(tx - TARGET_SIZE / 2, ty - TARGET_SIZE / 2, TARGET_SIZE, TARGET_SIZE)
+        self.segments = np.array(segments, dtype=float).reshape(-1, 4)
+        x, y, heading = spec.get("start", [50, 50, 0])
+        self.x, self.y, self.heading = float(x), float(y), math.radians(heading)
+
+        # Telemetry
+        self.sim_time = 0.0
+        self.travelled = 0.0
+        self.collisions = 0
+        self.pings = 0
+        self._contact = False
+        self._lock = threading.Lock()
+
+    # ---------- geometry ----------
+    def raycast(self, ox, oy, angle) -> float:
+        """Distance to the nearest segment along a ray, inf if none."""
+        dx, dy = math.cos(angle), math.sin(angle)
+        s = self.segments
+        ex, ey = s[:, 2] - s[:, 0], s[:, 3] - s[:, 1]
+        denom = dx * ey - dy * ex
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = ((s[:, 0] - ox) * ey - (s[:, 1] - oy) * ex) / denom
+            u = ((s[:, 0] - ox) * dy - (s[:, 1] - oy) * dx) / denom
+        hit = (np.abs(denom) > 1e-9) & (t > 0) & (u >= 0) & (u <= 1)
+        return float(t[hit].min()) if hit.any() else math.inf
+
+    def clearance(self, x, y) -> float:
+        """Distance from a point to the closest segment."""
+        s = self.segments
+        p = np.array([x, y])
+        a, b = s[:, :2], s[:, 2:]
+        ab = b - a
+        t = np.clip(((p - a) * ab).sum(1) / np.maximum((ab * ab).sum(1), 1e-9), 0, 1)
+        closest = a + ab * t[:, None]
+        return float(np.sqrt(((closest - p) ** 2).sum(1)).min())
+
+    def sensor_pose(self, name):
+        fwd, left, deg = MOUNTS[name]
+        c, s = math.cos(self.heading), math.sin(self.heading)
+        return (self.x + fwd * c - left * s, self.y + fwd * s + left * c, self.heading + math.radians(deg))
+
+    def measure(self, name) -> float:
+        """What the sensor's beam sees: the closest hit within its cone."""
+        with self._lock:
+            ox, oy, angle = self.sensor_pose(name)
+        half = math.radians(BEAM_HALF_ANGLE)
+        return min(self.raycast(ox, oy, angle + a) for a in (-half, 0.0, half))
+
+    # ---------- motion ----------
+    def step(self, left, right, dt):
+        """Differential drive update, left/right wheel commands in [-1, 1]."""
+        v = (left + right) / 2 * WHEEL_SPEED
+        # sign chosen so that move_right() (left pins back, right pins forward)
+        # turns clockwise, as on the robot
+        omega = (right - left) * WHEEL_SPEED / WHEEL_BASE
+        with self._lock:
+            self.sim_time += dt
+            heading = self.heading - omega * dt
+            x = self.x + v * dt * math.cos(heading)
+            y = self.y + v * dt * math.sin(heading)
+            if v != 0 and self.clearance(x, y) < RADIUS:
+                # blocked: only turning in place is possible, count each bump once
+                self.collisions += not self._contact
+                self._contact = True
+                self.heading = heading
+                return
+            self._contact = False
+            self.travelled += math.hypot(x - self.x, y - self.y)
+            self.x, self.y, self.heading = x, y, heading
+
+    def pose(self):
+        with self._lock:
+            return self.x, self.y, math.degrees(self.heading) % 360
+
+    def object_track(self, name, fov_deg=70.0):
+        """
+        Simulated camera: ('left'|'center'|'right', pseudo area) of a named
+        target in view and not hidden behind a wall, else (None, None).
+        """
+        if name.casefold() not in {k.casefold() for k in self.targets}:
+            return None, None
+        tx, ty = next(v for k, v in self.targets.items() if k.casefold() == name.casefold())
+        x, y, heading = self.pose()
+        dist = math.hypot(tx - x, ty - y)
+        bearing = (math.degrees(math.atan2(ty - y, tx - x)) - heading + 180) % 360 - 180
+        if abs(bearing) > fov_deg / 2 or self.raycast(x, y, math.atan2(ty - y, tx - x)) < dist - TARGET_SIZE:
+            return None, None
+        # image x grows to the right, bearing grows to the left
+        frac = 0.5 - bearing / fov_deg
+        direction = "left" if frac < 0.33 else "right" if frac > 0.66 else "center"
+        return direction, 4e6 / max(dist, 1.0) ** 2
+
+    def view(self, width=320, height=180, hfov_deg=70.0):
+        """
+        Simulated camera image (grayscale, uint8): walls CAMERA_WALL high with
+        randomly shaded 20 cm blocks (a regular checker pattern would let
+        optical flow slip by whole squares), a tiled floor and a plain
+        ceiling, for visual odometry.
+        """
+        x, y, heading = self.pose()
+        f = width / 2 / math.tan(math.radians(hfov_deg) / 2)
+        cx, cy = (width - 1) / 2, (height - 1) / 2
+        # image x grows to the right, bearing grows to the left
+        bearing = np.arctan((cx - np.arange(width)) / f)
+        angles = math.radians(heading) + bearing
+        dx, dy = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        s = self.segments
+        ex, ey = s[:, 2] - s[:, 0], s[:, 3] - s[:, 1]
+        denom = dx * ey - dy * ex
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = ((s[:, 0] - x) * ey - (s[:, 1] - y) * ex) / denom
+            u = ((s[:, 0] - x) * dy - (s[:, 1] - y) * dx) / denom
+        t = np.where((np.abs(denom) > 1e-9) & (t > 0) & (u >= 0) & (u <= 1), t, np.inf)
+        nearest = t.argmin(1)
+        cols = np.arange(width)
+        dist = t[cols, nearest]
+        # texture coordinate along the wall (cm) and perpendicular depth
+        along = u[cols, nearest] * np.hypot(ex, ey)[nearest]
+        depth = np.where(np.isfinite(dist), dist * np.cos(bearing), 1e6)
+
+        rows = (cy - np.arange(height))[:, None]
+        z = CAMERA_HEIGHT + rows * depth / f
+        wall = (z >= 0) & (z <= CAMERA_WALL)
+        with np.errstate(invalid="ignore"):
+            block = (np.floor(along / 20) * 7919 + np.floor(z / 20) * 104729 + nearest * 15485863) % 9973
+        image = 50 + np.nan_to_num(block) * 160 // 9973
+        # floor: where a row's line of sight meets the ground
+        with np.errstate(divide="ignore"):
+            ground = np.where(rows < 0, CAMERA_HEIGHT * f / -rows, np.inf) / np.cos(bearing)
+        gx, gy = x + ground * np.cos(angles), y + ground * np.sin(angles)
+        with np.errstate(invalid="ignore"):
+            tiles = ((np.floor(gx / 25) + np.floor(gy / 25)) % 2).astype(bool)
+        floor = np.where(tiles, 110, 150)
+        image = np.where(wall, image, np.where(rows < 0, floor, 230))
+        return image.astype(np.uint8)
+
+
+def load_world():
+    if SIM_WORLD:
+        with open(SIM_WORLD) as f:
+            return World(json.load(f))
+    return World()
+
+
+# ---------------- GPIO emulation ----------------
+_levels = {}       # pin -> level
+_modes = {}        # pin -> IN/OUT
+_duty = {}         # enable pin -> duty %
+_callbacks = {}    # pin -> (edge, callback)
+_wiring = None
+world = load_world()
+
+
+def _wire():
+    # pin numbers come from the real modules so the sim is wired like the robot
+    global _wiring
+    if _wiring is None:
+        import MotorControl as motor
+        import ObstaclePrediction as sensor
+        _wiring = {
+            "left": (motor.LEFT_FORWARD, motor.LEFT_BACKWARD, motor.ENA),
+            "right": (motor.RIGHT_FORWARD, motor.RIGHT_BACKWARD, motor.ENB),
+            "trig": {pins["TRIG"]: name for name, pins in sensor.sensors.items()},
+            "echo": {name: pins["ECHO"] for name, pins in sensor.sensors.items()},
+        }
+    return _wiring
+
+
+def _wheel(fwd, back, enable):
+    direction = int(bool(_levels.get(fwd))) - int(bool(_levels.get(back)))
+    return direction * _duty.get(enable, 100.0) / 100.0
+
+
+class _Echoes(threading.Thread):
+    """Plays scheduled echo edges (clock ns) back with microsecond timing."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="sim-echo")
+        self._heap = []
+        self._cv = threading.Condition()
+
+    def schedule(self, at_ns, pin, level):
+        with self._cv:
+            heapq.heappush(self._heap, (at_ns, pin, level))
+            self._cv.notify()
+
+    def run(self):
+        while True:
+            with self._cv:
+                while not self._heap:
+                    self._cv.wait()
+                at_ns, pin, level = self._heap[0]
+                wait = clock.wall((at_ns - clock.now_ns()) / 1e9)
+                if wait > 0.001:
+                    self._cv.wait(wait - 0.001)
+                    continue
+                heapq.heappop(self._heap)
+            # spin the last millisecond for precise edges
+            while clock.now_ns() < at_ns:
+                pass
+            _levels[pin] = level
+            cb = _callbacks.get(pin)
+            if cb:
+                edge, callback = cb
+                if edge == BOTH or (edge == RISING) == bool(level):
+                    callback(pin)
+
+
+class _Kinematics(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True, name="sim-kinematics")
+
+    def run(self):
+        last = clock.now()
+        while True:
+            time.sleep(TICK)
+            now = clock.now()
+            if _wiring is not None:
+                world.step(_wheel(*_wiring["left"]), _wheel(*_wiring["right"]), now - last)
+            last = now
+
+
+clock.set_speedup(SIM_SPEEDUP)
+_echoes = _Echoes()
+_echoes.start()
+_Kinematics().start()
+
+
+def _ping(name):
+    world.pings += 1
+    distance = world.measure(name)
+    pin = _wire()["echo"][name]
+    start = clock.now_ns() + int(RISE_DELAY * 1e9)
+    high = 2 * distance / 34300 if distance <= MAX_RANGE else NO_ECHO_HIGH
+    _echoes.schedule(start, pin, HIGH)
+    _echoes.schedule(start + int(high * 1e9), pin, LOW)
+
+
+def setmode(mode):
+    pass
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(channel, direction, initial=None, pull_up_down=None):
+    for pin in channel if isinstance(channel, (list, tuple)) else [channel]:
+        _modes[pin] = direction
+        _levels.setdefault(pin, LOW if initial is None else initial)
+
+
+def output(channel, value):
+    pins = channel if isinstance(channel, (list, tuple)) else [channel]
+    values = value if isinstance(value, (list, tuple)) else [value] * len(pins)
+    wiring = _wire()
+    for pin, v in zip(pins, values):
+        was = _levels.get(pin, LOW)
+        _levels[pin] = HIGH if v else LOW
+        # falling edge of a TRIG pulse fires that sensor
+        if was and not v and pin in wiring["trig"]:
+            _ping(wiring["trig"][pin])
+
+
+def input(channel):
+    return _levels.get(channel, LOW)
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    _callbacks[channel] = (edge, callback)
+
+
+def remove_event_detect(channel):
+    _callbacks.pop(channel, None)
+
+
+def cleanup(channel=None):
+    pins = list(_levels) if channel is None else channel if isinstance(channel, (list, tuple)) else [channel]
+    for pin in pins:
+        _levels[pin] = LOW
+
+
+class PWM:
+    def __init__(self, channel, frequency):
+        self.channel = channel
+        self.frequency = frequency
+
+    def start(self, duty):
+        _duty[self.channel] = float(duty)
+
+    def ChangeDutyCycle(self, duty):
+        _duty[self.channel] = float(duty)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        _duty[self.channel] = 0.0
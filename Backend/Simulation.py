@@ -0,0 +1,172 @@
+"""
+Simulation.py - Run the robot's behaviours against SimGPIO
+===========================================================
+
+Runs the real Autonomous / SmartExploration / Follow_me code with the
+simulated GPIO backend and prints what happened in the simulated world:
+simulated time, distance driven, collisions, pings and floor coverage.
+
+Usage:
+    SIM_SPEEDUP=4 python Simulation.py explore 60   # Autonomous reactive explore
+    SIM_SPEEDUP=4 python Simulation.py dfs 60       # SmartExploration DFS
+    SIM_SPEEDUP=4 python Simulation.py frontier 120 # FrontierExplorer (maps with odometry)
+    python Simulation.py follow 60                  # Follow_me to the world's "person"
+    python Simulation.py route 60                   # PathPlanner to the world's "person"
+    SIM_WORLD=world.json python Simulation.py explore 60
+
+The last argument is the wall clock budget in seconds. SIM_SPEEDUP runs
+the whole stack on an accelerated clock (see Clock.py), simulated time is
+reported next to wall time.
+"""
+
+import os
+import sys
+
+# must be chosen before anything imports GpioBackend
+os.environ.setdefault("ROBOT_GPIO", "sim")
+
+import asyncio
+import time
+
+import MotorControl as motor
+import ObstaclePrediction as sensor
+from Clock import clock
+from FrontierExplorer import explorer
+from GpioBackend import GPIO, SIMULATED
+from MotionExecutor import executor
+from OccupancyGrid import grid
+from Odometry import odometry
+from PathPlanner import FRONT_MARGIN_CM, drive_leg, planner
+from SafetyStop import safety
+from SensorHealth import health
+from SensorSampler import sampler
+from VisualOdometry import visual
+from config import VO_ENABLED
+
+CELL = 10.0  # cm, coverage grid
+
+
+class LogIpc:
+    """Prints what would go to the web UI."""
+
+    async def send(self, msg):
+        print("[IPC]", msg.get("command"))
+
+
+async def track_coverage(world, visited):
+    while True:
+        x, y, _ = world.pose()
+        visited.add((int(x // CELL), int(y // CELL)))
+        await clock.asleep(0.05)
+
+
+async def run_explore():
+    from Autonomous import RecurringPattern, autonomousExplore
+    pattern = RecurringPattern()
+    while True:
+        await autonomousExplore(pattern)
+
+
+async def run_dfs():
+    from SmartExploration import Node
+    depth = 5
+    while True:
+        await Node().DFS(depth)
+        depth += 1
+
+
+async def run_frontier():
+    explorer.start()
+    while await explorer.step():
+        await clock.asleep(0.2)
+    print("[Sim] nothing left to explore")
+
+
+async def run_follow(world, target="person"):
+    import Follow_me
+    # simulated camera: bearing of the target in the world
+    Follow_me.object_track = world.object_track
+    started = world.sim_time
+    await Follow_me.goToTarget(target, LogIpc(), False, None, 40, 5)
+    print(f"[Sim] reached {target} after {world.sim_time - started:.1f} s simulated")
+
+
+async def run_route(world, target="person", stop_cm=None):
+    import math
+    if stop_cm is None:
+        # drive_leg keeps FRONT_MARGIN_CM between the front sensor and the target's face
+        stop_cm = FRONT_MARGIN_CM + GPIO.RADIUS + GPIO.TARGET_SIZE / 2 + 5
+    # the target in the odometry frame, which starts at the world's start pose
+    x0, y0, h0 = world.pose()
+    tx, ty = world.targets[target]
+    h = math.radians(-h0)
+    goal = ((tx - x0) * math.cos(h) - (ty - y0) * math.sin(h),
+            (tx - x0) * math.sin(h) + (ty - y0) * math.cos(h))
+    started = world.sim_time
+    while True:
+        x, y, _ = odometry.pose()
+        if math.hypot(goal[0] - x, goal[1] - y) <= stop_cm:
+            break
+        route = planner.plan((x, y), goal)
+        print(f"[Sim] plan {planner.last}")
+        if not route:
+            await executor.run("right", degrees=45)  # look for a way round
+            continue
+        if await drive_leg(route[0], 30) == 0:
+            # within FRONT_MARGIN_CM of the front echo: the target itself on the last leg
+            if len(route) == 1:
+                break
+            await executor.run("right", degrees=45)  # blocked, look for a way round
+        await clock.asleep(0.2)
+    print(f"[Sim] reached {target} after {world.sim_time - started:.1f} s simulated")
+
+
+async def main(behaviour, seconds):
+    if not SIMULATED:
+        raise SystemExit("Simulation.py needs ROBOT_GPIO=sim")
+    world = GPIO.world
+
+    motor.initialSetUp()
+    motor.setup()
+    await sensor.setup()
+    sampler.start()
+    if VO_ENABLED:
+        from Camera import camera
+        visual.start(camera)
+
+    visited = set()
+    coverage = asyncio.create_task(track_coverage(world, visited))
+    mapping = asyncio.create_task(grid.run())
+    runs = {"explore": run_explore, "dfs": run_dfs, "frontier": run_frontier,
+            "follow": lambda: run_follow(world), "route": lambda: run_route(world)}
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(runs[behaviour](), seconds)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        coverage.cancel()
+        mapping.cancel()
+        motor.stop()
+        sampler.stop()
+        visual.stop()
+
+    x, y, heading = world.pose()
+    print(f"[Sim] {behaviour}: {time.perf_counter() - started:.1f} s wall, {world.sim_time:.1f} s simulated (x{clock.speedup:g})")
+    print(f"[Sim] travelled {world.travelled:.0f} cm, collisions {world.collisions}, pings {world.pings}")
+    print(f"[Sim] coverage {len(visited) * CELL * CELL / 1e4:.2f} m^2, final pose ({x:.0f}, {y:.0f}, {heading:.0f} deg)")
+    print(f"[Sim] sampler {sampler.stats()}")
+    print(f"[Sim] motion {executor.stats()}")
+    print(f"[Sim] odometry {odometry.stats()} (true travelled {world.travelled:.0f} cm)")
+    print(f"[Sim] visual odometry {visual.stats()} (true heading {heading:.0f} deg)")
+    print(f"[Sim] map {grid.stats()}")
+    print(f"[Sim] explorer {explorer.stats()}")
+    print(f"[Sim] planner {planner.stats()}")
+    print(f"[Sim] safety stop {safety.stats()}")
+    print(f"[Sim] sensor health {health.unhealthy() or 'all ok'}, slot ms {health.snapshot()['slot_ms']}")
+
+
+if __name__ == "__main__":
+    behaviour = sys.argv[1] if len(sys.argv) > 1 else "explore"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    asyncio.run(main(behaviour, seconds))
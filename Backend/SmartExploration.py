@@ -1,6 +1,9 @@
 import time
 import MotorControl as motor
 import ObstaclePrediction as sensor
+from MotionExecutor import executor
+from Clock import clock
+from Odometry import calibration
 from enum import Enum, auto
 import asyncio 
 
@@ -14,6 +17,7 @@ class Movement:
 
     distanceThreshold = 30 # cm
     estimateMovementDistance = 10 # Robot estimated to move 10cm at a time
+    turnAngle = 60 # degrees per left/right child (was 0.5 s at ~120 deg/s)
 
     async def getSensorDistances():
         return await sensor.get_all_distances()
@@ -42,59 +46,42 @@ class Movement:
 
             case Movement.Directions.REVERSE:
                 currentDistance = distances["back"]
-
-            case Movement.Directions.LEFT:
-                currentDistance = distances["left"]
-                return 0.5
-            
-            case Movement.Directions.RIGHT:
-                currentDistance = distances["right"]
-                return 0.5
         
         allowedDistance = currentDistance - Movement.distanceThreshold
 
-        if (allowedDistance > 16):
-            currentNode.movementDistanceTime = 0.25
-            return 0.25
+        # calibrated cm -> s of this robot (see Calibration.py)
+        if (allowedDistance > Movement.estimateMovementDistance + 5):
+            currentNode.movementDistanceTime = calibration.seconds_for_cm(Movement.estimateMovementDistance)
         elif (allowedDistance < 0):
             currentNode.movementDistanceTime = 0
-            return 0
         else:
             print(f"Robot movement exceeds threshold. Moving only {allowedDistance} cm instead of {Movement.estimateMovementDistance}")
-            currentNode.movementDistanceTime = (allowedDistance * 0.022) + 0.033
-            return (allowedDistance * 0.022) + 0.033 # 0.022s = 1cm of movement, added extra 1.5cm to exceed to threshold
+            # added extra 1.5cm to exceed to threshold
+            currentNode.movementDistanceTime = calibration.seconds_for_cm(allowedDistance + 1.5)
+        return currentNode.movementDistanceTime
         
     async def forward(timeOfSleep):
 
         print(f"Going forward at time: {timeOfSleep}")
-        motor.move_forward()
-        await asyncio.sleep(timeOfSleep)
-        motor.stop()
-        await asyncio.sleep(0.3)
+        await executor.run("forward", timeOfSleep)
+        await clock.asleep(0.3)
 
     async def reverse(timeOfSleep):
-        motor.move_backward()
-        await asyncio.sleep(timeOfSleep)
-        motor.stop()
-        await asyncio.sleep(0.3)
-
-    async def left(timeOfSleep):
-        motor.move_left()
-        await asyncio.sleep(timeOfSleep)
-        motor.stop()
-        await asyncio.sleep(0.3)
-
-    async def right(timeOfSleep):
-        motor.move_right()
-        await asyncio.sleep(timeOfSleep)
-        motor.stop()
-        await asyncio.sleep(0.3)
+        await executor.run("backward", timeOfSleep)
+        await clock.asleep(0.3)
+
+    # turns are measured in degrees (closed loop when the executor can), not timed
+    async def left():
+        await executor.run("left", degrees=Movement.turnAngle)
+        await clock.asleep(0.3)
+
+    async def right():
+        await executor.run("right", degrees=Movement.turnAngle)
+        await clock.asleep(0.3)
 
     async def turn180():
-        motor.move_right()
-        await asyncio.sleep(1.5)
-        motor.stop()
-        await asyncio.sleep(0.3)
+        await executor.run("right", degrees=180)
+        await clock.asleep(0.3)
 
     async def returnToParent(currentNode):
         match currentNode.parentMovement:
@@ -108,12 +95,12 @@ class Movement:
                 await Movement.forward(currentNode.movementDistanceTime)
 
             case Movement.Directions.LEFT:
-                print("Moving right to parent at time: {parentMovementTime}")
-                await Movement.right(currentNode.movementDistanceTime)
+                print(f"Turning right {Movement.turnAngle} deg back to parent")
+                await Movement.right()
 
             case Movement.Directions.RIGHT:
-                print("Moving left to parent at time: {parentMovementTime}")
-                await Movement.left(currentNode.movementDistanceTime)
+                print(f"Turning left {Movement.turnAngle} deg back to parent")
+                await Movement.left()
 
 class Node:
 
@@ -209,11 +196,11 @@ class Node:
 
                     case Movement.Directions.LEFT:
                         print("Exploring left child")
-                        await Movement.left(Movement.getMoveDistanceTime(currentNode, await Movement.getSensorDistances()))
+                        await Movement.left()
 
                     case Movement.Directions.RIGHT:
                         print("Exploring right child")
-                        await Movement.right(Movement.getMoveDistanceTime(currentNode, await Movement.getSensorDistances()))
+                        await Movement.right()
 
             currentNode.createChildNodes(await Movement.getSensorDistances())
 
@@ -0,0 +1,193 @@
+"""
+Teleop.py - Hold-to-drive manual control
+=========================================
+
+Holding a key (or button) in the UI resends the same {"type": "motor"}
+message every MOTOR_REPEAT_MS (150 ms, Interaction.tsx), well inside the
+deadman, and releasing it sends {"command": "stop"}. Each message used to
+become a full move / sleep / stop cycle, so the queue filled up and the
+robot stuttered through the backlog long after the key was released. Now:
+
+  - the first message of a direction starts continuous motion, at least
+    for the old tap duration (0.25 s straight, 0.7 s turns)
+  - repeats of the same direction only push the deadman deadline out;
+    TELEOP_DEADMAN_S without a message stops the robot
+  - "stop" (release) stops at once, or at the end of the tap duration
+    for a quick tap
+  - queued messages are coalesced (only the newest counts) and messages
+    older than TELEOP_STALE_S are dropped
+  - key-to-wheel latency (message received -> pins written) is recorded
+  - forward / backward are slowed down or refused near obstacles, also
+    while held (CollisionGuard)
+
+Usage (Manual mode):
+    await teleop.run(motor_queue, ipc)   # items: (msg, received perf_counter_ns)
+"""
+
+import asyncio
+import math
+import time
+from typing import Dict, Optional
+
+from CollisionGuard import GUARDED, guard
+from config import TELEOP_DEADMAN_S, TELEOP_MAX_HOLD_S, TELEOP_STALE_S
+from MotionExecutor import executor
+from SensorHealth import Histogram
+
+# UI direction -> (motion, minimum duration of a single tap)
+DIRECTIONS = {
+    "front": ("forward", 0.25),
+    "back": ("backward", 0.25),
+    "left": ("left", 0.7),
+    "right": ("right", 0.7),
+}
+LATENCY_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+GUARD_CHECK_S = 0.05  # collision guard re-check while a straight motion is held
+SPEED_STEP = 0.1      # smaller guard speed changes are not applied
+
+
+class HoldToDrive:
+    def __init__(self, deadman: float = TELEOP_DEADMAN_S, stale: float = TELEOP_STALE_S,
+                 max_hold: float = TELEOP_MAX_HOLD_S):
+        self.deadman = deadman
+        self.stale = stale
+        self.max_hold = max_hold
+
+        # Telemetry
+        self.messages = 0
+        self.holds = 0
+        self.repeats = 0
+        self.coalesced = 0
+        self.dropped_stale = 0
+        self.deadman_stops = 0
+        self._task: Optional[asyncio.Task] = None
+        self.latency_ms = Histogram(LATENCY_MS_BUCKETS)
+
+    def _newest(self, queue: asyncio.Queue, item):
+        """Coalesces everything already queued into the newest item."""
+        while not queue.empty():
+            item = queue.get_nowait()
+            self.messages += 1
+            self.coalesced += 1
+        return item
+
+    async def run(self, queue: asyncio.Queue, ipc):
+        direction: Optional[str] = None
+        deadline = started = 0.0
+        speed = 0.0
+        next_check = math.inf
+        releasing = False
+        self._task = None
+        try:
+            while True:
+                if direction:
+                    now = time.perf_counter()
+                    if now >= next_check:
+                        # still driving: the obstacle ahead may have come closer
+                        speed = await self._recheck(ipc, direction, speed, started)
+                        next_check = now + GUARD_CHECK_S
+                    timeout = max(0.0, min(deadline, next_check) - now)
+                else:
+                    timeout = None
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                    self.messages += 1
+                except asyncio.TimeoutError:
+                    if time.perf_counter() < deadline:
+                        continue
+                    # key released (or connection lost): deadman stop
+                    executor.stop()
+                    self.deadman_stops += not releasing
+                    await self._released(ipc, direction, started)
+                    direction = None
+                    continue
+
+                msg, received_ns = self._newest(queue, item)
+                age = (time.perf_counter_ns() - received_ns) / 1e9
+                if age > self.stale:
+                    self.dropped_stale += 1
+                    continue
+
+                command = msg.get("command")
+                now = time.perf_counter()
+                if command not in DIRECTIONS:
+                    tap_end = started + DIRECTIONS[direction][1] if direction else 0.0
+                    if command == "stop" and now < tap_end:
+                        # quick tap: finish the minimum move, then stop
+                        deadline, releasing = tap_end, True
+                        continue
+                    executor.stop()
+                    if direction:
+                        await self._released(ipc, direction, started)
+                    direction = None
+                    continue
+
+                if command == direction and not releasing:
+                    # still held: keep going
+                    self.repeats += 1
+                    deadline = max(deadline, now + self.deadman)
+                    continue
+
+                # new press or change of direction: preempts the running motion at once
+                if direction:
+                    await self._released(ipc, direction, started)
+                motion, tap = DIRECTIONS[command]
+                direction, started, releasing = command, now, False
+                deadline = now + max(tap, self.deadman)
+                self.holds += 1
+                # shared autonomy: slower, or not at all, toward a close obstacle
+                speed = guard.limit(motion)
+                next_check = now + GUARD_CHECK_S if motion in GUARDED and guard.enabled else math.inf
+                if speed == 0:
+                    executor.stop()
+                    await self._refused(ipc, direction)
+                    continue
+                self._drive(motion, self.max_hold, speed, received_ns)
+                await asyncio.sleep(0)  # let it write the pins
+                self.latency_ms.observe((executor.last_start_ns - received_ns) / 1e6)
+        finally:
+            executor.stop()
+            if self._task is not None:
+                self._task.cancel()
+
+    def _drive(self, motion, seconds, speed, issued_ns=None):
+        self._task = asyncio.create_task(executor.run(motion, seconds, speed=speed, issued_ns=issued_ns))
+
+    async def _recheck(self, ipc, direction, speed, started) -> float:
+        """Applies the guard's current limit to a held motion, returns the new speed."""
+        motion = DIRECTIONS[direction][0]
+        allowed = guard.limit(motion)
+        if allowed == speed or (allowed and speed and abs(allowed - speed) < SPEED_STEP):
+            return speed
+        if allowed == 0:
+            executor.stop()
+            await self._refused(ipc, direction)
+        else:
+            self._drive(motion, max(0.1, self.max_hold - (time.perf_counter() - started)), allowed)
+        return allowed
+
+    async def _refused(self, ipc, direction):
+        distance = guard.last.get("distance")
+        print(f"[Manual] {direction} refused, obstacle at {distance} cm")
+        await ipc.send({"type": "log", "command": f"Obstacle {direction} ({distance} cm), not moving"})
+
+    async def _released(self, ipc, direction, started):
+        held = time.perf_counter() - started
+        print(f"[Manual] {direction} held {held:.2f}s | {self.stats()}")
+        await ipc.send({"type": "log", "command": f"Robot moved {direction} ({held:.1f}s)"})
+
+    def stats(self) -> Dict:
+        return {
+            "messages": self.messages,
+            "holds": self.holds,
+            "repeats": self.repeats,
+            "coalesced": self.coalesced,
+            "dropped_stale": self.dropped_stale,
+            "deadman_stops": self.deadman_stops,
+            "latency_ms": {k: self.latency_ms.to_dict()[k] for k in ("count", "mean", "p50", "p95")},
+            "guard": guard.stats(),
+        }
+
+
+# Single instance shared by all modules
+teleop = HoldToDrive()
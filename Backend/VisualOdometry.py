@@ -0,0 +1,313 @@
+"""
+VisualOdometry.py - Yaw rate and forward motion from the camera
+================================================================
+
+Turns are timed pulses, so the heading drifts with battery level and
+floor. A thread tracks sparse features (Shi-Tomasi corners, pyramidal
+Lucas-Kanade flow, forward-backward checked) between downscaled grayscale
+frames of the camera. The flow is converted to viewing angles (focal
+length from VO_HFOV_DEG) and fitted robustly:
+
+  - yaw shifts every azimuth by the same angle: counter-clockwise
+    positive, like Odometry
+  - moving forward spreads the points away from the centre: the expansion
+    rate (1/s) is the forward speed divided by the depth of the scene
+    ahead, so forward_speed(front distance) is cm/s
+
+Frames are processed at most VO_MAX_FPS times a second, and less often
+when that would take more than VO_CPU_BUDGET of one core. With too few
+features agreeing on the motion (blank wall, motion blur) tracking is
+lost and closed-loop turns fall back to timing (see MotionExecutor).
+
+Usage:
+    from VisualOdometry import visual
+    visual.start(camera)
+    visual.yaw_now(), visual.tracking()
+
+    python VisualOdometry.py record turn.mp4 10   # record the camera
+    python VisualOdometry.py bench turn.mp4       # replay a recording
+"""
+
+import math
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from Clock import clock
+from SensorHealth import Histogram
+from config import VO_CPU_BUDGET, VO_HFOV_DEG, VO_MAX_FPS, VO_WIDTH
+
+MAX_FEATURES = 80
+MIN_FEATURES = 8       # agreeing points needed to trust a frame
+FEATURE_QUALITY = 0.01
+FEATURE_SPACING = 8    # px, at VO_WIDTH
+LK_WINDOW = (15, 15)
+LK_LEVELS = 3
+FB_MAX_PX = 1.0       # forward-backward tracking error
+INLIER_PX = 1.5       # flow residual of a point agreeing with the fit
+MAX_YAW_RATE = 400.0   # deg/s, faster fits are tracking errors
+TRACK_STALE_S = 0.3    # no fit for this long = not tracking (the last yaw rate is kept until then)
+PROCESS_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100]
+
+
+class VisualOdometry:
+    def __init__(self, width: int = VO_WIDTH, hfov_deg: float = VO_HFOV_DEG,
+                 max_fps: float = VO_MAX_FPS, budget: float = VO_CPU_BUDGET):
+        self.width = width
+        self.focal = width / 2 / math.tan(math.radians(hfov_deg) / 2)
+        self.max_fps = max_fps
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._prev = None
+        self._points = None
+        self._step_yaw = 0.0  # rad, last frame to frame yaw (initial guess for the flow)
+
+        # estimate, as of the frame captured at t
+        self.yaw = 0.0             # deg, counter-clockwise positive, not wrapped
+        self.yaw_rate = 0.0        # deg/s
+        self.expansion_rate = 0.0  # 1/s
+        self.t = 0.0
+        self._measured_t = 0.0  # last frame with a fit
+        self._tracking = False
+
+        # Telemetry
+        self.frames = 0
+        self.lost = 0
+        self.reseeds = 0
+        self.cpu_s = 0.0
+        self.process_ms = Histogram(PROCESS_MS_BUCKETS)
+        self._cost = 0.0  # EWMA of the CPU seconds per frame
+        self._started = 0.0
+
+    # ---------- estimation ----------
+    def update(self, frame, t: float) -> bool:
+        """Processes one frame (BGR or grayscale) captured at t. True if the motion was measured."""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height = round(gray.shape[0] * self.width / gray.shape[1])
+        small = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+
+        measured = False
+        points = None
+        if self._prev is not None and self._points is not None and len(self._points):
+            p0 = self._points
+            # start the search where the last frame's yaw would put the points
+            guess = self._predict(p0, height, self._step_yaw)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, small, p0, guess, winSize=LK_WINDOW,
+                                                     maxLevel=LK_LEVELS, flags=cv2.OPTFLOW_USE_INITIAL_FLOW)
+            # forward-backward check against the repetitive texture traps
+            back, back_status, _ = cv2.calcOpticalFlowPyrLK(small, self._prev, p1,
+                                                            self._predict(p1, height, -self._step_yaw),
+                                                            winSize=LK_WINDOW, maxLevel=LK_LEVELS,
+                                                            flags=cv2.OPTFLOW_USE_INITIAL_FLOW)
+            error = np.abs(back - p0).reshape(-1, 2).max(1)
+            good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < FB_MAX_PX)
+            if good.sum() >= MIN_FEATURES:
+                inliers = self._estimate(p0[good], p1[good], height, t)
+                if inliers is not None:
+                    measured = True
+                    points = p1[good][inliers]
+        if not measured and self._prev is not None:
+            self._coast(t)
+
+        # new corners when too many were lost
+        if points is None or len(points) < MAX_FEATURES // 2:
+            points = cv2.goodFeaturesToTrack(small, MAX_FEATURES, FEATURE_QUALITY, FEATURE_SPACING)
+            self.reseeds += 1
+        self._points = points.reshape(-1, 1, 2).astype(np.float32) if points is not None else None
+        self._prev = small
+
+        self.frames += 1
+        cost = time.thread_time() - cpu
+        self.cpu_s += cost
+        self._cost = cost if self.frames == 1 else 0.9 * self._cost + 0.1 * cost
+        self.process_ms.observe((time.perf_counter() - wall) * 1000)
+        return measured
+
+    def _coast(self, t: float):
+        """A frame without a fit: short gaps keep the last yaw rate, longer ones lose tracking."""
+        self.lost += 1
+        with self._lock:
+            dt = t - self.t
+            if self._tracking and t - self._measured_t < TRACK_STALE_S:
+                self.yaw += self.yaw_rate * dt
+            else:
+                self._tracking = False
+                self.yaw_rate = self.expansion_rate = 0.0
+                self._step_yaw = 0.0
+            self.t = t
+
+    def _angles(self, points, height: int):
+        """Azimuth (rad, left positive) and tan(elevation) of image points."""
+        x = ((self.width - 1) / 2 - points[:, 0, 0]) / self.focal
+        y = ((height - 1) / 2 - points[:, 0, 1]) / self.focal
+        return np.arctan(x), y / np.hypot(x, 1.0)
+
+    def _predict(self, points, height: int, dyaw: float):
+        """Where points move when the camera turns by dyaw (rad)."""
+        azimuth, _ = self._angles(points, height)
+        azimuth = np.clip(azimuth - dyaw, -1.5, 1.5)
+        guess = points.copy()
+        guess[:, 0, 0] = (self.width - 1) / 2 - self.focal * np.tan(azimuth)
+        return guess
+
+    def _estimate(self, p0, p1, height: int, t: float):
+        """
+        Fits yaw and expansion to the flow, returns the inlier mask (None if
+        too few points agree). Turning left by dyaw shifts every azimuth by
+        -dyaw and leaves elevations alone; moving forward by a fraction e of
+        the depth scales tan(elevation) by 1 + e and pushes azimuths outwards.
+        """
+        az0, el0 = self._angles(p0, height)
+        az1, el1 = self._angles(p1, height)
+        d_az, d_el = az1 - az0, el1 - el0
+        spread = np.sin(az0) * np.cos(az0)
+        dyaw, e = -float(np.median(d_az)), 0.0
+        tolerance = INLIER_PX / self.focal
+        for _ in range(2):
+            inliers = (np.abs(d_az + dyaw - e * spread) < tolerance) & (np.abs(d_el - e * el0) < tolerance)
+            if inliers.sum() < MIN_FEATURES:
+                return None
+            n = int(inliers.sum())
+            a = np.zeros((2 * n, 2))
+            a[:n, 0], a[:n, 1], a[n:, 1] = -1.0, spread[inliers], el0[inliers]
+            b = np.concatenate([d_az[inliers], d_el[inliers]])
+            dyaw, e = (float(v) for v in np.linalg.lstsq(a, b, rcond=None)[0])
+
+        with self._lock:
+            dt = t - self.t
+            if dt > 0 and abs(math.degrees(dyaw)) / dt > MAX_YAW_RATE:
+                return None
+            self._step_yaw = dyaw
+            self.yaw += math.degrees(dyaw)
+            if dt > 0:
+                self.yaw_rate = math.degrees(dyaw) / dt
+                self.expansion_rate = e / dt
+            self.t = self._measured_t = t
+            self._tracking = True
+        return inliers
+
+    # ---------- reading ----------
+    def tracking(self) -> bool:
+        """True while recent frames measure the motion."""
+        with self._lock:
+            return self._running and self._tracking and clock.now() - self._measured_t < TRACK_STALE_S
+
+    def yaw_now(self) -> float:
+        """Yaw (deg) extrapolated from the last frame to now."""
+        with self._lock:
+            if not self._tracking:
+                return self.yaw
+            return self.yaw + self.yaw_rate * min(clock.now() - self.t, TRACK_STALE_S)
+
+    def forward_speed(self, depth_cm: float) -> float:
+        """Forward speed (cm/s) when the scene ahead is depth_cm away (e.g. the front sensor)."""
+        return self.expansion_rate * depth_cm
+
+    # ---------- thread ----------
+    def start(self, camera):
+        """Tracks the frames of camera (CameraManager / SimCamera) in a thread."""
+        if self._running:
+            return
+        self._running = True
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(camera,), daemon=True, name="visual-odometry")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def _run(self, camera):
+        last = None
+        while self._running:
+            started = time.perf_counter()
+            frame = camera.get_frame()
+            if frame is not None and frame is not last:
+                last = frame
+                self.update(frame, getattr(camera, "latest_t", 0.0) or clock.now())
+            # frame rate cap, and no more than the CPU budget
+            period = max(1.0 / self.max_fps, self._cost / self.budget)
+            time.sleep(max(0.001, started + period - time.perf_counter()))
+
+    def stats(self) -> Dict:
+        elapsed = time.perf_counter() - self._started if self._running else 0.0
+        return {
+            "tracking": self.tracking(),
+            "yaw_deg": round(self.yaw, 1),
+            "yaw_rate": round(self.yaw_rate, 1),
+            "expansion_rate": round(self.expansion_rate, 3),
+            "frames": self.frames,
+            "lost": self.lost,
+            "reseeds": self.reseeds,
+            "fps": round(self.frames / elapsed, 1) if elapsed else None,
+            "cpu": round(self.cpu_s / elapsed, 3) if elapsed else None,
+            "process_ms": self.process_ms.to_dict(),
+        }
+
+
+# Single instance shared by all modules
+visual = VisualOdometry()
+
+
+#Test
+def bench(path):
+    """Replays a recording at VO_MAX_FPS (frames skipped like the live thread would)."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, round(fps / VO_MAX_FPS))
+    vo = VisualOdometry()
+    index = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index % step == 0:
+            vo.update(frame, index / fps)
+            if vo.frames % 15 == 0:
+                print(f"t={index / fps:6.2f}s yaw {vo.yaw:7.1f} deg rate {vo.yaw_rate:6.1f} deg/s "
+                      f"expansion {vo.expansion_rate:6.3f}/s")
+        index += 1
+    cap.release()
+    duration = index / fps
+    stats = vo.stats()
+    print(f"{path}: {duration:.1f} s of video, {vo.frames} frames processed, {vo.lost} lost, "
+          f"yaw {vo.yaw:.1f} deg")
+    print(f"per frame {stats['process_ms']['mean']} ms (p95 <= {stats['process_ms']['p95']} ms), "
+          f"CPU {vo.cpu_s / duration:.3f} of one core at {vo.frames / duration:.1f} fps")
+
+
+def record(path, seconds):
+    from Camera import camera
+    frame = None
+    while frame is None:
+        frame = camera.get_frame()
+        time.sleep(0.05)
+    fps = getattr(camera, "fps", 30)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (frame.shape[1], frame.shape[0]))
+    try:
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            out.write(camera.get_frame())
+            time.sleep(1.0 / fps)
+    finally:
+        out.release()
+        camera.stop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("bench", "record"):
+        raise SystemExit("usage: python VisualOdometry.py bench <video> | record <video> [seconds]")
+    if sys.argv[1] == "bench":
+        bench(sys.argv[2])
+    else:
+        record(sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 10)
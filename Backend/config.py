@@ -37,6 +37,144 @@ STT_SAMPLE_RATE = int(os.environ.get("STT_SAMPLE_RATE", "16000"))
 STT_VAD_SILENCE_MS = int(os.environ.get("STT_VAD_SILENCE_MS", "1200"))
 STT_MIN_UTTERANCE_SEC = float(os.environ.get("STT_MIN_UTTERANCE_SEC", "1.0"))
 
+# -------------------- Ultrasonic Sensors --------------------
+# How echo pulses are timed
+# - "edge" = GPIO edge callbacks, the event loop never blocks during a ping
+# - "poll" = busy wait on the echo pin (in a worker thread)
+ECHO_BACKEND = os.environ.get("ECHO_BACKEND", "edge")
+# Default max range (cm). Echoes longer than this are not waited for and
+# read as "clear beyond" the range; behaviours can change it (set_range).
+SENSOR_RANGE_CM = float(os.environ.get("SENSOR_RANGE_CM", "100"))
+# Seconds between sensor health pushes to the UI ({"type": "sensor_health"}), 0 = off
+SENSOR_HEALTH_PUSH_S = float(os.environ.get("SENSOR_HEALTH_PUSH_S", "5"))
+# Hard floor (cm): the sampler thread stops the motors itself when the sensor in
+# the direction of travel reads closer than this (SafetyStop.py), 0 = off.
+# Released once the reading is SAFETY_RELEASE_CM beyond the floor.
+SAFETY_STOP_CM = float(os.environ.get("SAFETY_STOP_CM", "15"))
+SAFETY_RELEASE_CM = float(os.environ.get("SAFETY_RELEASE_CM", "5"))
+
+# -------------------- Object Detection --------------------
+# Detection duty cycle per mode. Idle runs no detection, find/followMe run at
+# full rate (on demand), manual runs a low rate loop for the UI overlays.
+# Example: export DETECT_MANUAL_HZ=0.5  (0 disables the overlay loop)
+DETECT_MANUAL_HZ = float(os.environ.get("DETECT_MANUAL_HZ", "1.0"))
+
+# Tiled inference for small/far objects (spoon, remote, cell phone ...).
+# Only used by find when the normal pass saw nothing; TILE_BUDGET_S caps the
+# time spent on tiles per scanned direction.
+TILED_DETECT = os.environ.get("TILED_DETECT", "true").lower() in ("1", "true", "yes")
+TILE_SIZE = int(os.environ.get("TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", "0.2"))
+TILE_BUDGET_S = float(os.environ.get("TILE_BUDGET_S", "1.5"))
+
+# Detector models, loaded on demand and kept while they fit the RSS budget.
+# Format "name=weights,name=weights" / "mode=name,mode=name". Example:
+#   export DETECT_MODELS="yolov8n=yolov8n.pt,yolov8s=yolov8s.pt"
+#   export DETECT_MODE_MODELS="followMe=yolov8n,find=yolov8s"
+# Models can also be swapped at runtime with the web message
+#   {"type": "model", "mode": "find", "command": "yolov8s"}
+def _parse_map(value: str) -> dict:
+    return dict(item.split("=", 1) for item in value.replace(" ", "").split(",") if "=" in item)
+
+DETECT_MODELS = _parse_map(os.environ.get("DETECT_MODELS", "yolov8n=yolov8n.pt,yolov8s=yolov8s.pt"))
+DETECT_MODE_MODELS = _parse_map(os.environ.get("DETECT_MODE_MODELS", "manual=yolov8n,followMe=yolov8n,find=yolov8n"))
+DETECT_DEFAULT_MODEL = os.environ.get("DETECT_DEFAULT_MODEL", "yolov8n")
+DETECT_RSS_BUDGET_MB = float(os.environ.get("DETECT_RSS_BUDGET_MB", "400"))
+
+# Remote detection on a stronger machine running InferenceServer.py.
+# Empty address = always local. Requests slower than the deadline, or an
+# average latency over the budget, fall back to the local model.
+# Example: export REMOTE_DETECT_ADDR=192.168.1.50:5055
+REMOTE_DETECT_ADDR = os.environ.get("REMOTE_DETECT_ADDR", "")
+REMOTE_DETECT_DEADLINE_MS = float(os.environ.get("REMOTE_DETECT_DEADLINE_MS", "300"))
+REMOTE_DETECT_BUDGET_MS = float(os.environ.get("REMOTE_DETECT_BUDGET_MS", "200"))
+REMOTE_DETECT_WIDTH = int(os.environ.get("REMOTE_DETECT_WIDTH", "640"))
+REMOTE_DETECT_QUALITY = int(os.environ.get("REMOTE_DETECT_QUALITY", "80"))
+# most requests on the wire at once (camera frames streamed to the server)
+REMOTE_DETECT_INFLIGHT = int(os.environ.get("REMOTE_DETECT_INFLIGHT", "2"))
+
+# -------------------- Motors --------------------
+# Motor driver backend (see MotorDriver.py)
+# - "gpio"  = the GPIO library picked by ROBOT_GPIO (RPi.GPIO or the simulator)
+# - "lgpio" = lgpio, direction pins written as one group (Pi 5)
+# - "sim"   = always the simulator
+MOTOR_DRIVER = os.environ.get("MOTOR_DRIVER", "gpio").lower()
+# MotorControl.drive(linear, angular) velocity control
+# - MOTOR_ACCEL: wheel command change per second (4 = stop to full speed in 0.25 s, 0 = no ramp)
+# - MOTOR_MIN_DUTY: duty % where the motors start turning, the slowest drive() speed
+# - MOTOR_TRIM_LEFT/RIGHT: duty multipliers to make the robot drive straight
+# Example: export MOTOR_TRIM_LEFT=0.95
+MOTOR_ACCEL = float(os.environ.get("MOTOR_ACCEL", "4"))
+MOTOR_MIN_DUTY = float(os.environ.get("MOTOR_MIN_DUTY", "35"))
+MOTOR_TRIM_LEFT = float(os.environ.get("MOTOR_TRIM_LEFT", "1.0"))
+MOTOR_TRIM_RIGHT = float(os.environ.get("MOTOR_TRIM_RIGHT", "1.0"))
+# Default full speed ground speed / turn rate for distance and angle motion
+# commands and odometry (0.022 s per cm, turn180() = 1.5 s)
+MOTOR_CM_PER_S = float(os.environ.get("MOTOR_CM_PER_S", "45"))
+MOTOR_DEG_PER_S = float(os.environ.get("MOTOR_DEG_PER_S", "120"))
+# Per robot calibration of those two (written by Calibration.py, keyed by host name)
+ROBOT_CALIBRATION = Path(os.environ.get("ROBOT_CALIBRATION", str(ROOT / "calibration.json")))
+
+# -------------------- Visual Odometry --------------------
+# Yaw rate / forward motion from sparse optical flow on the camera (VisualOdometry.py)
+# - VO_WIDTH: frames are downscaled to this width (grayscale) before tracking
+# - VO_MAX_FPS / VO_CPU_BUDGET: frame rate cap, and the share of one core the
+#   tracking may use (the frame rate drops when frames take longer)
+# - VO_HFOV_DEG: horizontal field of view of the camera (C920 at 16:9: ~70)
+# - VO_CLOSED_LOOP_TURNS: angle turns stop on the measured yaw (false = timed turns)
+# - VO_STOP_LEAD_S: stop this early (at the current yaw rate) for coasting
+# Example: export VO_ENABLED=false
+VO_ENABLED = os.environ.get("VO_ENABLED", "true").lower() in ("1", "true", "yes")
+VO_WIDTH = int(os.environ.get("VO_WIDTH", "160"))
+VO_MAX_FPS = float(os.environ.get("VO_MAX_FPS", "15"))
+VO_CPU_BUDGET = float(os.environ.get("VO_CPU_BUDGET", "0.25"))
+VO_HFOV_DEG = float(os.environ.get("VO_HFOV_DEG", "70"))
+VO_CLOSED_LOOP_TURNS = os.environ.get("VO_CLOSED_LOOP_TURNS", "true").lower() in ("1", "true", "yes")
+VO_STOP_LEAD_S = float(os.environ.get("VO_STOP_LEAD_S", "0.05"))
+
+# -------------------- Mapping --------------------
+# Occupancy grid from the ultrasonic sensors and odometry (OccupancyGrid.py):
+# cell size, and the most cells kept (the grid forgets the far side beyond it,
+# 160000 float32 cells = 625 KB)
+GRID_CELL_CM = float(os.environ.get("GRID_CELL_CM", "5"))
+GRID_MAX_CELLS = int(os.environ.get("GRID_MAX_CELLS", "160000"))
+
+# Frontier exploration (FrontierExplorer.py, PathPlanner.py): how far routes keep from mapped
+# obstacles, and the longest leg driven before the next look around / replan
+EXPLORE_CLEARANCE_CM = float(os.environ.get("EXPLORE_CLEARANCE_CM", "20"))
+EXPLORE_STEP_CM = float(os.environ.get("EXPLORE_STEP_CM", "40"))
+
+# -------------------- Manual Driving --------------------
+# Hold-to-drive: the robot keeps moving while the UI repeats the key and
+# stops TELEOP_DEADMAN_S after the last message. Commands that waited in the
+# queue longer than TELEOP_STALE_S are dropped. TELEOP_MAX_HOLD_S caps one hold.
+TELEOP_DEADMAN_S = float(os.environ.get("TELEOP_DEADMAN_S", "0.3"))
+TELEOP_STALE_S = float(os.environ.get("TELEOP_STALE_S", "0.5"))
+TELEOP_MAX_HOLD_S = float(os.environ.get("TELEOP_MAX_HOLD_S", "10"))
+# Collision guard (CollisionGuard.py): forward/backward commands are slowed
+# down or refused when the sensor snapshot shows an obstacle within the
+# braking distance at that speed:
+#   speed * GUARD_REACTION_S + speed^2 / (2 * GUARD_DECEL) + GUARD_MARGIN_CM
+# GUARD_REACTION_S covers the sensor refresh and the guard's check period;
+# keep GUARD_MARGIN_CM above SAFETY_STOP_CM so the guard acts first.
+# Example: export GUARD_ENABLED=false
+GUARD_ENABLED = os.environ.get("GUARD_ENABLED", "true").lower() in ("1", "true", "yes")
+GUARD_REACTION_S = float(os.environ.get("GUARD_REACTION_S", "0.2"))
+GUARD_DECEL = float(os.environ.get("GUARD_DECEL", "150"))  # cm/s^2
+GUARD_MARGIN_CM = float(os.environ.get("GUARD_MARGIN_CM", "20"))
+
+# -------------------- GPIO / Simulation --------------------
+# Which GPIO library drives the motors and sensors
+# - "rpi"  = RPi.GPIO (the robot)
+# - "sim"  = SimGPIO, a simulated robot in a 2D world (runs on any machine)
+# - "auto" = RPi.GPIO when it can be imported, else the simulator
+# Example: ROBOT_GPIO=sim SIM_SPEEDUP=4 python Simulation.py explore 60
+ROBOT_GPIO = os.environ.get("ROBOT_GPIO", "rpi").lower()
+# The simulator's clock (Clock.py) runs this many times faster than real time
+SIM_SPEEDUP = float(os.environ.get("SIM_SPEEDUP", "1"))
+# JSON world file (walls, boxes, start pose, targets), empty = built-in room
+SIM_WORLD = os.environ.get("SIM_WORLD", "")
+
 def validate():
     msgs = []
     if TTS_BACKEND == "piper":
@@ -3,6 +3,7 @@ from IpcClient import WebRTC
 from CommandHandler import setup, Manual, web_cmd_listner, voice_cmd_listner
 import MotorControl as motor
 import ObstaclePrediction as sensor
+from SensorSampler import sampler
 from Controller import ModeController, MediumController
 from concurrent.futures import ThreadPoolExecutor
 from ExecUtil import run_webrtc_script, stream_webrtc_process
@@ -10,12 +11,24 @@ from voice_listener import start_listener
 from Face import RobotFace, EMOTION_MAP
 import cv2
 from Camera import camera
+from DetectionScheduler import duty_cycle
+from ModelRegistry import registry
+from robot_utils import get_objects_at
+from SensorHealth import health
+from VisualOdometry import visual
+from OccupancyGrid import grid
+from config import SENSOR_HEALTH_PUSH_S, VO_ENABLED
 
 async def main():
     #GPIO setup
     motor.initialSetUp()
     motor.setup()
     await sensor.setup()
+    # keeps a fresh snapshot of the four distances in the background
+    sampler.start()
+    # heading from the camera, for closed-loop turns
+    if VO_ENABLED:
+        visual.start(camera)
 
     loop = asyncio.get_running_loop()
     # executor for threaded code, change workers to 3 if necessary
@@ -26,6 +39,10 @@ async def main():
     ipc = WebRTC("/tmp/pi-webrtc-ipc.sock")
     mc = ModeController()
     medc= MediumController()
+    # detection only runs in the modes that need it
+    mc.add_listener(duty_cycle.set_mode)
+    # preloads/warms the detector of the mode being entered
+    mc.add_listener(registry.set_mode)
 
     # Robot Face Initialization
     face= RobotFace()
@@ -56,8 +73,14 @@ async def main():
     try:
         tasks = [
             asyncio.create_task(web_cmd_listner()),   
-            asyncio.create_task(voice_cmd_listner())     
+            asyncio.create_task(voice_cmd_listner()),
+            asyncio.create_task(duty_cycle.run(ipc, get_objects_at)),
+            # occupancy grid from every sensor reading and odometry
+            asyncio.create_task(grid.run()),
         ]
+        # per sensor counters/latency histograms for the UI
+        if SENSOR_HEALTH_PUSH_S > 0:
+            tasks.append(asyncio.create_task(health.push(ipc, SENSOR_HEALTH_PUSH_S)))
         await asyncio.gather(face_task,webrtc_task,listener_task, *tasks)
 
 
@@ -69,6 +92,8 @@ async def main():
         await asyncio.gather(*tasks, return_exceptions=True)
         print("All tasks cancelled.")
     finally:
+        sampler.stop()
+        visual.stop()
         motor.cleanup()
         cv2.destroyAllWindows()
         camera.stop()
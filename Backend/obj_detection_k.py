@@ -1,8 +1,6 @@
-from ultralytics import YOLO
 from Camera import camera
-
-# Load YOLO model
-model = camera.get_yolo()
+from DetectionScheduler import duty_cycle
+from robot_utils import detect_boxes, detect_current
 
 def object_track(target_name:str):
     """
@@ -10,27 +8,25 @@ def object_track(target_name:str):
       direction: 'left', 'center', 'right', or None
       area: size of bounding box (used for distance)
     """
-    frame = camera.get_frame()
-    results = model(frame)
+    if not duty_cycle.allowed():
+        return None, None
+
+    # local model or the LAN inference server's newest answer
+    boxes = detect_current()
 
     best_box = None
     best_area = 0
 
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls[0])
-            name:str = model.names[cls]
+    for name, _, x1, y1, x2, y2 in boxes:
+        if name.casefold() != target_name.casefold():
+            continue
 
-            if name.casefold() != target_name.casefold():
-                continue
+        area = (x2 - x1) * (y2 - y1)
 
-            x1, y1, x2, y2 = box.xyxy[0]
-            area = (x2 - x1) * (y2 - y1)
-
-            # keep the biggest detection (closest)
-            if area > best_area:
-                best_area = area
-                best_box = (x1, y1, x2, y2)
+        # keep the biggest detection (closest)
+        if area > best_area:
+            best_area = area
+            best_box = (x1, y1, x2, y2)
 
     if best_box is None:
         print("returned nothjing")
@@ -55,15 +51,8 @@ def object_track(target_name:str):
 if __name__ == "__main__":
     print("Starting obstacle detection... Press Ctrl+C to stop.")
     while True:
-        frame = picam2.capture_array()
-        results = model(frame)
-
-        det_names = []
-        for r in results:
-            for box in r.boxes:
-                cls = int(box.cls[0])
-                name = model.names[cls]
-                det_names.append(name)
+        frame = camera.get_frame()
+        det_names = [name for name, *_ in detect_boxes(frame)]
 
         if det_names:
             print("Detected:", det_names)
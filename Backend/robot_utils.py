@@ -14,11 +14,16 @@ REQUIRED FUNCTIONS (per teammate spec):
 3. async def get_objects_at() -> List[Dict]
    - YOLO detection, returns: [{"name", "direction", "area", "confidence"}]
 
+4. async def get_small_objects_at(target: str) -> List[Dict]
+   - Tiled full resolution YOLO pass for small/far objects, same format
+
 """
 
-from ultralytics import YOLO
 from Camera import camera
-import time as t
+from ModelRegistry import registry
+from DetectionScheduler import duty_cycle
+from TiledDetection import tiled
+from RemoteDetection import remote
 
 import asyncio
 import shutil
@@ -211,16 +216,13 @@ async def ask_llm(user_text: str) -> Dict[str, Any]:
 
 # ================== Object Detection (async) ==================
 _detector_initialized = False
-_yolo_model = None
-model = camera.get_yolo()
 
 def _init_detector():
-    global _detector_initialized, _yolo_model
+    global _detector_initialized
     if _detector_initialized:
         return True
     try:
-        _yolo_model = YOLO(str(ROOT / "yolov8n.pt"))
-        t.sleep(1)
+        registry.active()
         _detector_initialized = True
         print("[Detection] YOLO initialized")
         return True
@@ -229,39 +231,80 @@ def _init_detector():
         return False
 
 
+def detect_boxes(frame) -> List[tuple]:
+    """
+    Runs the detector of the current mode on a frame (blocking).
+    Uses the LAN inference server when configured and healthy, else the local model.
+
+    Returns: [(name, confidence, x1, y1, x2, y2), ...] in frame coordinates
+    """
+    started = time.perf_counter()
+    if remote.available():
+        boxes = remote.detect(frame, registry.name_for(registry.mode))
+        if boxes is not None:
+            duty_cycle.record_inference(time.perf_counter() - started)
+            return boxes
+    return _detect_local(frame, started)
+
+
+def detect_current() -> List[tuple]:
+    """
+    Detections of what the camera sees now (blocking). With the LAN server
+    the camera is streamed to it (RemoteDetector.start_stream) and the
+    newest answer is taken as it arrives, else the local model runs on the
+    latest frame. Same format as detect_boxes().
+    """
+    started = time.perf_counter()
+    if remote.available():
+        remote.start_stream(camera, lambda: registry.name_for(registry.mode), duty_cycle.allowed)
+        boxes = remote.latest(registry.name_for(registry.mode))
+        if boxes is not None:
+            duty_cycle.record_inference(time.perf_counter() - started)
+            return boxes
+    return _detect_local(camera.get_frame(), started)
+
+
+def _detect_local(frame, started: float) -> List[tuple]:
+    model = registry.active()
+    results = model(frame)
+    duty_cycle.record_inference(time.perf_counter() - started)
+
+    boxes = []
+    for r in results:
+        for box in r.boxes:
+            x1, y1, x2, y2 = [float(v) for v in box.xyxy[0]]
+            boxes.append((model.names[int(box.cls[0])], float(box.conf[0]), x1, y1, x2, y2))
+    return boxes
+
+
 def _get_objects_blocking() -> List[Dict[str, Any]]:
     """Detect objects in camera frame (blocking)."""
     if not _init_detector():
         return []
 
+    # idle mode: leave the CPU to STT/TTS/face
+    if not duty_cycle.allowed():
+        return []
+
     try:
-        frame = camera.get_frame()
-        results = model(frame)
-         
         detected = []
-        for r in results:
-            for box in r.boxes:
-                cls = int(box.cls[0])
-                name = _yolo_model.names[cls]
-                conf = float(box.conf[0])
-
-                x1, y1, x2, y2 = [float(v) for v in box.xyxy[0]]
-                area = (x2 - x1) * (y2 - y1)
-                x_center = (x1 + x2) / 2
-
-                if x_center < 640 * 0.33:
-                    direction = "left"
-                elif x_center > 640 * 0.66:
-                    direction = "right"
-                else:
-                    direction = "center"
-
-                detected.append({
-                    "name": name,
-                    "direction": direction,
-                    "area": area,
-                    "confidence": conf,
-                })
+        for name, conf, x1, y1, x2, y2 in detect_current():
+            area = (x2 - x1) * (y2 - y1)
+            x_center = (x1 + x2) / 2
+
+            if x_center < 640 * 0.33:
+                direction = "left"
+            elif x_center > 640 * 0.66:
+                direction = "right"
+            else:
+                direction = "center"
+
+            detected.append({
+                "name": name,
+                "direction": direction,
+                "area": area,
+                "confidence": conf,
+            })
 
         return detected
     except Exception as e:
@@ -281,6 +324,32 @@ async def get_objects_at() -> List[Dict[str, Any]]:
     return await loop.run_in_executor(None, _get_objects_blocking)
 
 
+def _get_small_objects_blocking(target: str) -> List[Dict[str, Any]]:
+    """Tiled full resolution pass looking only for target (blocking)."""
+    if not _init_detector() or not duty_cycle.allowed():
+        return []
+
+    try:
+        frame = camera.get_frame()
+        objects, info = tiled.detect(registry.active(), frame, target)
+        duty_cycle.record_inference(info["elapsed_s"])
+        print(f"[Detection] tiled pass for {target}: {info['tiles_run']}/{info['tiles_total']} tiles in {info['elapsed_s']}s")
+        return objects
+    except Exception as e:
+        print(f"[Detection] Tiled error: {e}")
+        return []
+
+
+async def get_small_objects_at(target: str) -> List[Dict[str, Any]]:
+    """
+    Slower tiled detection for small/far objects (async).
+
+    Same return format as get_objects_at(), only containing target.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _get_small_objects_blocking, target)
+
+
 def cleanup_detector():
     """Release camera resources."""
     global _detector_initialized
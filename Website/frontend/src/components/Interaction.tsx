@@ -6,6 +6,9 @@ import WebRTC from "../components/WebRTC"
 import { toast } from "react-toastify";
 import 'react-toastify/dist/ReactToastify.css'
 
+// resend interval of a held direction, below the backend's TELEOP_DEADMAN_S (300 ms)
+const MOTOR_REPEAT_MS = 150;
+
 type CommandBarData = {
   textCommand: string;
 };
@@ -183,10 +186,37 @@ function DisplayLiveCamera({ piCameraRef, isConnected, setIsConnected, sendComma
   const [isPressedS, setIsPressedS] = useState<boolean>(false);
   const [isKeyDown, setIsKeyDown] = useState<boolean>(false);
 
+  // hold-to-drive: the robot stops TELEOP_DEADMAN_S (0.3 s) after the last motor
+  // message, so a held direction is resent well within that and a release sends stop
+  const heldCommand = useRef<string | null>(null);
+  const repeatTimer = useRef<number | null>(null);
+
+  const startHold = (command: string) => {
+    const message = `{"type": "motor", "command": "${command}"}`;
+    heldCommand.current = command;
+    sendCommand(message);
+    if (repeatTimer.current !== null) window.clearInterval(repeatTimer.current);
+    repeatTimer.current = window.setInterval(() => sendCommand(message), MOTOR_REPEAT_MS);
+  }
+
+  const endHold = (command: string) => {
+    if (heldCommand.current !== command) return;
+    if (repeatTimer.current !== null) window.clearInterval(repeatTimer.current);
+    repeatTimer.current = null;
+    heldCommand.current = null;
+    sendCommand('{"type": "motor", "command": "stop"}');
+  }
+
+  useEffect(() => {
+    return () => {
+      if (repeatTimer.current !== null) window.clearInterval(repeatTimer.current);
+    };
+  }, []);
+
   const handlePress = (button: number) => {
 
     if (manualAutonomous == false) return;
-    // prevent continuous input on key hold
+    // key auto-repeat: the hold timer already resends
     if (isKeyDown) return;
 
     switch (button) {
@@ -195,28 +225,28 @@ function DisplayLiveCamera({ piCameraRef, isConnected, setIsConnected, sendComma
         setIsKeyDown(true);
         console.log("W");
         console.log('Command send attempt: move forward');
-        sendCommand('{"type": "motor", "command": "front"}');
+        startHold("front");
         break;
       case 1:
         setIsPressedA(true);
         setIsKeyDown(true);
         console.log("A");
         console.log('Command send attempt: move left');
-        sendCommand('{"type": "motor", "command": "left"}');
+        startHold("left");
         break;
       case 2:
         setIsPressedD(true);
         setIsKeyDown(true);
         console.log("D");
         console.log('Command send attempt: move right');
-        sendCommand('{"type": "motor", "command": "right"}');
+        startHold("right");
         break;
       case 3:
         setIsPressedS(true);
         setIsKeyDown(true);
         console.log("S");
         console.log('Command send attempt: move backward');
-        sendCommand('{"type": "motor", "command": "back"}');
+        startHold("back");
         break;
       default:
         break;
@@ -231,18 +261,22 @@ function DisplayLiveCamera({ piCameraRef, isConnected, setIsConnected, sendComma
       case 0:
         setIsPressedW(false);
         setIsKeyDown(false);
+        endHold("front");
         break;
       case 1:
         setIsPressedA(false);
         setIsKeyDown(false);
+        endHold("left");
         break;
       case 2:
         setIsPressedD(false);
         setIsKeyDown(false);
+        endHold("right");
         break;
       case 3:
         setIsPressedS(false);
         setIsKeyDown(false);
+        endHold("back");
         break;
       default:
         break;